@@ -14,6 +14,9 @@ import threading
 import webbrowser
 from sys import platform
 from shutil import copyfile
+import atexit
+import subprocess
+from now.utils import daemon
 
 UPLOAD_FOLDER = '.'
 ALLOWED_EXTENSIONS = set(['py'])
@@ -38,6 +41,13 @@ def remove(path):
     elif os.path.isdir(path):
         shutil.rmtree(path)  # remove dir and all contains
 
+def now_command(args):
+	""" run a ProvBuild command in the resident worker, or in a new process if there is no worker. """
+	result = daemon.call(args.split())
+	if result is None:
+		return commands.getstatusoutput('python __init__.py ' + args)
+	return result
+
 def getFuncname(line):
 	flag = 0
 	name = ""
@@ -143,7 +153,7 @@ def provbuild():
 		timefile.write(user_name + "\t" + user_file.filename + "\n")
 		timefile.write("PROVBUILD start first run: \t" + str(time.time()) + "\n")
 		remove(".noworkflow")
-		status, output = commands.getstatusoutput('python __init__.py run ' + user_file.filename)
+		status, output = now_command('run ' + user_file.filename)
 		timefile.write("PROVBUILD end first run and we start here: \t" + str(time.time()) + "\n")
 
 		f = open('ProvScript.py', 'w')
@@ -180,7 +190,7 @@ def update():
 
 	ret = request.form['func_var']
 	file = open("session.txt", "a") 
-	command = "python __init__.py update -t 1"
+	command = "update -t 1"
 	if ret == 'function': 
 		command += " -fn " + request.form['func_var_text'] + " --debug 0"
 		file.write(":f:" + request.form['func_var_text'])
@@ -192,7 +202,7 @@ def update():
 	print 'explore ' + filename + ": " + command
 	timefile = open("time.txt", "a")
 	timefile.write("PROVBUILD start update: \t" + str(time.time())  + "\n")
-	status, output = commands.getstatusoutput(command)
+	status, output = now_command(command)
 	timefile.write("PROVBUILD end update: \t" + str(time.time())  + "\n")
 
 	return render_template('provbuild.html', 
@@ -238,7 +248,7 @@ def runupdate():
 	        	print 'regenerate ProvScript.py: Regenerate ProvScript.py'
 	        	timefile = open("time.txt", "a")
 	        	timefile.write("PROVBUILD start regenerate: \t" + str(time.time())  + "\n")
-	        	status, output = commands.getstatusoutput('python __init__.py regen -t 1 -f ' + funcname)
+	        	status, output = now_command('regen -t 1 -f ' + funcname)
 	        	timefile.write("PROVBUILD end regenerate: \t" + str(time.time())  + "\n")
 	        	if "UNFOUND" in output:
 	        		errorflag = 1
@@ -277,7 +287,7 @@ def merge():
 	print 'merge: ' + ' Merge ProvScript into the original'
 	timefile = open("time.txt", "a")
 	timefile.write("PROVBUILD start merge: \t" + str(time.time()) + "\n")
-	status, output = commands.getstatusoutput('python __init__.py merge -t 1')
+	status, output = now_command('merge -t 1')
 	timefile.write("PROVBUILD end merge: \t" + str(time.time()) + "\n")
 
 	file = open("session.txt", "r") 
@@ -297,7 +307,7 @@ def merge():
 	timefile = open("time.txt", "a")
 	timefile.write("PROVBUILD start another run: \t" + str(time.time()) + "\n")
 	remove(".noworkflow")
-	status, output = commands.getstatusoutput('python __init__.py run ' + filename)
+	status, output = now_command('run ' + filename)
 	timefile.write("PROVBUILD end another run: \t" + str(time.time()) + "\n")
 
 
@@ -336,7 +346,21 @@ def main():
 	open('result.txt', 'w').close()
 	return render_template('index.html')
 
+### stop the ProvBuild worker when the app exits
+def stop_worker(worker, grace=5):
+	# ask the worker to stop. Terminate it if it does not stop in time
+	if worker.poll() is None and daemon.stop():
+		deadline = time.time() + grace
+		while worker.poll() is None and time.time() < deadline:
+			time.sleep(0.1)
+	if worker.poll() is None:
+		worker.terminate()
+		worker.wait()
+
 if __name__ == "__main__":
+	# keep a warm ProvBuild worker for the run/update/merge/regen requests
+	worker = subprocess.Popen(['python', '__init__.py', 'daemon'])
+	atexit.register(stop_worker, worker)
 	url = "http://127.0.0.1:5000"
 	threading.Timer(1.25, lambda: webbrowser.open(url)).start()
 	app.run()
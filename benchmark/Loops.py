@@ -0,0 +1,18 @@
+# Demo.py-style script with loops, used by benchmark/trace_overhead.py
+def foo(var):
+	return var
+def bar(var1, var2):
+	return var1 + var2
+total = 0
+for i in range(5000):
+	x = foo(i)
+	y = bar(x, i)
+	if y % 3 == 0:
+		total = total + y
+	else:
+		pass  # records nothing
+
+n = 0
+while n < 5000:
+	n = n + 1
+print(total, n)
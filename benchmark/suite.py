@@ -0,0 +1,276 @@
+# Copyright (c) 2018, 2019, 2020 President and Fellows of Harvard College.
+# This file is part of ProvBuild.
+
+"""Benchmark the ProvBuild workflow on synthetic workloads
+
+Usage: python benchmark/suite.py [--scale 2] [--output result.json]
+Each workload scales one dimension: loop iterations, call depth,
+file accesses, or dataframe rows. For each workload and provider,
+it runs 'now run', 'now update', the ProvScript, and 'now merge'
+in a fresh directory and reports as JSON, per phase:
+wall time, peak RSS of the process, and noWorkflow phases of 'now run'.
+Phases that exceed --timeout are killed and reported as "timeout".
+Failed phases report their exit status and the end of their stderr.
+The phases after a failed one are reported as "skipped".
+After 'now run', it also reports rows per table and database size.
+Run it with different trees in --now to compare them
+"""
+from __future__ import (absolute_import, print_function,
+                        division, unicode_literals)
+
+import argparse
+import csv
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Parameters are inlined, and only the loop section depends on process.
+# The ProvScript of 'now update -fn process' only keeps the statements of
+# its slice, and it must run by itself
+TEMPLATE = '''\
+import os
+try:
+    import pandas
+except ImportError:
+    pandas = None
+
+def nested(level):
+    if level <= 0:
+        return 0
+    return nested(level - 1) + 1
+
+def process(value):
+    return value * 2 + nested({depth})
+
+total = 0
+for i in range({loops}):
+    result = process(i)
+    total = total + result
+
+size = 0
+for index in range({files}):
+    name = "data{{}}.txt".format(index)
+    with open(name, "w") as fil:
+        fil.write(str(index))
+    with open(name) as fil:
+        size = size + len(fil.read())
+
+if pandas is not None:
+    frame = pandas.DataFrame({{"a": range({rows}), "b": range({rows})}})
+    table = int(frame["a"].sum() + frame["b"].sum())
+else:
+    frame = [[row, row] for row in range({rows})]
+    table = sum(row[0] + row[1] for row in frame)
+print(total, size, table)
+'''
+
+# Workload -> (parameters, scaled parameter)
+WORKLOADS = {
+    "loops": (dict(loops=200, depth=1, files=0, rows=0), "loops"),
+    "depth": (dict(loops=5, depth=50, files=0, rows=0), "depth"),
+    "files": (dict(loops=1, depth=1, files=100, rows=0), "files"),
+    "dataframe": (dict(loops=1, depth=1, files=0, rows=20000), "rows"),
+}
+PROVIDERS = ["Profiler", "Tracer"]
+
+# Number of stderr lines reported for failed phases
+ERROR_LINES = 5
+
+
+def workload_script(name, scale):
+    """Return (parameters, source) of workload scaled by scale"""
+    params, scaled = WORKLOADS[name]
+    params = dict(params)
+    params[scaled] = int(params[scaled] * scale)
+    return params, TEMPLATE.format(**params)
+
+
+def measure(command, cwd, timeout=None):
+    """Run command. Return (wall time, peak RSS in KiB, exit status, error)
+    The status is the exit code, or minus the signal that killed it.
+    Kill it after timeout seconds. Then, the status is "timeout"
+    The error has the last ERROR_LINES lines of stderr of failed commands
+    """
+    start = time.time()
+    timed_out = False
+    with open(os.devnull, "w") as devnull, tempfile.TemporaryFile() as err:
+        process = subprocess.Popen(command, cwd=cwd, stdout=devnull,
+                                   stderr=err)
+        while True:
+            pid, status, usage = os.wait4(process.pid, os.WNOHANG)
+            if pid:
+                break
+            if timeout and time.time() - start > timeout:
+                process.kill()
+                timed_out = True
+                _, status, usage = os.wait4(process.pid, 0)
+                break
+            time.sleep(0.01)
+        wall = time.time() - start
+        if timed_out:
+            status = "timeout"
+        elif os.WIFSIGNALED(status):
+            status = -os.WTERMSIG(status)
+        else:
+            status = os.WEXITSTATUS(status)
+        error = None
+        if status:
+            err.seek(0)
+            lines = err.read().decode("utf-8", "replace").splitlines()
+            error = "\n".join(lines[-ERROR_LINES:])
+    peak = usage.ru_maxrss
+    if sys.platform == "darwin":
+        peak //= 1024  # bytes
+    return wall, peak, status, error
+
+
+def meta_phases(cwd):
+    """Return noWorkflow phases from the nowtime.csv of 'now run --meta'"""
+    timefile = os.path.join(cwd, "nowtime.csv")
+    if not os.path.exists(timefile):
+        return {}
+    with open(timefile) as fil:
+        row = list(csv.DictReader(fil))[-1]
+    os.remove(timefile)
+    return {key: float(value) for key, value in row.items()
+            if key != "cmd" and value}
+
+
+def database_stats(cwd):
+    """Return (rows per table, size in bytes) of the provenance store"""
+    path = os.path.join(cwd, ".noworkflow")
+    database = os.path.join(path, "db.sqlite")
+    rows = {}
+    if os.path.exists(database):
+        connection = sqlite3.connect(database)
+        try:
+            tables = [name for (name,) in connection.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table'")]
+            for table in tables:
+                rows[table] = connection.execute(
+                    "SELECT count(*) FROM {}".format(table)).fetchone()[0]
+        finally:
+            connection.close()
+    size = 0
+    for root, _, files in os.walk(path):
+        size += sum(os.path.getsize(os.path.join(root, name))
+                    for name in files)
+    return rows, size
+
+
+def run_workflow(now, script, provider, cwd, now_args=(), timeout=None):       # pylint: disable=too-many-arguments
+    """Run the ProvBuild workflow on script. Return list of phase results
+    Phases after a failed one are not run. They have status "skipped"
+    """
+    python = sys.executable
+    steps = [
+        ("run", [python, now, "run", "--meta", "-e", provider] +
+         list(now_args) + [script]),
+        ("update", [python, now, "update", "-t", "1", "-fn", "process",
+                    "--no-cache"]),
+        ("provscript", [python, "ProvScript.py"]),
+        ("merge", [python, now, "merge", "-t", "1"]),
+    ]
+    result = []
+    failed = None
+    for phase, command in steps:
+        if failed is not None:
+            # Later phases depend on the failed one
+            result.append({
+                "phase": phase,
+                "status": "skipped",
+                "error": "{} failed".format(failed),
+            })
+            continue
+        wall, peak, status, error = measure(command, cwd, timeout)
+        entry = {
+            "phase": phase,
+            "wall": round(wall, 4),
+            "peak_rss_kib": peak,
+            "status": status,
+        }
+        if error is not None:
+            entry["error"] = error
+        if phase == "run":
+            entry["now_phases"] = meta_phases(cwd)
+            entry["rows"], entry["database_bytes"] = database_stats(cwd)
+        result.append(entry)
+        if status:
+            failed = phase
+            print("{}: {} phase failed with status {}. Skipping {}".format(
+                script, phase, status,
+                ", ".join(name for name, _ in steps[len(result):]) or
+                "nothing"), file=sys.stderr)
+    return result
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--now", default=os.path.join(
+        os.path.dirname(HERE), "__init__.py"))
+    parser.add_argument("-w", "--workload", action="append",
+                        choices=sorted(WORKLOADS),
+                        help="workloads to run (default: all)")
+    parser.add_argument("-p", "--provider", action="append",
+                        choices=PROVIDERS,
+                        help="execution providers (default: all)")
+    parser.add_argument("-s", "--scale", type=float, default=1.0,
+                        help="multiply the scaled dimension of workloads")
+    parser.add_argument("-t", "--timeout", type=float, default=600,
+                        help="kill phases after TIMEOUT seconds "
+                             "(default: 600, 0 disables it)")
+    parser.add_argument("--now-args", default="",
+                        help="extra 'now run' arguments")
+    parser.add_argument("-o", "--output",
+                        help="write JSON to file instead of stdout")
+    args = parser.parse_args()
+
+    now = os.path.abspath(args.now)
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "now": now,
+        "scale": args.scale,
+        "timeout": args.timeout,
+        "now_args": args.now_args,
+        "results": [],
+    }
+    for workload in args.workload or sorted(WORKLOADS):
+        params, source = workload_script(workload, args.scale)
+        for provider in args.provider or PROVIDERS:
+            workdir = tempfile.mkdtemp()
+            try:
+                script = "{}.py".format(workload)
+                with open(os.path.join(workdir, script), "w") as fil:
+                    fil.write(source)
+                phases = run_workflow(now, script, provider, workdir,
+                                      args.now_args.split(), args.timeout)
+            finally:
+                shutil.rmtree(workdir)
+            report["results"].append({
+                "workload": workload,
+                "parameters": params,
+                "provider": provider,
+                "phases": phases,
+            })
+
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as fil:
+            fil.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
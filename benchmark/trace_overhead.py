@@ -0,0 +1,89 @@
+# Copyright (c) 2018, 2019, 2020 President and Fellows of Harvard College.
+# This file is part of ProvBuild.
+
+"""Measure the tracing overhead of 'now run' on a script
+
+Usage: python benchmark/trace_overhead.py [script] [--now path/to/__init__.py]
+It compares the script execution under the tracer, as reported by
+'now run --meta', to the script execution without noWorkflow.
+Run it with different trees in --now to compare them
+"""
+from __future__ import (absolute_import, print_function,
+                        division, unicode_literals)
+
+import argparse
+import csv
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+PLAIN = (
+    "import runpy, sys, time; start = time.time(); "
+    "runpy.run_path(sys.argv[1], run_name='__main__'); "
+    "sys.stderr.write('%f' % (time.time() - start))"
+)
+
+
+def plain_time(script, cwd):
+    """Return the duration of script without noWorkflow"""
+    with open(os.devnull, "w") as devnull:
+        process = subprocess.Popen([sys.executable, "-c", PLAIN, script],
+                                   cwd=cwd, stdout=devnull,
+                                   stderr=subprocess.PIPE)
+        _, err = process.communicate()
+    return float(err.strip().splitlines()[-1])
+
+
+def now_times(now, script, cwd, now_args=()):
+    """Return (execution, storage) durations of 'now run --meta'"""
+    shutil.rmtree(os.path.join(cwd, ".noworkflow"), ignore_errors=True)
+    timefile = os.path.join(cwd, "nowtime.csv")
+    if os.path.exists(timefile):
+        os.remove(timefile)
+    with open(os.devnull, "w") as devnull:
+        subprocess.check_call(
+            [sys.executable, now, "run", "--meta"] + list(now_args) + [script],
+            cwd=cwd, stdout=devnull, stderr=devnull)
+    with open(timefile) as fil:
+        row = list(csv.DictReader(fil))[-1]
+    return float(row["execution"]), float(row["storage"])
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("script", nargs="?",
+                        default=os.path.join(HERE, "Loops.py"))
+    parser.add_argument("--now", default=os.path.join(
+        os.path.dirname(HERE), "__init__.py"))
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    parser.add_argument("--now-args", default="-S 0",
+                        help="extra 'now run' arguments. The default disables "
+                             "partial saves, which count as execution time "
+                             "(default: -S 0)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    try:
+        script = os.path.basename(args.script)
+        shutil.copy(args.script, os.path.join(workdir, script))
+        plain = min(plain_time(script, workdir) for _ in range(args.repeat))
+        execution, storage = min(
+            now_times(os.path.abspath(args.now), script, workdir,
+                      args.now_args.split())
+            for _ in range(args.repeat))
+    finally:
+        shutil.rmtree(workdir)
+    print("plain python:    {:.3f}s".format(plain))
+    print("traced script:   {:.3f}s".format(execution))
+    print("storage:         {:.3f}s".format(storage))
+    print("trace overhead:  {:.1f}x".format(execution / plain))
+
+
+if __name__ == "__main__":
+    main()
@@ -17,6 +17,9 @@ from .cmd_update import Update
 from .cmd_runupdate import RunUpdate
 from .cmd_regen import ReGen
 from .cmd_merge import Merge
+from .cmd_daemon import Daemon
+from .cmd_content import Content
+from .cmd_show import Show
 from ..utils.io import print_msg
 
 
@@ -33,7 +36,10 @@ def main():
         Update(),
         RunUpdate(),
         ReGen(),
-        Merge()
+        Merge(),
+        Daemon(),
+        Content(),
+        Show()
     ]
     for cmd in commands:
         cmd.create_parser(subparsers)
@@ -58,5 +64,8 @@ __all__ = [
     "Update",
     "RunUpdate",
     "ReGen",
-    "Merge"
+    "Merge",
+    "Daemon",
+    "Content",
+    "Show"
 ]
@@ -0,0 +1,103 @@
+# Copyright (c) 2018, 2019, 2020 President and Fellows of Harvard College.
+# This file is part of ProvBuild.
+
+"""'content' command"""
+from __future__ import (absolute_import, print_function,
+                        division, unicode_literals)
+
+import argparse
+import os
+
+from sqlalchemy import select
+
+from ..persistence import persistence_config, content, relational
+from ..persistence.models import Trial, Module, FunctionDef, FileAccess
+from ..persistence.models import GraphCache, SliceCache, Variable, ObjectValue
+from ..persistence.models import StatementValue, DeploymentCache
+from ..persistence.packs import parse_compression, describe_codecs
+from ..utils.io import print_msg
+from .command import Command
+
+
+CONTENT_PREFIX = "now-content:"
+
+
+def reachable_hashes():
+    """Return content hashes referenced by the provenance database"""
+    columns = [
+        Trial.t.c.code_hash,
+        Module.t.c.code_hash,
+        FunctionDef.t.c.code_hash,
+        FileAccess.t.c.content_hash_before,
+        FileAccess.t.c.content_hash_after,
+        GraphCache.t.c.content_hash,
+        SliceCache.t.c.content_hash,
+        DeploymentCache.t.c.content_hash,
+        StatementValue.t.c.content_hash,
+    ]
+    result = set()
+    for column in columns:
+        for (content_hash,) in relational.session.execute(
+                select([column]).distinct()):
+            if content_hash:
+                result.add(content_hash)
+    for column in [Variable.t.c.value, ObjectValue.t.c.value]:
+        for (value,) in relational.session.execute(
+                select([column]).where(column.like(CONTENT_PREFIX + "%"))):
+            result.add(value[len(CONTENT_PREFIX):])
+    return result
+
+
+def compression_spec(string):
+    """Check if argument is a valid 'codec[:level]' compression"""
+    try:
+        parse_compression(string)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(str(exc))
+    return string
+
+
+class Content(Command):
+    """Manage the content database"""
+
+    def add_arguments(self):
+        add_arg = self.add_argument
+        add_arg("action", choices=["migrate", "gc", "stats"],
+                help="R|migrate: move loose content files into packs\n"
+                     "gc: remove contents that no trial references\n"
+                     "stats: show the number of loose and packed contents")
+        add_arg("--compression", type=compression_spec,
+                help="compression of migrated contents: {}, with an optional "
+                     "level. E.g.: zlib:6".format(describe_codecs()))
+        add_arg("--keep-loose", action="store_true",
+                help="do not remove loose files after migrating them")
+        add_arg("--dry-run", action="store_true",
+                help="count unreachable contents without removing them")
+        add_arg("--dir", type=str,
+                help="set project path where is the database. Default to "
+                     "current directory")
+
+    def execute(self, args):
+        persistence_config.connect_existing(args.dir or os.getcwd())
+        if args.action == "migrate":
+            total = content.migrate(compression=args.compression,
+                                    keep_loose=args.keep_loose)
+            print_msg("migrated {} loose contents into packs".format(total),
+                      True)
+        elif args.action == "gc":
+            reachable = reachable_hashes()
+            if args.dry_run:
+                stored = set(content.loose_hashes())
+                if content.packs is not None:
+                    stored.update(content.packs.hashes())
+                print_msg("{} of {} contents are unreachable".format(
+                    len(stored - reachable), len(stored)), True)
+                return
+            kept, removed, freed = content.gc(reachable)
+            print_msg("removed {} contents ({} bytes). Kept {}".format(
+                removed, freed, kept), True)
+        else:
+            loose = len(content.loose_hashes())
+            packed = len(content.packs.hashes()) if content.packs else 0
+            print_msg("{} loose contents, {} packed contents".format(
+                loose, packed), True)
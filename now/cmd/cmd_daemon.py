@@ -0,0 +1,81 @@
+# Copyright (c) 2018, 2019, 2020 President and Fellows of Harvard College.
+# This file is part of ProvBuild.
+
+"""'daemon' command"""
+from __future__ import (absolute_import, print_function,
+                        division, unicode_literals)
+
+import os
+import sys
+import tempfile
+import traceback
+
+from sqlalchemy.orm import configure_mappers
+
+from ..utils import daemon
+from ..utils.io import print_msg
+from .command import Command
+
+
+def execute_forked(argv, cwd):
+    """Execute 'now' command argv in a forked child of the worker
+
+    The child inherits the imported modules and configured mappers.
+    It connects to the database by itself and its changes in the
+    interpreter state (tracer, sys.modules, __main__) die with it.
+    Return (status, output) like commands.getstatusoutput
+    """
+    from . import main
+    output = tempfile.TemporaryFile()
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            os.chdir(cwd)
+            os.dup2(output.fileno(), 1)
+            os.dup2(output.fileno(), 2)
+            sys.argv = [sys.argv[0]] + list(argv)
+            main()
+        except SystemExit as exc:
+            if isinstance(exc.code, int):
+                code = exc.code
+            elif exc.code is not None:
+                code = 1
+        except BaseException:                                                    # pylint: disable=broad-except
+            traceback.print_exc()
+            code = 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(code)                                                       # pylint: disable=protected-access
+    _, status = os.waitpid(pid, 0)
+    output.seek(0)
+    result = output.read().decode("utf-8", "replace")
+    output.close()
+    if result.endswith("\n"):
+        result = result[:-1]
+    return status, result
+
+
+class Daemon(Command):
+    """Start a resident worker that executes ProvBuild commands"""
+
+    def add_arguments(self):
+        add_arg = self.add_argument
+        add_arg("--socket", type=str, default=daemon.DAEMON_ADDRESS,
+                help="unix socket of the worker (default: {})".format(
+                    daemon.DAEMON_ADDRESS))
+        add_arg("--stop", action="store_true",
+                help="stop the worker listening on the socket")
+
+    def execute(self, args):
+        if args.stop:
+            if not daemon.stop(args.socket):
+                print_msg("there is no worker listening on {}".format(
+                    args.socket), True)
+            return
+
+        # Pay the mapper configuration once, instead of once per command
+        configure_mappers()
+        print_msg("listening on {}".format(args.socket), True)
+        daemon.serve(execute_forked, address=args.socket)
@@ -6,9 +6,12 @@ from __future__ import (absolute_import, print_function,
                         division, unicode_literals)
 
 import argparse
+import hashlib
 import os
 import sys
 
+from datetime import datetime
+
 from future.utils import viewitems
 
 from sqlalchemy import Column, Integer, Text, TIMESTAMP
@@ -24,6 +27,7 @@ from ..utils import io, metaprofiler
 from ..collection.metadata import Metascript
 from ..persistence.models import Tag, Trial, FunctionDef, Module, Dependency, FileAccess, EnvironmentAttr, Object, Activation, ObjectValue, Variable, VariableDependency, VariableUsage
 from ..persistence import persistence_config, content
+from ..persistence.stitching import TrialStitch
 from ..utils.io import print_msg
 from .command import Command
 
@@ -75,6 +79,74 @@ def remove_comment_lineno(content):
 
 
 
+def stitch(previous_trial, update_trial_id, code, previous_lines,               # pylint: disable=too-many-arguments
+           update_lines):
+    """Create the trial of the merged script by stitching the provenance
+    of previous_trial and update_trial_id. Return the new trial id or None
+    if the provenance of the merged script requires 'now run'
+
+
+    Arguments:
+    previous_trial -- trial of the script before the merge
+    update_trial_id -- 'now runupdate --incremental' trial of ProvScript.py
+    code -- merged script
+    previous_lines -- map of previous script lines to merged script lines
+    update_lines -- map of ProvScript lines to merged script lines
+    """
+    update_trial = Trial(trial_ref=update_trial_id)
+    with open("ProvScript.py", "rb") as fil:
+        provscript_hash = hashlib.sha1(fil.read()).hexdigest()
+    command = (update_trial.command or "").split()
+    if command[:1] != ["runupdate"] or "--incremental" not in command:
+        print_msg("trial {} is not a 'now runupdate --incremental' trial. "
+                  "Use 'now run'".format(update_trial.id), True)
+        return None
+    if update_trial.code_hash != provscript_hash:
+        print_msg("trial {} did not run the current ProvScript.py. "
+                  "Use 'now run'".format(update_trial.id), True)
+        return None
+    with open(previous_trial.script, "r") as fil:
+        previous_code = fil.read()
+    try:
+        stitching = TrialStitch(previous_trial.id, update_trial.id, code,
+                                previous_lines, update_lines, previous_code)
+    except SyntaxError:
+        print_msg("the merged script has syntax errors. Use 'now run'", True)
+        return None
+    reason = stitching.conflict()
+    if reason is not None:
+        print_msg("could not stitch trials: {}. Use 'now run'".format(reason),
+                  True)
+        return None
+
+    metascript = Metascript()
+    metascript.bypass_modules = True
+    metascript.command = " ".join(sys.argv[1:])
+    metascript.dir = os.getcwd()
+    metascript.fake_path(os.path.realpath(previous_trial.script), code)
+    metascript.name = previous_trial.script
+    metascript.docstring = previous_trial.docstring or ""
+    metascript.trial_id = Trial.store(*metascript.create_trial_args(
+        args="<stitch {} {}>".format(previous_trial.id, update_trial.id)))
+    # Modules did not change. Inherit them from the previous trial
+    relational.session.execute(Trial.t.update().values(
+        inherited_id=previous_trial.inherited_id or previous_trial.id
+    ).where(Trial.t.c.id == metascript.trial_id))
+    relational.session.commit()
+    Tag.create_automatic_tag(*metascript.create_automatic_tag_args())
+
+    metascript.definition.collect_provenance()
+    metascript.definition.store_provenance()
+    metascript.deployment.collect_provenance()
+    metascript.deployment.store_provenance()
+    total = stitching.store(metascript.trial_id)
+    Trial.fast_update(metascript.trial_id, datetime.now(),
+                      metascript.docstring)
+    print_msg("trial {} stitched from trials {} and {} ({} rows)".format(
+        metascript.trial_id, previous_trial.id, update_trial.id, total), True)
+    return metascript.trial_id
+
+
 class Merge(Command):
     """ Merge ProvScript into the previous script based on the user input (trial id) """
 
@@ -86,6 +158,11 @@ class Merge(Command):
 
         add_arg("-t", "--trial", type=non_negative,
                 help="get the previous trial id")
+        add_arg("--stitch", type=non_negative, metavar="RUNUPDATE_TRIAL",
+                help="create the trial of the merged script without running "
+                     "it. Reuse the provenance of the previous trial for "
+                     "untouched statements and of the given 'now runupdate "
+                     "--incremental' trial for the re-executed ones")
 
     def execute(self, args):
         persistence_config.connect_existing(os.getcwd())
@@ -134,6 +211,10 @@ class Merge(Command):
                     need_update[idx] = need_update[idx] + 1
                     flag = 1
 
+        # merged script lines of previous script and ProvScript lines
+        merged_lines = []
+        merged_previous = {}
+        merged_update = {}
         j = 0
         for line in origin_file:
             j = j+1
@@ -147,14 +228,25 @@ class Merge(Command):
                         ln = update_lines[0]
                         content = linecache.getline('ProvScript.py', ln)
                         new_file.write(content)
+                        merged_lines.append(content)
+                        merged_update[ln] = len(merged_lines)
                         # we've added this line, remove it from the list
                         update_lines.remove(ln)
                 # add the ProvScript version
                 content = linecache.getline('ProvScript.py', provscript_line_index)
                 new_content = remove_comment_lineno(content)
                 new_file.write(new_content)
+                merged_lines.append(new_content)
+                merged_update[provscript_line_index] = len(merged_lines)
+                merged_previous[j] = len(merged_lines)
             else:
                 content = linecache.getline(previous_trial.script, j)
                 new_file.write(content)
+                merged_lines.append(content)
+                merged_previous[j] = len(merged_lines)
 
         new_file.close()
+
+        if args.stitch is not None:
+            stitch(previous_trial, args.stitch, "".join(merged_lines),
+                   merged_previous, merged_update)
@@ -24,6 +24,7 @@ from ..utils import io, metaprofiler
 from ..collection.metadata import Metascript
 from ..persistence.models import Tag, Trial, FunctionDef, Module, Dependency, FileAccess, EnvironmentAttr, Object, Activation, ObjectValue, Variable, VariableDependency, VariableUsage
 from ..persistence import persistence_config, content
+from ..persistence.snapshot import TrialSnapshot
 from ..utils.io import print_msg
 from .command import Command
 
@@ -57,9 +58,7 @@ class ReGen(Command):
         print("undefined function name: " + more_func_name)
 
         trial = Trial(trial_ref=args.trial)
-        function_def = FunctionDef(trial_ref=args.trial)
-        if function_def is not None:
-            result_functiondef = function_def.pull_content(trial.id)
+        result_functiondef = TrialSnapshot.load(trial.id).function_defs
 
         line_list = []
         flag = 0
@@ -12,7 +12,9 @@ import os
 import sys
 
 from ..collection.metadata import Metascript
-from ..persistence.models import Tag, Trial
+from ..persistence import persistence_config
+from ..persistence.models import Tag, Trial, SliceCache
+from ..persistence.packs import parse_compression, describe_codecs
 from ..utils import io, metaprofiler
 from ..utils.cross_version import PY3
 
@@ -28,6 +30,15 @@ def non_negative(string):
     return value
 
 
+def compression_spec(string):
+    """Check if argument is a valid 'codec[:level]' compression"""
+    try:
+        parse_compression(string)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(str(exc))
+    return string
+
+
 class ScriptArgs(argparse.Action): # pylint: disable=too-few-public-methods
     """Action to create script attribute"""
     def __call__(self, parser, namespace, values, option_string=None):
@@ -51,6 +62,8 @@ def run(metascript):
     try:
         metascript.trial_id = Trial.store(*metascript.create_trial_args())
         Tag.create_automatic_tag(*metascript.create_automatic_tag_args())
+        SliceCache.remove_superseded(metascript.trial_id, metascript.name,
+                                     commit=True)
 
         io.print_msg("collecting definition provenance")
         metascript.definition.collect_provenance()
@@ -65,6 +78,10 @@ def run(metascript):
         metascript.execution.store_provenance()
 
         metaprofiler.meta_profiler.save()
+        metaprofiler.hot_counters.save(
+            os.path.join(persistence_config.provenance_path,
+                         metaprofiler.COUNTERS_DIRNAME),
+            metascript.trial_id)
 
     finally:
         metascript.create_last()
@@ -78,6 +95,7 @@ class Run(Command):
         self.default_context = "main"
         self.default_call_storage_frequency = 10000
         self.default_save_frequency = 0
+        self.default_store_queue_size = 4
         # self.default_execution_provenance = "Profiler"
         self.default_execution_provenance = "Tracer"
         self.add_help = False
@@ -98,6 +116,13 @@ class Run(Command):
         add_arg("-b", "--bypass-modules", action="store_true",
                 help="bypass module dependencies analysis, assuming that no "
                      "module changes occurred since last execution")
+        add_arg("--no-deployment-cache", action="store_false",
+                dest="deployment_cache",
+                help="search module dependencies, even when the script, the "
+                     "interpreter and sys.path match a previous trial")
+        add_arg("--module-workers", type=non_negative, default=4,
+                help="threads that find versions and hashes of module "
+                     "dependencies (default: 4)")
 
         # Execution
         if not self.is_ipython:
@@ -120,6 +145,36 @@ class Run(Command):
                      "Tracker captures everything the Profiler captures, \n"
                      "in addition to variables and dependencies.\n"
                      "Tracer is an alias to Tracker")
+        add_arg("--trace-scope", choices=["all", "user"], default="all",
+                help="R|frames with traced events. (default: all)\n"
+                     "all traces every frame and filters events afterwards.\n"
+                     "user only traces lines of frames in user files and \n"
+                     "ignores calls outside user files beyond the \n"
+                     "non-user depth. Assignments to frame.f_trace outside \n"
+                     "user files are not detected")
+        add_arg("--compact-loops", action="store_true",
+                help="record only the first and last iterations of loops. "
+                     "Fold the variables of the other iterations into one "
+                     "variable per name and line")
+        add_arg("--loop-head", type=non_negative, default=10,
+                help="first iterations of compacted loops that are recorded "
+                     "(default: 10)")
+        add_arg("--loop-tail", type=non_negative, default=10,
+                help="last iterations of compacted loops that are recorded "
+                     "(default: 10)")
+        add_arg("--value-budget", type=non_negative, default=0,
+                help="maximum size (in bytes) of serialized values. Longer "
+                     "values are stored as summaries with their type, length "
+                     "and first items. 0 disables the budget (default: 0)")
+        add_arg("--defer-values", action="store_true",
+                help="serialize only values of global variables, which can "
+                     "become ProvScript parameters. Store the type and "
+                     "length of other variables")
+        add_arg("--value-cache", type=float, metavar="SECONDS",
+                help="pickle values of top-level statements with calls that "
+                     "took at least SECONDS into the content store. The "
+                     "ProvScript restores them instead of using their repr. "
+                     "Requires the Tracer")
         add_arg("-c", "--context", choices=["main", "package", "all"],
                 default=self.default_context,
                 help="functions subject to depth computation when capturing "
@@ -130,6 +185,11 @@ class Run(Command):
         add_arg("-S", "--call-storage-frequency", type=non_negative,
                 default=self.default_call_storage_frequency,
                 help="frequency (in calls) to save partial provenance")
+        add_arg("--store-queue-size", type=non_negative,
+                default=self.default_store_queue_size,
+                help="partial saves that can wait for the background writer "
+                     "before the script blocks. 0 saves them in the script "
+                     "thread (default: 4)")
 
         # Other
         if not self.is_ipython:
@@ -148,17 +208,36 @@ class Run(Command):
                      "be created in this path. Default to script directory")
         add_arg("-v", "--verbose", action="store_true",
                 help="increase output verbosity")
+        add_arg("--synchronous", choices=["OFF", "NORMAL", "FULL"],
+                help="SQLite synchronous mode of the provenance database "
+                     "(default: NORMAL)")
+        add_arg("--cache-size", type=int,
+                help="SQLite page cache size of the provenance database. "
+                     "Negative values are in KiB (default: -64000)")
+        add_arg("--content-compression", type=compression_spec,
+                help="compression of new file contents in packs: {}, with "
+                     "an optional level. E.g.: zlib:6 (default: none)"
+                     .format(describe_codecs()))
+        add_arg("--no-fingerprint-cache", action="store_false",
+                dest="fingerprint_cache",
+                help="hash every accessed file, even when its path, inode, "
+                     "size and modification time match a previous trial")
 
         # Internal
         add_arg("--disasm0", action="store_true", help=argparse.SUPPRESS)
         add_arg("--disasm", action="store_true", help=argparse.SUPPRESS)
         add_cmd("--create_last", action="store_true", help=argparse.SUPPRESS)
         add_arg("--meta", action="store_true", help=argparse.SUPPRESS)
+        add_arg("--counters", action="store_true",
+                help="count and time hot paths of the execution provider. "
+                     "Save them in .noworkflow/counters. See 'now show -c'")
 
     def execute(self, args):
         if args.meta:
             metaprofiler.meta_profiler.active = True
             metaprofiler.meta_profiler.data["cmd"] = " ".join(sys.argv)
+        if args.counters:
+            metaprofiler.hot_counters.active = True
 
         io.verbose = args.verbose
         io.print_msg("removing noWorkflow boilerplate")
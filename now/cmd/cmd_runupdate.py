@@ -35,15 +35,18 @@ class ScriptArgs(argparse.Action): # pylint: disable=too-few-public-methods
         setattr(namespace, "argv", values)
 
 
-def run(metascript):
-    """Execute noWokflow to capture provenance from script"""
+def run(metascript, incremental=False):
+    """Execute noWokflow to capture provenance from script
+    The incremental mode collects definition provenance for the Tracer
+    """
     try:
         metascript.trial_id = Trial.store(*metascript.create_trial_args(args="runupdate"))
         Tag.create_automatic_tag(*metascript.create_automatic_tag_args())
 
-        # io.print_msg("collecting definition provenance")
-        # metascript.definition.collect_provenance()
-        # metascript.definition.store_provenance()
+        if incremental:
+            io.print_msg("collecting definition provenance")
+            metascript.definition.collect_provenance()
+            metascript.definition.store_provenance()
 
         # io.print_msg("collecting deployment provenance")
         # metascript.deployment.collect_provenance()
@@ -86,6 +89,10 @@ class RunUpdate(Command):
         add_arg("--dir", type=str,
                 help="set project path. The noworkflow database folder will "
                      "be created in this path. Default to script directory")
+        add_arg("--incremental", action="store_true",
+                help="collect slicing provenance with the Tracer, so that "
+                     "'now merge --stitch' can reuse it instead of running "
+                     "the merged script")
 
     def execute(self, args):
     	io.verbose = True # enable verbose
@@ -93,6 +100,8 @@ class RunUpdate(Command):
 
         # Create Metascript with params
         metascript = Metascript().read_cmd_args_runupdate(args)
+        if args.incremental:
+            metascript.execution_provenance = self.execution_provenance
 
         # Set __main__ namespace
         import __main__
@@ -103,6 +112,6 @@ class RunUpdate(Command):
         metascript.clear_namespace()
 
         # Run script
-        run(metascript)
+        run(metascript, incremental=args.incremental)
 
 
@@ -14,6 +14,7 @@ from ..persistence.models import Trial
 from ..persistence import persistence_config
 from ..utils.functions import wrap
 from ..utils.io import print_msg
+from ..utils.metaprofiler import HotPathCounters, COUNTERS_DIRNAME
 
 from .command import NotebookCommand
 
@@ -26,6 +27,24 @@ def print_trial_relationship(relation, breakline="\n\n", other="\n    "):
     print(breakline.join(output))
 
 
+def print_counters(trial):
+    """Print hot path counters of 'now run --counters'"""
+    rows = HotPathCounters.load(
+        os.path.join(persistence_config.provenance_path, COUNTERS_DIRNAME),
+        trial.id)
+    if rows is None:
+        print_msg("trial {} has no counters. "
+                  "Use 'now run --counters'".format(trial.id), True)
+        return
+    print_msg("this trial has the following hot path counters:", True)
+    width = max([len("name")] + [len(row[0]) for row in rows])
+    print("  {:<{width}} {:>10} {:>12} {:>12}".format(
+        "name", "count", "seconds", "bytes", width=width))
+    for name, count, seconds, size in rows:
+        print("  {:<{width}} {:>10} {:>12.6f} {:>12}".format(
+            name, count, seconds, size, width=width))
+
+
 def print_function_activation(trial, activation, level=1):
     """Print function activation recursively"""
     text = wrap(
@@ -57,6 +76,8 @@ class Show(NotebookCommand):
                 help="shows function activations")
         add_arg("-f", "--file-accesses", action="store_true",
                 help="shows read/write access to files")
+        add_arg("-c", "--counters", action="store_true",
+                help="shows hot path counters of 'now run --counters'")
         add_arg("--dir", type=str,
                 help="set project path where is the database. Default to "
                      "current directory")
@@ -92,6 +113,9 @@ class Show(NotebookCommand):
             print_msg("this trial accessed the following files:", True)
             print_trial_relationship(trial.file_accesses)
 
+        if args.counters:
+            print_counters(trial)
+
     def execute_export(self, args):
         persistence_config.connect_existing(args.dir or os.getcwd())
         Trial(trial_ref=args.trial)
@@ -7,6 +7,7 @@ from __future__ import (absolute_import, print_function,
 
 import os
 import sys
+import time
 import argparse
 from future.utils import viewitems
 
@@ -20,14 +21,28 @@ from ..persistence.models.base import proxy
 
 
 from ..utils import io, metaprofiler
+from ..utils.data import IndexedList
 from ..collection.metadata import Metascript
+from ..collection.prov_execution.value_cache import statement_hash
 from ..persistence.models import Tag, Trial, FunctionDef, Module, Dependency, FileAccess, EnvironmentAttr, Object, Activation, ObjectValue, Variable, VariableDependency, VariableUsage
+from ..persistence.models.graphs.slice_graph import SliceGraph
+from ..persistence.models.slice_cache import SliceCache
+from ..persistence.models.statement_value import StatementValue
+from ..persistence.snapshot import TrialSnapshot
+from ..persistence.serializers import is_summary
 from ..persistence import persistence_config, content
 from ..utils.io import print_msg
 from .command import Command
 
 import linecache
 
+VALUE_LOADER_NAME = "__now_value"
+VALUE_LOADER = """import pickle
+def {}(path):
+    with open(path, "rb") as value_file:
+        return pickle.load(value_file)
+""".format(VALUE_LOADER_NAME)
+
 def debug_print(string, content, arg=False):
     if arg == True:
         print('{} is {}'.format(string, content))
@@ -83,14 +98,6 @@ def check_def_id(line, result_functiondef):
     else:
         return 0
 
-def check_related_call(name, result_variable):
-    ret = []
-    name_length = len(name)
-    for r in result_variable:
-        if r.name[0:name_length] == name[0:name_length] and r.type == 'call':
-            ret.append(r.id)
-    return ret
-
 def check_related_arg(line, result_variable):
     ret = []
     for r in result_variable:
@@ -98,13 +105,6 @@ def check_related_arg(line, result_variable):
             ret.append(r.id)
     return ret
 
-def check_related_call_general(name, line, result_variable):
-    ret = []
-    for r in result_variable:
-        if r.type == 'call' and r.line == line:
-            ret.append(r.id)
-    return ret
-
 def remove_loop_cond_funcdef(funclist):
     func_list_remove = []
     for i in funclist:
@@ -137,6 +137,9 @@ class Update(Command):
         add_arg("--debug", type = int, default=0, help="enable debug")
         add_arg("--morefunc", type=str, default='',
                 help="undefined function")
+        add_arg("--no-cache", action="store_true",
+                help="recompute the slice instead of loading it from the "
+                     "slice cache")
 
     def execute(self, args):
         # first, we need to restore the metascript based on trial id
@@ -157,24 +160,41 @@ class Update(Command):
         more_func_name = args.morefunc
         debug_print("undefined function name", more_func_name, debug_mode)
 
-        # trial table
-        result_trial = trial.pull_content(trial.id)
-        trial_table = trial.__table__
+        if args.funcname is not None:
+            information = (trial.id, "function", args.funcname, more_func_name)
+        else:
+            information = (trial.id, "variable", args.varname, more_func_name)
+
+        # a repeated search reuses the slice and only regenerates the script
+        result = None
+        if not args.no_cache:
+            result = SliceCache.load_slice(*information)
+        if result is None:
+            start = time.time()
+            result = self.collect_slice(args, trial, debug_mode, more_func_name)
+            if result is None:
+                return
+            SliceCache.store_slice(*(information + (time.time() - start, result)))
+        else:
+            debug_print("slice loaded from cache", information, debug_mode)
+
+        self.write_provscript(metascript.name, result)
+
+    def collect_slice(self, args, trial, debug_mode, more_func_name):
+        """Compute the lines and parameters that compose the ProvScript
+        Return None if the function or variable does not exist
+        """
+        # read the provenance tables of the trial once, by column
+        snapshot = TrialSnapshot.load(trial.id)
 
         # definition provenance
         # function_def table
-        function_def = FunctionDef(trial_ref=args.trial)
-        if function_def is not None:
-            result_functiondef = function_def.pull_content(trial.id)
-            function_def_table = function_def.__table__
-
-            # collect all the function definitions
-            func_defs = []
-            for r in result_functiondef:
-                func_defs.append(r.name)
-        else:
-            result_functiondef = []
-            func_defs = []
+        result_functiondef = snapshot.function_defs
+
+        # collect all the function definitions
+        func_defs = []
+        for r in result_functiondef:
+            func_defs.append(r.name)
 
         if args.funcname is not None:
             if args.funcname not in func_defs:
@@ -182,9 +202,7 @@ class Update(Command):
                 return
 
         # variable table
-        variable = Variable(trial_ref=args.trial)
-        result_variable = variable.pull_content(trial.id)
-        variable_table = variable.__table__
+        result_variable = snapshot.variables
 
         # get the global variable declarations here
         var_defs = []
@@ -202,22 +220,14 @@ class Update(Command):
                 return
 
         # variable_dependency table
-        variable_dependency = VariableDependency(trial_ref=args.trial)
-        result_variabledependency = variable_dependency.pull_content(trial.id)
-        variable_dependency_table = variable_dependency.__table__
-
-        # variable_usage table
-        variable_usage = VariableUsage(trial_ref=args.trial)
-        result_variableusage = variable_usage.pull_content(trial.id)
-        variable_usage_table = variable_usage.__table__
+        result_variabledependency = snapshot.dependencies
 
         # function_activation table
-        function_activation = Activation(trial_ref=args.trial)
-        if function_activation is not None:
-            result_functionactivation = function_activation.pull_content(trial.id)
-            function_activation_table = function_activation.__table__
-        else:
-            result_functionactivation = []
+        result_functionactivation = snapshot.activations
+
+        # index the dependency graph once, instead of scanning the tables
+        graph = SliceGraph(result_variable, result_variabledependency,
+                           result_functionactivation)
         # if the input is function name, we are dealing with function
         if args.funcname is not None:
             given_funcname = args.funcname
@@ -231,32 +241,13 @@ class Update(Command):
         # print("I think we are done with the provenance part")
         # print("So, now we will start to create a ProvScript for you")
         #########################################
-
-        origin_file = open(metascript.name, "r")
-        ### open a new file to store sub script
-        update_file = open("ProvScript.py", "w")
-
-        ### function definition bound
-        update_file.write("# This is the function declaration part\n")
-        update_file.write("# - Your previous script contains the following function definitions:\n")
         func_defs_update = remove_loop_cond_funcdef(func_defs)
-        func_defs_str = ""
-        for f in func_defs_update:
-            func_defs_str = func_defs_str + '###' + f + '\n'
-        update_file.write(func_defs_str)
-
-        update_file.write("# This is the global variable declaration part\n")
-        update_file.write("# - Your previous script contains the following global variable:\n")
-        var_defs_str = ""
-        for f in var_defs:
-            var_defs_str = var_defs_str + '###' + f + '\n'
-        update_file.write(var_defs_str)
 
         ### first, we will deal with the function name input
         if args.funcname is not None:
             # try to find the function name when it appears
             funcid = []
-            funcid_copy = []
+            funcid_copy = IndexedList()
             given_funcname_list = []
             given_funcname_list.append(given_funcname)
             for i in result_functionactivation:
@@ -266,9 +257,9 @@ class Update(Command):
                         given_funcname_list.append(caller_name)
             debug_print("Given function name list (including global functions)", given_funcname_list, debug_mode)
             for i in given_funcname_list:
-                funcid += check_related_call(i, result_variable)
+                funcid += graph.related_calls(i)
 
-            funcid_calls = []
+            funcid_calls = IndexedList()
             # make a copy
             for i in funcid:
                 funcid_copy.append(i)
@@ -276,10 +267,10 @@ class Update(Command):
 
             debug_print("function ID", funcid, debug_mode)
 
-            funcid_end = []
+            funcid_end = IndexedList()
             for f in funcid_copy:
-                for r in result_variabledependency:
-                    if r.source_id == f and r.target_id not in funcid_copy:
+                for r in graph.dependencies(f):
+                    if r.target_id not in funcid_copy:
                         debug_detail_print(">>> target: {} <- {}, type = {}, target type = {}".format(r.source_id, r.target_id, r.type, result_variable[r.target_id-1].type), debug_mode)
                         if result_variable[r.target_id-1].type == 'function definition':
                             pass
@@ -294,7 +285,7 @@ class Update(Command):
                         else:
                             funcid_copy.append(r.target_id)
                             if result_variable[r.target_id-1].type == 'call' and result_variable[r.target_id-1].activation_id == 1:
-                                same_call = check_related_call_general(result_variable[r.target_id-1].name, result_variable[r.target_id-1].line, result_variable)
+                                same_call = graph.calls_at(result_variable[r.target_id-1].line)
                                 debug_print("call in the same line", same_call, debug_mode)
                                 for i in same_call:
                                     if i not in funcid_copy:
@@ -309,8 +300,8 @@ class Update(Command):
             debug_print("function ID list (updated target_id)", funcid_copy, debug_mode)
 
             for v in funcid_copy:
-                for r in result_variabledependency:
-                    if r.target_id == v and r.source_id not in funcid_copy:
+                for r in graph.dependents(v):
+                    if r.source_id not in funcid_copy:
                         debug_detail_print(">>> source: {} -> {}, type = {}, source type = {}".format(r.target_id, r.source_id, r.type, result_variable[r.source_id-1].type), debug_mode)
                         if result_variable[r.source_id-1].type == '--blackbox--':
                             debug_detail_print(">>> PASS: source: {} -> {}, type = {},  source type = {}".format(r.target_id, r.source_id, r.type, result_variable[r.source_id-1].type), debug_mode)
@@ -318,7 +309,7 @@ class Update(Command):
                         else:
                             funcid_copy.append(r.source_id)
                             if result_variable[r.source_id-1].type == 'call' and result_variable[r.source_id-1].activation_id == 1:
-                                same_call = check_related_call_general(result_variable[r.source_id-1].name, result_variable[r.source_id-1].line, result_variable)
+                                same_call = graph.calls_at(result_variable[r.source_id-1].line)
                                 debug_print("call in the same line", same_call)
                                 for i in same_call:
                                     if i not in funcid_copy:
@@ -330,29 +321,28 @@ class Update(Command):
             debug_print("function ID related call list (updated source_id)", funcid_calls, debug_mode)
 
             for i in funcid_calls:
-                for r in result_variabledependency:
-                    if r.source_id == i:
-                        debug_detail_print(">>> call: {} <- {}, type = {}, target type = {}".format(r.source_id, r.target_id, r.type, result_variable[r.target_id-1].type), debug_mode)
-                        if r.type == 'return' and r.target_id not in funcid_calls:
+                for r in graph.dependencies(i):
+                    debug_detail_print(">>> call: {} <- {}, type = {}, target type = {}".format(r.source_id, r.target_id, r.type, result_variable[r.target_id-1].type), debug_mode)
+                    if r.type == 'return' and r.target_id not in funcid_calls:
+                        funcid_calls.append(r.target_id)
+                    elif r.type == 'parameter':
+                        if result_variable[r.target_id-1].type == 'normal' and result_variable[r.target_id-1].activation_id == 1:
+                            if r.target_id not in funcid_end and r.target_id not in funcid_copy:
+                                funcid_end.append(r.target_id)
+                        elif r.target_id not in funcid_calls:
                             funcid_calls.append(r.target_id)
-                        elif r.type == 'parameter':
-                            if result_variable[r.target_id-1].type == 'normal' and result_variable[r.target_id-1].activation_id == 1:
-                                if r.target_id not in funcid_end and r.target_id not in funcid_copy:
-                                    funcid_end.append(r.target_id)
-                            elif r.target_id not in funcid_calls:
-                                funcid_calls.append(r.target_id)
-                        elif r.type == 'direct':
-                            if result_variable[r.target_id-1].type == 'function definition':
-                                pass
-                            elif 'function' in result_variable[r.target_id-1].value and r.target_id not in funcid_copy:
-                                funcid_copy.append(r.target_id)
-                            elif result_variable[r.target_id-1].type == 'normal' and result_variable[r.target_id-1].activation_id == 1:
-                                if r.target_id not in funcid_end and r.target_id not in funcid_copy:
-                                    funcid_end.append(r.target_id)
-                            elif r.target_id not in funcid_calls:
-                                funcid_calls.append(r.target_id)
+                    elif r.type == 'direct':
+                        if result_variable[r.target_id-1].type == 'function definition':
+                            pass
+                        elif 'function' in result_variable[r.target_id-1].value and r.target_id not in funcid_copy:
+                            funcid_copy.append(r.target_id)
+                        elif result_variable[r.target_id-1].type == 'normal' and result_variable[r.target_id-1].activation_id == 1:
+                            if r.target_id not in funcid_end and r.target_id not in funcid_copy:
+                                funcid_end.append(r.target_id)
                         elif r.target_id not in funcid_calls:
                             funcid_calls.append(r.target_id)
+                    elif r.target_id not in funcid_calls:
+                        funcid_calls.append(r.target_id)
             debug_print("function ID related call list (updated source_id)", funcid_calls, debug_mode)
             debug_print("function ID end list (updated source_id)", funcid_end, debug_mode)
             debug_print("function ID list (updated source_id)", funcid_copy, debug_mode)
@@ -361,27 +351,26 @@ class Update(Command):
             loop_list = []
             cond_list = []
             for v in funcids:
-                for r in result_variabledependency:
-                    if r.source_id == v:
-                        if r.type == "loop":
-                            debug_detail_print(">>> loop: {} <- {}, type = {}".format(r.source_id, r.target_id, r.type), debug_mode)
-                            loop_list.append(r.target_id)
-                            if r.target_id not in funcids:
-                                funcids.append(r.target_id)
-                        if r.type == "conditional":
-                            debug_detail_print(">>> cond: {} <- {}, type = {}".format(r.source_id, r.target_id, r.type), debug_mode)
-                            cond_list.append(r.target_id)
-                            if result_variable[r.target_id-1].type == 'normal' and result_variable[r.target_id-1].activation_id == 1:
-                                if r.target_id not in funcid_end and r.target_id not in funcids:
-                                    funcid_end.append(r.target_id)
-                            elif r.target_id not in funcids:
-                                funcids.append(r.target_id)
+                for r in graph.dependencies(v):
+                    if r.type == "loop":
+                        debug_detail_print(">>> loop: {} <- {}, type = {}".format(r.source_id, r.target_id, r.type), debug_mode)
+                        loop_list.append(r.target_id)
+                        if r.target_id not in funcids:
+                            funcids.append(r.target_id)
+                    if r.type == "conditional":
+                        debug_detail_print(">>> cond: {} <- {}, type = {}".format(r.source_id, r.target_id, r.type), debug_mode)
+                        cond_list.append(r.target_id)
+                        if result_variable[r.target_id-1].type == 'normal' and result_variable[r.target_id-1].activation_id == 1:
+                            if r.target_id not in funcid_end and r.target_id not in funcids:
+                                funcid_end.append(r.target_id)
+                        elif r.target_id not in funcids:
+                            funcids.append(r.target_id)
             debug_print("function ID list (with loop and cond)", funcids, debug_mode)
             debug_print("loop list", loop_list, debug_mode)
             debug_print("cond list", cond_list, debug_mode)
             debug_print("variable end ID list", funcid_end, debug_mode)
 
-            activations = []
+            activations = IndexedList()
             for i in funcids:
                 actid = result_variable[i-1].activation_id
                 if actid > 1:
@@ -389,7 +378,7 @@ class Update(Command):
                         activations.append(actid)
             debug_print("activation list", activations, debug_mode)
 
-            graybox_funcid = []
+            graybox_funcid = IndexedList()
             for i in func_graybox:
                 actid = result_variable[i-1].activation_id
                 if actid in activations:
@@ -405,18 +394,16 @@ class Update(Command):
             debug_print("graybox variable list (updated)", graybox_funcid, debug_mode)
 
             # related functions' parameters
-            func_params = []
+            func_params = IndexedList()
             for v in graybox_funcid:
-                for r in result_variabledependency:
-                    if r.source_id == v:
-                        if r.type == "parameter":
-                            if result_variable[r.target_id-1].activation_id == 1 and r.target_id not in func_params:
-                                func_params.append(r.target_id)
+                for r in graph.dependencies(v, "parameter"):
+                    if result_variable[r.target_id-1].activation_id == 1 and r.target_id not in func_params:
+                        func_params.append(r.target_id)
             debug_print("function ID list (graybox updated)", funcids, debug_mode)
             debug_print("function param list", func_params, debug_mode)
-            func_params_remove = []
-            func_params_add = []
-            func_params_name = []
+            func_params_remove = IndexedList()
+            func_params_add = IndexedList()
+            func_params_name = IndexedList()
             for i in func_params:
                 func_params_name.append(result_variable[i-1].name)
 
@@ -460,7 +447,7 @@ class Update(Command):
             debug_print("function param list (updated)", func_params, debug_mode)
             debug_print("normal variable (should be added later)", normal_should_be_added, debug_mode)
 
-            related_funcdef_list = []
+            related_funcdef_list = IndexedList()
             funcids_remove = []
             for v in funcids:
                 if result_variable[v-1].activation_id != 0: 
@@ -489,8 +476,8 @@ class Update(Command):
             debug_print("function ID list (updated)", funcids, debug_mode)
 
             funcids_remove = []
-            related_func_calls = []
-            normal_funcid = []
+            related_func_calls = IndexedList()
+            normal_funcid = IndexedList()
             arg_funcid = []
             for v in funcids:
                 if result_variable[v-1].type == 'call':
@@ -512,7 +499,7 @@ class Update(Command):
 
             related_func_calls_add = []
             for v in related_func_calls:
-                same_call = check_related_call_general(result_variable[v-1].name, result_variable[v-1].line, result_variable)
+                same_call = graph.calls_at(result_variable[v-1].line)
                 related_func_calls_add += same_call
             for i in related_func_calls_add:
                 if i not in related_func_calls:
@@ -527,30 +514,28 @@ class Update(Command):
             debug_print("related funcion activation name list", related_func_calls_name, debug_mode)
             debug_print("related funcion activation line list", related_func_calls_line, debug_mode)
 
-            related_func_calls_id = []
+            related_func_calls_id = IndexedList()
             for i in range(0, len(related_func_calls_name)):
-                for j in result_functionactivation:
-                    if j.name == related_func_calls_name[i] and j.line == related_func_calls_line[i]:
-                        related_func_calls_id.append(j.id)
+                related_func_calls_id += graph.activations_at(related_func_calls_name[i], related_func_calls_line[i])
             debug_print("related funcion activation ID list", related_func_calls_id, debug_mode)
 
             # collect the second level function calls
             for i in related_func_calls_id:
-                for r in result_functionactivation:
-                    if (r.caller_id == i) and r.id not in related_func_calls_id:
+                for r in graph.callees(i):
+                    if r.id not in related_func_calls_id:
                         related_func_calls_id.append(r.id)
             debug_print("related funcion activation ID list (updated)", related_func_calls_id, debug_mode)
 
             for i in related_func_calls_id:
-                for r in result_variable:
-                    if r.name == result_functionactivation[i-1].name and r.line == result_functionactivation[i-1].line and r.activation_id == result_functionactivation[i-1].caller_id:
+                for r in graph.variables_at(result_functionactivation[i-1].name, result_functionactivation[i-1].line):
+                    if r.activation_id == result_functionactivation[i-1].caller_id:
                         if r.id not in related_func_calls:
                             related_func_calls.append(r.id)
             debug_print("related funcion activation list (update second level calls)", related_func_calls, debug_mode)
 
             related_func_calls_add_2 = []
             for v in related_func_calls:
-                same_call = check_related_call_general(result_variable[v-1].name, result_variable[v-1].line, result_variable)
+                same_call = graph.calls_at(result_variable[v-1].line)
                 related_func_calls_add_2 += same_call
             for i in related_func_calls_add_2:
                 if i not in related_func_calls:
@@ -559,24 +544,23 @@ class Update(Command):
 
             # double check whether we include all active functions' definition
             for v in related_func_calls:
-                for r in result_variabledependency:
-                    if r.source_id == v and r.type == 'direct':
-                        current_line = result_variable[r.target_id-1].line
-                        belong_funcdef = check_def_id(current_line, result_functiondef)
-                        if belong_funcdef != 0:
-                            # include all the related function definition list.
-                            if belong_funcdef not in related_funcdef_list:
-                                related_funcdef_list.append(belong_funcdef)
+                for r in graph.dependencies(v, "direct"):
+                    current_line = result_variable[r.target_id-1].line
+                    belong_funcdef = check_def_id(current_line, result_functiondef)
+                    if belong_funcdef != 0:
+                        # include all the related function definition list.
+                        if belong_funcdef not in related_funcdef_list:
+                            related_funcdef_list.append(belong_funcdef)
             debug_print("related function definition list (updated)", related_funcdef_list, debug_mode)
 
             # deal with the normal variable problem - remove irrelevant normal variable assignments
             normal_funcid.sort()
             debug_print("related normal variable list", normal_funcid, debug_mode)
-            normal_funcid_remove = []
-            normal_funcid_remove_add = []
+            normal_funcid_remove = IndexedList()
+            normal_funcid_remove_add = IndexedList()
             for i in normal_funcid:
-                for r in result_variabledependency:
-                    if r.source_id == i and r.type == "direct" and result_variable[r.target_id-1].type == 'normal':
+                for r in graph.dependencies(i, "direct"):
+                    if result_variable[r.target_id-1].type == 'normal':
                         if r.target_id not in normal_funcid and r.target_id not in func_params:
                             normal_funcid_remove.append(i)
                         elif r.target_id in normal_funcid_remove:
@@ -591,8 +575,8 @@ class Update(Command):
                 if i not in normal_funcid:
                     normal_funcid.append(i)
             for i in normal_funcid_remove_add:
-                for r in result_variabledependency:
-                    if r.source_id == i and r.type == "direct" and result_variable[r.target_id-1].type == 'normal':
+                for r in graph.dependencies(i, "direct"):
+                    if result_variable[r.target_id-1].type == 'normal':
                         if r.target_id not in normal_funcid:
                             normal_funcid.append(r.target_id)
             debug_print("related normal variable list (add back)", normal_funcid, debug_mode)
@@ -648,18 +632,18 @@ class Update(Command):
         else:
             # try to find the variable name when it first appears
             varid = []
-            varid_copy = []
+            varid_copy = IndexedList()
             for r in result_variable:
                 if r.name == given_varname and r.activation_id == 1:
                     varid.append(r.id)
                     varid_copy.append(r.id)
             debug_print("variable ID", varid, debug_mode)
 
-            varid_end = []
-            varid_calls = []
+            varid_end = IndexedList()
+            varid_calls = IndexedList()
             for v in varid_copy:
-                for r in result_variabledependency:
-                    if r.source_id == v and r.target_id not in varid_copy:
+                for r in graph.dependencies(v):
+                    if r.target_id not in varid_copy:
                         debug_detail_print(">>> target: {} <- {}, type = {}, target type = {}".format(r.source_id, r.target_id, r.type, result_variable[r.target_id-1].type), debug_mode)
                         if result_variable[r.target_id-1].type == 'function definition':
                             pass
@@ -674,7 +658,7 @@ class Update(Command):
                         else:
                             varid_copy.append(r.target_id)
                             if result_variable[r.target_id-1].type == 'call' and result_variable[r.target_id-1].activation_id == 1:
-                                same_call = check_related_call_general(result_variable[r.target_id-1].name, result_variable[r.target_id-1].line, result_variable)
+                                same_call = graph.calls_at(result_variable[r.target_id-1].line)
                                 debug_print("call in the same line", same_call, debug_mode)
                                 for i in same_call:
                                     if i not in varid_copy:
@@ -689,8 +673,8 @@ class Update(Command):
             debug_print("variable ID list (updated target_id)", varid_copy, debug_mode)
 
             for v in varid_copy:
-                for r in result_variabledependency:
-                    if r.target_id == v and r.source_id not in varid_copy:
+                for r in graph.dependents(v):
+                    if r.source_id not in varid_copy:
                         debug_detail_print(">>> source: {} -> {}, type = {}, source type = {}".format(r.target_id, r.source_id, r.type, result_variable[r.source_id-1].type), debug_mode)
                         if result_variable[r.source_id-1].type == '--blackbox--':
                             debug_detail_print(">>> PASS: source: {} -> {}, type = {},  source type = {}".format(r.target_id, r.source_id, r.type, result_variable[r.source_id-1].type), debug_mode)
@@ -704,7 +688,7 @@ class Update(Command):
                             else:
                                 varid_copy.append(r.source_id)
                                 if result_variable[r.source_id-1].type == 'call' and result_variable[r.source_id-1].activation_id == 1:
-                                    same_call = check_related_call_general(result_variable[r.source_id-1].name, result_variable[r.source_id-1].line, result_variable)
+                                    same_call = graph.calls_at(result_variable[r.source_id-1].line)
                                     debug_print("call in the same line", same_call, debug_mode)
                                     for i in same_call:
                                         if i not in varid_copy:
@@ -717,62 +701,60 @@ class Update(Command):
             debug_print("variable ID related call list (updated source_id)", varid_calls, debug_mode)
 
             for i in varid_calls:
-                for r in result_variabledependency:
-                    if r.source_id == i:
-                        debug_detail_print(">>> call: {} <- {}, type = {}, target type = {}".format(r.source_id, r.target_id, r.type, result_variable[r.target_id-1].type), debug_mode)
-                        if r.type == 'return' and r.target_id not in varid_calls:
-                            varid_calls.append(r.target_id)
-                        elif r.type == 'parameter':
-                            if result_variable[r.target_id-1].type == 'normal' and result_variable[r.target_id-1].activation_id == 1:
-                                if r.target_id not in varid_end and r.target_id not in varid_copy:
-                                    varid_end.append(r.target_id)
-                            elif r.target_id not in varid_calls:
-                                varid_calls.append(r.target_id)
-                        elif r.type == 'direct':
-                            if result_variable[r.target_id-1].type == 'function definition':
-                                pass
-                            elif 'function' in result_variable[r.target_id-1].value and r.target_id not in varid_copy:
-                                varid_copy.append(r.target_id)
-                            elif result_variable[r.target_id-1].type == 'normal' and result_variable[r.target_id-1].activation_id == 1:
-                                if r.target_id not in varid_end and r.target_id not in varid_copy:
-                                    varid_end.append(r.target_id)
-                            elif r.target_id not in varid_calls: 
-                                varid_calls.append(r.target_id)
+                for r in graph.dependencies(i):
+                    debug_detail_print(">>> call: {} <- {}, type = {}, target type = {}".format(r.source_id, r.target_id, r.type, result_variable[r.target_id-1].type), debug_mode)
+                    if r.type == 'return' and r.target_id not in varid_calls:
+                        varid_calls.append(r.target_id)
+                    elif r.type == 'parameter':
+                        if result_variable[r.target_id-1].type == 'normal' and result_variable[r.target_id-1].activation_id == 1:
+                            if r.target_id not in varid_end and r.target_id not in varid_copy:
+                                varid_end.append(r.target_id)
                         elif r.target_id not in varid_calls:
                             varid_calls.append(r.target_id)
+                    elif r.type == 'direct':
+                        if result_variable[r.target_id-1].type == 'function definition':
+                            pass
+                        elif 'function' in result_variable[r.target_id-1].value and r.target_id not in varid_copy:
+                            varid_copy.append(r.target_id)
+                        elif result_variable[r.target_id-1].type == 'normal' and result_variable[r.target_id-1].activation_id == 1:
+                            if r.target_id not in varid_end and r.target_id not in varid_copy:
+                                varid_end.append(r.target_id)
+                        elif r.target_id not in varid_calls: 
+                            varid_calls.append(r.target_id)
+                    elif r.target_id not in varid_calls:
+                        varid_calls.append(r.target_id)
             debug_print("variable ID related call list (updated call)", varid_calls, debug_mode)
             debug_print("variable ID end list (updated call)", varid_end, debug_mode)
             debug_print("variable ID list (updated call)", varid_copy, debug_mode)
 
             varids = varid_copy
 
-            loop_list = [] # iterative variable, such as i and j
-            loop_base_list = [] # variable in loop
+            loop_list = IndexedList() # iterative variable, such as i and j
+            loop_base_list = IndexedList() # variable in loop
             cond_list = []
             for v in varids:
-                for r in result_variabledependency:
-                    if r.source_id == v:
-                        if r.type == "loop":
-                            debug_detail_print(">>> loop: {} <- {}, type = {}".format(r.source_id, r.target_id, r.type), debug_mode)
-                            loop_list.append(r.target_id)
-                            loop_base_list.append(r.source_id)
-                            if r.target_id not in varids:
-                                varids.append(r.target_id)
-                        if r.type == "conditional":
-                            debug_detail_print(">>> cond: {} <- {}, type = {}".format(r.source_id, r.target_id, r.type), debug_mode)
-                            cond_list.append(r.target_id)
-                            if result_variable[r.target_id-1].type == 'normal' and result_variable[r.target_id-1].activation_id == 1:
-                                if r.target_id not in varid_end and r.target_id not in varids:
-                                    varid_end.append(r.target_id)
-                            elif r.target_id not in varids:
-                                varids.append(r.target_id)
+                for r in graph.dependencies(v):
+                    if r.type == "loop":
+                        debug_detail_print(">>> loop: {} <- {}, type = {}".format(r.source_id, r.target_id, r.type), debug_mode)
+                        loop_list.append(r.target_id)
+                        loop_base_list.append(r.source_id)
+                        if r.target_id not in varids:
+                            varids.append(r.target_id)
+                    if r.type == "conditional":
+                        debug_detail_print(">>> cond: {} <- {}, type = {}".format(r.source_id, r.target_id, r.type), debug_mode)
+                        cond_list.append(r.target_id)
+                        if result_variable[r.target_id-1].type == 'normal' and result_variable[r.target_id-1].activation_id == 1:
+                            if r.target_id not in varid_end and r.target_id not in varids:
+                                varid_end.append(r.target_id)
+                        elif r.target_id not in varids:
+                            varids.append(r.target_id)
             debug_print("variable ID (with loop and cond)", varids, debug_mode)
             debug_print("loop list", loop_list, debug_mode)
             debug_print("loop base list", loop_base_list, debug_mode)
             debug_print("cond list", cond_list, debug_mode)
             debug_print("variable end ID list", varid_end, debug_mode)
 
-            activations = []
+            activations = IndexedList()
             for i in varid_calls:
                 actid = result_variable[i-1].activation_id
                 if actid > 1:
@@ -780,7 +762,7 @@ class Update(Command):
                         activations.append(actid)
             debug_print("activation list", activations, debug_mode)
 
-            graybox_varid = []
+            graybox_varid = IndexedList()
             for i in func_graybox:
                 actid = result_variable[i-1].activation_id
                 if actid in activations:
@@ -796,19 +778,17 @@ class Update(Command):
             debug_print("graybox variable list", graybox_varid, debug_mode)
 
             # related functions' parameters
-            func_params = []
+            func_params = IndexedList()
             for v in graybox_varid:
-                for r in result_variabledependency:
-                    if r.source_id == v:
-                        if r.type == "parameter":
-                            if result_variable[r.target_id-1].activation_id == 1 and r.target_id not in func_params:
-                                func_params.append(r.target_id)
+                for r in graph.dependencies(v, "parameter"):
+                    if result_variable[r.target_id-1].activation_id == 1 and r.target_id not in func_params:
+                        func_params.append(r.target_id)
             debug_print("var ID list (graybox updated)", varids, debug_mode)
             debug_print("function param list", func_params, debug_mode)
 
-            func_params_remove = []
-            func_params_add = []
-            func_params_name = []
+            func_params_remove = IndexedList()
+            func_params_add = IndexedList()
+            func_params_name = IndexedList()
             for i in func_params:
                 func_params_name.append(result_variable[i-1].name)
 
@@ -863,14 +843,14 @@ class Update(Command):
 
             for i in params_need_trace_back:
                 func_params.remove(i)
-                for r in result_variabledependency:
-                    if r.source_id == i and r.type == 'direct' and result_variable[r.target_id-1].type == 'normal':
+                for r in graph.dependencies(i, "direct"):
+                    if result_variable[r.target_id-1].type == 'normal':
                         if r.target_id not in loop_list and r.target_id not in func_params:
                             func_params.append(r.target_id)
             debug_print("function param list (trace back)", func_params, debug_mode)
 
 
-            related_funcdef_list = []
+            related_funcdef_list = IndexedList()
             varids_remove = []
             for v in varids:
                 if result_variable[v-1].activation_id != 0:
@@ -899,8 +879,8 @@ class Update(Command):
             debug_print("var ID list (updated)", varids, debug_mode)
 
             varids_remove = []
-            related_func_calls = []
-            normal_varid = []
+            related_func_calls = IndexedList()
+            normal_varid = IndexedList()
             arg_varid = []
             for v in varids:
                 if result_variable[v-1].type == 'call':
@@ -923,7 +903,7 @@ class Update(Command):
 
             related_func_calls_add = []
             for v in related_func_calls:
-                same_call = check_related_call_general(result_variable[v-1].name, result_variable[v-1].line, result_variable)
+                same_call = graph.calls_at(result_variable[v-1].line)
                 related_func_calls_add += same_call
             for i in related_func_calls_add:
                 if i not in related_func_calls:
@@ -938,30 +918,28 @@ class Update(Command):
             debug_print("related funcion activation name list", related_func_calls_name, debug_mode)
             debug_print("related funcion activation line list", related_func_calls_line, debug_mode)
 
-            related_func_calls_id = []
+            related_func_calls_id = IndexedList()
             for i in range(0, len(related_func_calls_name)):
-                for j in result_functionactivation:
-                    if j.name == related_func_calls_name[i] and j.line == related_func_calls_line[i]:
-                        related_func_calls_id.append(j.id)
+                related_func_calls_id += graph.activations_at(related_func_calls_name[i], related_func_calls_line[i])
             debug_print("related funcion activation ID list", related_func_calls_id, debug_mode)
 
             # collect the second level function calls
             for i in related_func_calls_id:
-                for r in result_functionactivation:
-                    if (r.caller_id == i) and r.id not in related_func_calls_id:
+                for r in graph.callees(i):
+                    if r.id not in related_func_calls_id:
                         related_func_calls_id.append(r.id)
             debug_print("related funcion activation ID list (updated)", related_func_calls_id, debug_mode)
 
             for i in related_func_calls_id:
-                for r in result_variable:
-                    if r.name == result_functionactivation[i-1].name and r.line == result_functionactivation[i-1].line and r.activation_id == result_functionactivation[i-1].caller_id:
+                for r in graph.variables_at(result_functionactivation[i-1].name, result_functionactivation[i-1].line):
+                    if r.activation_id == result_functionactivation[i-1].caller_id:
                         if r.id not in related_func_calls:
                             related_func_calls.append(r.id)
             debug_print("related funcion activation list (update second level calls)", related_func_calls, debug_mode)
 
             related_func_calls_add_2 = []
             for v in related_func_calls:
-                same_call = check_related_call_general(result_variable[v-1].name, result_variable[v-1].line, result_variable)
+                same_call = graph.calls_at(result_variable[v-1].line)
                 related_func_calls_add_2 += same_call
             for i in related_func_calls_add_2:
                 if i not in related_func_calls:
@@ -971,24 +949,23 @@ class Update(Command):
 
             # double check whether we include all active functions' definition
             for v in related_func_calls:
-                for r in result_variabledependency:
-                    if r.source_id == v and r.type == 'direct':
-                        current_line = result_variable[r.target_id-1].line
-                        belong_funcdef = check_def_id(current_line, result_functiondef)
-                        if belong_funcdef != 0:
-                            # include all the related function definition list.
-                            if belong_funcdef not in related_funcdef_list:
-                                related_funcdef_list.append(belong_funcdef)
+                for r in graph.dependencies(v, "direct"):
+                    current_line = result_variable[r.target_id-1].line
+                    belong_funcdef = check_def_id(current_line, result_functiondef)
+                    if belong_funcdef != 0:
+                        # include all the related function definition list.
+                        if belong_funcdef not in related_funcdef_list:
+                            related_funcdef_list.append(belong_funcdef)
             debug_print("related function definition list (updated)", related_funcdef_list, debug_mode)
 
             # deal with the normal variable problem - remove irrelevant normal variable assignments
             normal_varid.sort()
             debug_print("related normal variable list", normal_varid, debug_mode)
-            normal_varid_remove = []
-            normal_varid_remove_add = []
+            normal_varid_remove = IndexedList()
+            normal_varid_remove_add = IndexedList()
             for i in normal_varid:
-                for r in result_variabledependency:
-                    if r.source_id == i and r.type == "direct" and result_variable[r.target_id-1].type == 'normal':
+                for r in graph.dependencies(i, "direct"):
+                    if result_variable[r.target_id-1].type == 'normal':
                         if r.target_id not in normal_varid and r.target_id not in func_params:
                             normal_varid_remove.append(i)
                         elif r.target_id in normal_varid_remove:
@@ -1004,8 +981,8 @@ class Update(Command):
                 if i not in normal_varid:
                     normal_varid.append(i)
             for i in normal_varid_remove_add:
-                for r in result_variabledependency:
-                    if r.source_id == i and r.type == "direct" and result_variable[r.target_id-1].type == 'normal':
+                for r in graph.dependencies(i, "direct"):
+                    if result_variable[r.target_id-1].type == 'normal':
                         if r.target_id not in normal_varid:
                             normal_varid.append(r.target_id)
             debug_print("related normal variable list (add back)", normal_varid, debug_mode)
@@ -1060,12 +1037,69 @@ class Update(Command):
                     line_list[add_line].append(i)
 
         debug_print("FINAL param list", func_params, debug_mode)
+
+        variables = {}
+        for i in list(func_params) + normal_should_be_added:
+            tmp = result_variable[i-1]
+            variables[i] = (tmp.name, tmp.value)
+
+        return {
+            "func_defs": func_defs_update,
+            "var_defs": var_defs,
+            "func_params": list(func_params),
+            "normal_should_be_added": normal_should_be_added,
+            "line_list": line_list,
+            "variables": variables,
+        }
+
+    def cached_values(self, script, variables):
+        """Return dict of variable id -> expression that loads its pickled
+        value, for variables of expensive statements that did not change
+        """
+        result = {}
+        values = StatementValue.load_values(self.trial.id)
+        for i in variables:
+            if i not in values:
+                continue
+            line, source_hash, content_hash = values[i]
+            if statement_hash(linecache.getline(script, line)) != source_hash:
+                continue
+            result[i] = "{}({!r})".format(
+                VALUE_LOADER_NAME, str(StatementValue.spill(content_hash)))
+        return result
+
+    def write_provscript(self, script, result):
+        """Write ProvScript.py from a slice computed by collect_slice"""
+        variables = result["variables"]
+        line_list = result["line_list"]
+
+        origin_file = open(script, "r")
+        ### open a new file to store sub script
+        update_file = open("ProvScript.py", "w")
+
+        ### function definition bound
+        update_file.write("# This is the function declaration part\n")
+        update_file.write("# - Your previous script contains the following function definitions:\n")
+        func_defs_update = result["func_defs"]
+        func_defs_str = ""
+        for f in func_defs_update:
+            func_defs_str = func_defs_str + '###' + f + '\n'
+        update_file.write(func_defs_str)
+
+        update_file.write("# This is the global variable declaration part\n")
+        update_file.write("# - Your previous script contains the following global variable:\n")
+        var_defs_str = ""
+        for f in result["var_defs"]:
+            var_defs_str = var_defs_str + '###' + f + '\n'
+        update_file.write(var_defs_str)
+
+        cached = self.cached_values(script, variables)
         param_name = []
         param_value = []
-        for i in func_params:
-            tmp = result_variable[i-1]
-            param_name.append(tmp.name)
-            param_value.append(tmp.value)
+        for i in result["func_params"]:
+            name, value = variables[i]
+            param_name.append(name)
+            param_value.append(cached.get(i, value))
 
         ### function param setup
         update_file.write("\n# This is the parameter setup part\n# - We are going to setup the function parameters to make this script runnable\n# - Change the following values is useless\n")
@@ -1079,9 +1113,27 @@ class Update(Command):
                 ### haha, this is import module part!
                 update_file.write(line)
 
+        ### restore pickled values of expensive statements
+        if cached:
+            update_file.write(VALUE_LOADER)
+
         ### write param setup to file
-        for i in range(0,len(func_params)):
+        cached_params = {
+            index for index, i in enumerate(result["func_params"])
+            if i in cached
+        }
+        for i in range(0,len(param_name)):
             string_value = str(param_value[i])
+            if i in cached_params:
+                update_file.write("{} = {}\n".format(
+                    param_name[i], string_value))
+                continue
+            if is_summary(string_value):
+                update_file.write(
+                    "# {} = {}\n# The value exceeded the --value-budget of "
+                    "the trial. Please set it up\n".format(
+                        param_name[i], string_value))
+                continue
             if "array" in string_value:
                 update_file.write("import numpy\n")
                 string_value = "numpy." + string_value
@@ -1104,15 +1156,18 @@ class Update(Command):
         for i in line_keylist:
             if i != 0:
                 if line_list[i] == 0:    
-                    content = linecache.getline(metascript.name, i)
+                    content = linecache.getline(script, i)
                     content_comment = content.rstrip() + ' #####L' + str(i) + '\n'
                     update_file.write(content_comment)
                 else:
                     content_comment = "# The previous script does something here, but we ignore them here\n"
                     for j in line_list[i]:
-                        tmp = result_variable[j-1]
-                        content_comment += "{} = {}\n".format(tmp.name, tmp.value)
+                        name, value = variables[j]
+                        value = cached.get(j, value)
+                        if is_summary(value):
+                            content_comment += "# "
+                        content_comment += "{} = {}\n".format(name, value)
                     content_comment += "# Please check the previous script\n"
                     update_file.write(content_comment)
 
-        update_file.close()
+        update_file.close()
\ No newline at end of file
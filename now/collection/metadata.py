@@ -23,6 +23,7 @@ from ..persistence.lightweight import ModuleLW, DependencyLW
 from ..persistence.lightweight import ActivationLW, ObjectValueLW
 from ..persistence.lightweight import FileAccessLW, VariableLW
 from ..persistence.lightweight import VariableUsageLW, VariableDependencyLW
+from ..persistence.lightweight import VariableFoldLW, StatementValueLW
 from ..utils import io
 
 from .prov_definition.definition import Definition
@@ -61,6 +62,8 @@ class Metascript(object):
         self.variables_store = ObjectStore(VariableLW)
         self.variables_dependencies_store = ObjectStore(VariableDependencyLW)
         self.usages_store = ObjectStore(VariableUsageLW)
+        self.folds_store = ObjectStore(VariableFoldLW)
+        self.statement_values_store = ObjectStore(StatementValueLW)
 
         # Definition object : Definition
         self.definition = Definition(self)
@@ -104,6 +107,10 @@ class Metascript(object):
 
         # Bypass module check : bool
         self.bypass_modules = False
+        # Reuse modules found for the same script and sys.path : bool
+        self.deployment_cache = True
+        # Threads that find module versions and hashes : int
+        self.module_workers = 4
 
         # Depth for capturing function activations : int
         self.depth = sys.getrecursionlimit()
@@ -117,6 +124,22 @@ class Metascript(object):
         self.save_frequency = 1000
         # Save after closing X activations
         self.call_storage_frequency = 0
+        # Partial saves waiting for the writer thread. 0 saves inline : int
+        self.store_queue_size = 4
+        # Reuse content hashes of files with known fingerprints : bool
+        self.fingerprint_cache = True
+        # Frames with traced events : ["all", "user"]
+        self.trace_scope = "all"
+        # Fold the middle iterations of loops : bool
+        self.compact_loops = False
+        # First and last iterations of compacted loops : int
+        self.loop_head = 10
+        self.loop_tail = 10
+        # Summarize values of variables outside the main activation : bool
+        self.defer_values = False
+        # Pickle values of top-level statements with calls that took at
+        # least value_cache seconds. None disables it : float
+        self.value_cache = None
 
         # Passed arguments : str
         self.command = ""
@@ -262,13 +285,26 @@ class Metascript(object):
         self.disasm = args.disasm
         self.disasm0 = args.disasm0
         self.bypass_modules = args.bypass_modules
+        self.deployment_cache = args.deployment_cache
+        self.module_workers = args.module_workers
 
         self.depth = args.depth
         self.non_user_depth = args.non_user_depth
         self.execution_provenance = args.execution_provenance
         self.save_frequency = args.save_frequency
         self.call_storage_frequency = args.call_storage_frequency
-
+        self.store_queue_size = args.store_queue_size
+        self.fingerprint_cache = args.fingerprint_cache
+        self.trace_scope = args.trace_scope
+        self.compact_loops = args.compact_loops
+        self.loop_head = args.loop_head
+        self.loop_tail = args.loop_tail
+        self.defer_values = args.defer_values
+        self.value_cache = args.value_cache
+
+        persistence_config.synchronous = args.synchronous
+        persistence_config.cache_size = args.cache_size
+        persistence_config.content_compression = args.content_compression
         io.print_msg("setting up local provenance store")
         persistence_config.connect(self.dir)
         return self
@@ -7,20 +7,28 @@
 from __future__ import (absolute_import, print_function,
                         division, unicode_literals)
 
+import hashlib
 import importlib
 import modulefinder
 import os
 import platform
 import socket
 import sys
+import time
 import weakref
 import getpass
 import pkg_resources
 
+from multiprocessing.pool import ThreadPool
+
 from future.utils import viewitems
 from future.builtins import map as cvmap
 
 from ...persistence.models import EnvironmentAttr, Module, Dependency
+from ...persistence.models import DeploymentCache, EnvironmentSnapshot
+from ...persistence.models.environment_snapshot import VOLATILE_ATTRS
+from ...persistence.models.environment_snapshot import environment_hash
+from ...persistence.content_database import file_fingerprint, RACY_SECONDS
 from ...persistence import content
 from ...utils.io import print_msg, redirect_output
 from ...utils.metaprofiler import meta_profiler
@@ -77,11 +85,65 @@ class Deployment(object):
     @meta_profiler("modules")
     def _collect_modules_provenance(self):
         with redirect_output():
+            key = cached = None
+            if self.metascript.deployment_cache:
+                key = self._deployment_key()
+                cached = self._load_cached_modules(key)
+            if cached is not None:
+                print_msg("  registering provenance from {} cached modules"
+                          .format(len(cached)))
+                self._register_modules(cached)
+                return
+
             modules = self._find_modules()
 
             print_msg("  registering provenance from {} modules".format(
                 len(modules) - 1))
-            self._extract_modules_provenance(modules)
+            found = self._extract_modules_provenance(modules)
+            if key is not None and found is not None:
+                DeploymentCache.store_modules(
+                    key, self.metascript.trial_id, found)
+
+    def _deployment_key(self):
+        """Return key of the modules found for the script
+        It depends on the interpreter, the script code, and the modification
+        times of sys.path entries. The script directory is not part of it,
+        since scripts often write files there. Fingerprints of cached
+        modules validate local modules instead
+        """
+        metascript = self.metascript
+        script_dir = os.path.dirname(os.path.realpath(metascript.path))
+        sha1 = hashlib.sha1()
+        with open(metascript.path, "rb") as fil:
+            sha1.update(fil.read())
+        parts = [sys.executable, sys.version, os.path.realpath(metascript.path)]
+        for entry in sys.path:
+            path = os.path.realpath(entry or os.curdir)
+            if path == script_dir:
+                continue
+            try:
+                mtime = os.stat(path).st_mtime
+            except OSError:
+                mtime = None
+            parts.append("{}:{}".format(path, mtime))
+        sha1.update("\n".join(parts).encode("utf-8"))
+        return sha1.hexdigest()
+
+    @meta_profiler("load_modules")
+    def _load_cached_modules(self, key):                                        # pylint: disable=no-self-use
+        """Return cached modules of key if their files did not change"""
+        cached = DeploymentCache.load_modules(key)
+        if cached is None:
+            return None
+        for _, _, path, _, fingerprint in cached:
+            if path is None:
+                continue
+            try:
+                if file_fingerprint(os.stat(path)) != tuple(fingerprint):
+                    return None
+            except OSError:
+                return None
+        return cached
 
     @meta_profiler("find_modules")
     def _find_modules(self):
@@ -114,29 +176,81 @@ class Deployment(object):
 
     @meta_profiler("extract_modules")
     def _extract_modules_provenance(self, python_modules):
-        """Return a set of module dependencies in the form:
-            (name, version, path, code_hash)
+        """Find versions and hashes of modules on a worker pool
         Store module provenance in the content database
+
+        Return list of (name, version, path, code_hash, fingerprint)
+        or None if a module file changed during the lookup
+        """
+        names = [
+            (name, module.__file__)
+            for name, module in viewitems(python_modules)
+            if name != "__main__"
+        ]
+        workers = self.metascript.module_workers
+        pool = ThreadPool(workers) if workers > 1 else None
+        imap = pool.imap if pool is not None else cvmap
+        found = []
+        cacheable = True
+        try:
+            for name, module_version, path, data, fingerprint in imap(
+                    self._inspect_module, names):
+                if module_version is None:
+                    # Importing modules must run in the main thread
+                    module_version = self._declared_version(name)
+                code_hash = None if data is None else content.put(data)
+                if path is not None and fingerprint is None:
+                    cacheable = False
+                found.append(
+                    (name, module_version, path, code_hash, fingerprint))
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+        self._register_modules(found)
+        return found if cacheable else None
+
+    def _inspect_module(self, name_path):
+        """Return (name, version, path, content, fingerprint) of module
+        Run it on worker threads. The version is None if it requires an import
+        The fingerprint is None if the file was modified too recently
+        """
+        name, path = name_path
+        module_version = self._distribution_version(name)
+        if path is None:
+            return name, module_version, path, None, None
+        stat = os.stat(path)
+        with open(path, "rb") as fil:
+            data = fil.read()
+        fingerprint = None
+        if time.time() - stat.st_mtime >= RACY_SECONDS:
+            fingerprint = file_fingerprint(stat)
+        return name, module_version, path, data, fingerprint
+
+    def _register_modules(self, found):
+        """Add modules and dependencies to the metascript stores
+
+        Arguments:
+        found -- list of (name, version, path, code_hash, fingerprint)
         """
         metascript = self.metascript
         modules = metascript.modules_store
         dependencies = metascript.dependencies_store
         modules.id = Module.id_seq()
-        for name, module in viewitems(python_modules):
-            if name != "__main__":
-                module_version = self.get_version(name)
-                path = module.__file__
-                if path is None:
-                    code_hash = None
-                else:
-                    with open(path, "rb") as fil:
-                        code_hash = content.put(fil.read())
-                info = (name, module_version, path, code_hash)
-                mid = Module.fast_load_module_id(*info) or modules.add(*info)
-                dependencies.add(mid)
+        for name, module_version, path, code_hash, _ in found:
+            info = (name, module_version, path, code_hash)
+            mid = Module.fast_load_module_id(*info) or modules.add(*info)
+            dependencies.add(mid)
 
-    def get_version(self, module_name):                                         # pylint: disable=no-self-use
+    def get_version(self, module_name):
         """Get module version"""
+        module_version = self._distribution_version(module_name)
+        if module_version is None:
+            module_version = self._declared_version(module_name)
+        return module_version
+
+    def _distribution_version(self, module_name):                               # pylint: disable=no-self-use
+        """Get version of built-in module or of its package distribution"""
         # Check built-in module
         if module_name in sys.builtin_module_names:
             return platform.python_version()
@@ -147,7 +261,10 @@ class Deployment(object):
             return pkg_resources.get_distribution(module_name).version
         except Exception:                                                        # pylint: disable=broad-except
             pass
+        return None
 
+    def _declared_version(self, module_name):                                   # pylint: disable=no-self-use
+        """Get version that the module declares"""
         # Check explicitly declared module version
         try:
             module = importlib.import_module(module_name)
@@ -191,7 +308,17 @@ class Deployment(object):
         tid = metascript.trial_id
         # Remove after save
         partial = True
-        EnvironmentAttr.fast_store(tid, metascript.environment_attrs_store,
-                                   partial)
+        attrs = metascript.environment_attrs_store
+        snapshot_hash = environment_hash(attrs.values())
+        owner_id = EnvironmentSnapshot.find_owner(snapshot_hash)
+        if owner_id is None:
+            owner_id = tid
+        else:
+            # The owner stored the other attributes
+            for aid, attr in list(attrs.items()):
+                if attr is not None and attr.name not in VOLATILE_ATTRS:
+                    attrs.pop(aid)
+        EnvironmentAttr.fast_store(tid, attrs, partial)
+        EnvironmentSnapshot.fast_store_snapshot(tid, snapshot_hash, owner_id)
         Module.fast_store(tid, metascript.modules_store, partial)
         Dependency.fast_store(tid, metascript.dependencies_store, partial)
@@ -47,6 +47,20 @@ class ExecutionProvider(object):
         """Call this function when trace event is not defined"""
         pass
 
+    def instrument(self, counters):
+        """Wrap hot paths with HotPathCounters counters
+        Count and time each event type and the argument capture.
+        Count, time, and measure the serialized values
+        """
+        event_map = self.event_map
+        for event, handler in list(event_map.items()):
+            event_map[event] = counters.timed("event." + event, handler)
+        empty = counters.timed("event.other", self.trace_empty)
+        event_map.default_factory = lambda: empty
+        self.serialize = counters.sized("serialize", self.serialize)
+        captor = self.argument_captor
+        captor.capture = counters.timed("arguments.capture", captor.capture)
+
     def store(self, partial=False):
         """Store provenance. Override it on subclasses"""
         pass
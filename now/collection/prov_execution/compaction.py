@@ -0,0 +1,195 @@
+# Copyright (c) 2018, 2019, 2020 President and Fellows of Harvard College.
+# This file is part of ProvBuild.
+
+"""Loop compaction. Fold the middle iterations of loops"""
+from __future__ import (absolute_import, print_function,
+                        division, unicode_literals)
+
+from collections import deque
+
+from future.utils import viewitems
+
+
+class LoopWindow(object):                                                        # pylint: disable=too-many-instance-attributes, too-few-public-methods
+    """Compaction state of an ActivationLoop"""
+
+    def __init__(self):
+        # Number of started iterations
+        self.iterations = 0
+        # Store ids before each pending iteration.
+        # Pending iterations may still be folded
+        self.marks = deque()
+        # Map of (name, line) to summary variable
+        self.summaries = {}
+        # Map of folded variable id to summary variable
+        self.redirect = {}
+        # Folded variable ids of the last folded iterations
+        self.folded = deque()
+        # Dependencies and usages that reference summary variables
+        self.edges = set()
+        self.uses = set()
+
+
+class LoopCompactor(object):
+    """Record the first head and last tail iterations of loops
+
+    Fold variables that the other iterations create in the loop activation
+    into one summary variable per (name, line). The summary keeps the value
+    of the last folded iteration and a VariableFold counts its iterations.
+    Dependencies and usages of folded variables move to the summaries,
+    without duplicates. Thus, the line-level slice is preserved.
+
+    Variables of an iteration are folded when it leaves the window of the
+    last tail iterations. Then, the only references to them are in pending
+    iterations and in the activation context, which are rewritten.
+    Rows saved by partial stores before the fold are kept
+    """
+
+    def __init__(self, tracer, head, tail):
+        self.variables = tracer.variables
+        self.dependencies = tracer.dependencies
+        self.usages = tracer.usages
+        self.folds = tracer.folds
+        self.head = head
+        self.tail = tail
+        # Map of summary variable id to VariableFoldLW
+        self.fold_rows = {}
+
+    def marks(self):
+        """Return last ids of variables, dependencies, and usages"""
+        return (self.variables.id, self.dependencies.id, self.usages.id)
+
+    def start_iteration(self, activation, loop):
+        """Start a new iteration of loop. Fold iterations out of the window"""
+        window = loop.window
+        if window is None:
+            window = loop.window = LoopWindow()
+        if window.iterations >= self.head:
+            window.marks.append(self.marks())
+        window.iterations += 1
+        # The current iteration is pending, but not complete
+        while len(window.marks) > self.tail + 1:
+            start = window.marks.popleft()
+            self.fold(activation, loop, start, window.marks[0])
+
+    def close_loop(self, activation, loop):
+        """Fold remaining iterations out of the window and release loop"""
+        window = loop.window
+        if window is None:
+            return
+        end = self.marks()
+        while len(window.marks) > self.tail:
+            start = window.marks.popleft()
+            self.fold(activation, loop, start,
+                      window.marks[0] if window.marks else end)
+        if window.marks and window.redirect:
+            self.rewrite(window, window.marks[0], end)
+        loop.window = None
+
+    def fold(self, activation, loop, start, end):                               # pylint: disable=too-many-locals
+        """Fold variables of the loop activation created between marks"""
+        window = loop.window
+        loop_def = loop.loop_def
+        first_line, last_line = loop_def.first_line, loop_def.last_line
+        variables, folds, fold_rows = self.variables, self.folds, self.fold_rows
+        summaries, redirect = window.summaries, window.redirect
+        activation_id = activation.id
+        folded = []
+        for vid in range(start[0] + 1, end[0] + 1):
+            variable = variables.store.get(vid)
+            if (variable is None or variable.activation_id != activation_id or
+                    not first_line <= variable.line <= last_line):
+                continue
+            key = (variable.name, variable.line)
+            summary = summaries.get(key)
+            if summary is None:
+                summaries[key] = variable
+                if vid not in fold_rows:
+                    fold_rows[vid] = folds.add_object(activation_id, vid, 1)
+                continue
+            row = fold_rows.pop(vid, None)
+            if row is not None:
+                # Variable summarizes an inner loop
+                fold_rows[summary.id].iterations += row.iterations
+                folds.pop(row.id)
+            else:
+                fold_rows[summary.id].iterations += 1
+            summary.value = variable.value
+            summary.time = variable.time
+            redirect[vid] = summary
+            folded.append(vid)
+            variables.pop(vid)
+
+        window.folded.append(folded)
+        self.rewrite(window, start, end)
+        self.redirect_context(activation, redirect, folded)
+        # Pending iterations cannot reference older folded variables
+        while len(window.folded) > self.tail + 1:
+            for vid in window.folded.popleft():
+                del redirect[vid]
+
+    def rewrite(self, window, start, end):
+        """Move dependencies and usages created between marks to summaries
+        Remove the duplicated ones
+        """
+        redirect, edges, uses = window.redirect, window.edges, window.uses
+        dependencies, usages = self.dependencies, self.usages
+        for did in range(start[1] + 1, end[1] + 1):
+            dependency = dependencies.store.get(did)
+            if dependency is None:
+                continue
+            source = redirect.get(dependency.source_id)
+            target = redirect.get(dependency.target_id)
+            if source is None and target is None:
+                continue
+            if source is not None:
+                dependency.source_activation_id = source.activation_id
+                dependency.source_id = source.id
+            if target is not None:
+                dependency.target_activation_id = target.activation_id
+                dependency.target_id = target.id
+            key = (dependency.source_id, dependency.target_id, dependency.type)
+            if key in edges:
+                dependencies.pop(did)
+            else:
+                edges.add(key)
+
+        for uid in range(start[2] + 1, end[2] + 1):
+            usage = usages.store.get(uid)
+            if usage is None:
+                continue
+            variable = redirect.get(usage.variable_id)
+            if variable is None:
+                continue
+            usage.variable_id = variable.id
+            key = (usage.activation_id, variable.id, usage.line, usage.ctx)
+            if key in uses:
+                usages.pop(uid)
+            else:
+                uses.add(key)
+
+    @staticmethod
+    def redirect_context(activation, redirect, folded):
+        """Replace folded variables in the activation slicing state"""
+        if not folded:
+            return
+        get = redirect.get
+
+        def replace(value):
+            """Return summary of variable or ActivationSlicing"""
+            if hasattr(value, "call_var"):
+                return value._replace(
+                    call_var=get(value.call_var.id, value.call_var),
+                    return_var=get(value.return_var.id, value.return_var))
+            return get(value.id, value)
+
+        for context in [activation.context] + [
+                loop.temp_context for loop in activation.loops]:
+            for name, value in list(viewitems(context)):
+                context[name] = replace(value)
+        for loop in activation.loops:
+            loop.iter_var = [replace(var) for var in loop.iter_var]
+            loop.iterable = [(replace(var), typ) for var, typ in loop.iterable]
+        for condition in activation.conditions + activation.permanent_conditions:
+            condition.test_var = [
+                (replace(var), typ) for var, typ in condition.test_var]
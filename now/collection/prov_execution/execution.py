@@ -12,7 +12,7 @@ import weakref
 
 from ...utils.cross_version import cross_compile
 from ...utils.io import print_msg
-from ...utils.metaprofiler import meta_profiler
+from ...utils.metaprofiler import meta_profiler, hot_counters
 
 from .debugger import debugger_builtins
 from .profiler import Profiler
@@ -38,6 +38,8 @@ class Execution(object):
         glob = globals()
         provider_cls = glob.get(metascript.execution_provenance, Profiler)
         self.provider = provider_cls(metascript)
+        if hot_counters.active:
+            self.provider.instrument(hot_counters)
 
     # ToDo #76: Processor load. Should be collected from time to time
     #                         (there are static and dynamic metadata)
@@ -19,6 +19,8 @@ from datetime import datetime
 
 from ...persistence import content
 from ...persistence.models import Activation, ObjectValue, FileAccess, Trial
+from ...persistence.models import FileFingerprint
+from ...persistence.writer import AsyncWriter
 from ...utils.cross_version import builtins
 
 from .base import ExecutionProvider
@@ -79,6 +81,10 @@ class Profiler(ExecutionProvider):
         io.open = self.new_open(io.open)
         codecs.open = self.new_open(codecs.open)
         os.open = self.new_open(os.open, osopen=True)
+        # Reuse content hashes of unchanged files from previous trials
+        content.use_fingerprints = self.metascript.fingerprint_cache
+        if content.use_fingerprints:
+            content.fingerprints = FileFingerprint.load_fingerprints()
 
         # the number of user functions activated
         #   (starts with -1 to compensate the first call to the script itself)
@@ -109,6 +115,9 @@ class Profiler(ExecutionProvider):
         self.save_frequency = self.metascript.save_frequency / 1000.0
         self.call_storage_frequency = self.metascript.call_storage_frequency
         self.closed_activations = 0
+        self.writer = None
+        if self.metascript.store_queue_size:
+            self.writer = AsyncWriter(self.metascript.store_queue_size)
 
         self.timer = time.time
         self.last_time = self.timer()
@@ -154,11 +163,8 @@ class Profiler(ExecutionProvider):
                 file_access = self.file_accesses[fid]
 
                 if os.path.exists(name):
-                    # Read previous content if file exists
-                    with content.std_open(name, "rb") as fil:
-                        file_access.content_hash_before = content.put(
-                            fil.read()
-                        )
+                    # Hash previous content if file exists
+                    file_access.content_hash_before = content.put_path(name)
 
                 # Update with the informed keyword arguments (mode / buffering)
                 file_access.update(kwargs)
@@ -230,8 +236,8 @@ class Profiler(ExecutionProvider):
         for file_access in activation.file_accesses:
             # Checks if file still exists
             if os.path.exists(file_access.name):
-                with content.std_open(file_access.name, "rb") as fil:
-                    file_access.content_hash_after = content.put(fil.read())
+                file_access.content_hash_after = content.put_path(
+                    file_access.name)
             file_access.done = True
         self.closed_activations += 1
         if (self.call_storage_frequency and
@@ -345,27 +351,102 @@ class Profiler(ExecutionProvider):
         finally:
             return self.tracer                                                   # pylint: disable=lost-exception
 
+    def scoped_profile(self, frame, event, arg):
+        """Profile hook of the 'user' trace scope
+
+        Beyond non_user_depth, events outside user files only update the
+        depth, as trace_call and trace_return would do. C calls are
+        recorded as single activations within the depth
+        """
+        depth_non_user = self.depth_non_user
+        threshold = self.non_user_depth_threshold
+        if event == "c_call":
+            if depth_non_user >= threshold:
+                self.depth_non_user += 1
+                return
+        elif event in ("c_return", "c_exception"):
+            if depth_non_user > threshold:
+                self.depth_non_user -= 1
+                return
+        elif frame.f_code.co_filename not in self.paths:
+            if event == "call" and depth_non_user >= threshold:
+                self.depth_non_user += 1
+                return
+            if event == "return" and depth_non_user > threshold:
+                self.depth_non_user -= 1
+                return
+        self.tracer(frame, event, arg)
+
     def pre_tracer(self, frame, event, arg):                                     # pylint: disable=unused-argument, no-self-use
         """It is executed before the tracing event"""
         pass
 
+    def store_objects(self, model, object_store, partial):
+        """Store objects of object_store
+        Partial saves go to the writer thread, if there is one
+        """
+        if partial and self.writer is not None:
+            self.writer.put(model, self.trial_id, object_store, partial)
+        else:
+            model.fast_store(self.trial_id, object_store, partial)
+
+    def instrument(self, counters):
+        """Wrap hot paths with HotPathCounters counters
+        Also time content puts and store flushes per table
+        """
+        super(Profiler, self).instrument(counters)
+        for name in ("put", "put_stream", "put_path"):
+            setattr(content, name, counters.timed(
+                "content." + name, getattr(content, name)))
+        store_objects = self.store_objects
+        timers = {}
+
+        def timed_store_objects(model, object_store, partial):
+            """Time store flush of model"""
+            timer = timers.get(model)
+            if timer is None:
+                timer = timers[model] = counters.timed(
+                    "store." + model.__tablename__, store_objects)
+            timer(model, object_store, partial)
+        self.store_objects = timed_store_objects
+        self.close_writer = counters.timed("store.close_writer",
+                                           self.close_writer)
+
+    def close_writer(self):
+        """Wait for pending partial saves and stop the writer thread"""
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
     def store(self, partial=False):
         """Store execution provenance"""
         tid = self.trial_id
         if not partial:
+            self.close_writer()
             now = datetime.now()
             Trial.fast_update(tid, now, self.metascript.docstring)
+            if content.use_fingerprints:
+                FileFingerprint.store_fingerprints(
+                    tid, content.fingerprints, content.used_fingerprints)
 
-        Activation.fast_store(tid, self.activations, partial)
-        ObjectValue.fast_store(tid, self.object_values, partial)
-        FileAccess.fast_store(tid, self.file_accesses, partial)
+        self.store_objects(Activation, self.activations, partial)
+        self.store_objects(ObjectValue, self.object_values, partial)
+        self.store_objects(FileAccess, self.file_accesses, partial)
+
+    @property
+    def profile_hook(self):
+        """Return function for sys.setprofile according to trace scope"""
+        if self.metascript.trace_scope == "user":
+            return self.scoped_profile
+        return self.tracer
 
     def tearup(self):
         """Activate profiler"""
-        sys.setprofile(self.tracer)
+        sys.setprofile(self.profile_hook)
 
     def teardown(self):
         """Deactivate profiler"""
         builtins.open = content.std_open
         super(Profiler, self).teardown()
         sys.setprofile(self.default_profile)
+        self.close_writer()
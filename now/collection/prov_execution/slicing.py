@@ -20,7 +20,8 @@ from copy import copy
 from future.utils import viewitems
 
 from ...persistence.models import Variable, VariableDependency
-from ...persistence.models import VariableUsage
+from ...persistence.models import VariableUsage, VariableFold, StatementValue
+from ...persistence.serializers import deferred
 from ...utils.io import print_fn_msg
 from ...utils.bytecode.f_trace import find_f_trace, get_f_trace
 from ...utils.cross_version import IMMUTABLE, builtins
@@ -30,6 +31,8 @@ from ..prov_definition.utils import CallDependency, Dependency
 from ..prov_definition.utils import Variable as Var
 
 from .argument_captors import SlicingArgumentCaptor
+from .compaction import LoopCompactor
+from .value_cache import ValueCache
 from .profiler import Profiler
 
 
@@ -107,6 +110,8 @@ class ActivationLoop(object):
         self.loop_def = loop
         self.remove = False
         self.temp_context = {}
+        # LoopWindow of compacted loops
+        self.window = None
 
     def __contains__(self, line):
         """Check if line is in loop"""
@@ -127,6 +132,27 @@ class ActivationCondition(object):
         return condition_def.first_line <= line <= condition_def.last_line
 
 
+class LinePlan(object):                                                          # pylint: disable=too-few-public-methods
+    """Precompiled slicing information of a line of a code object"""
+
+    __slots__ = ("usages", "dependencies", "loop_def", "condition_def",
+                 "empty", "f_trace")
+
+    def __init__(self, usages, dependencies, loop_def, condition_def,          # pylint: disable=too-many-arguments
+                 f_trace):
+        # Tuple of (ctx, names) for Load and Del usages
+        self.usages = usages
+        # Tuple of (var, dependencies)
+        self.dependencies = dependencies
+        # Loop and condition that start in the line
+        self.loop_def = loop_def
+        self.condition_def = condition_def
+        # Line does not record anything by itself
+        self.empty = not (usages or dependencies or loop_def or condition_def)
+        # Code may set frame.f_trace
+        self.f_trace = f_trace
+
+
 def last_valid(objects):
     """Return last object not marked for removal"""
     for obj in reversed(objects):
@@ -147,6 +173,8 @@ class Tracer(Profiler):
         self.variables = self.metascript.variables_store
         self.dependencies = self.metascript.variables_dependencies_store
         self.usages = self.metascript.usages_store
+        self.folds = self.metascript.folds_store
+        self.statement_values = self.metascript.statement_values_store
 
         # Useful maps
         # Map of dependencies by line
@@ -170,9 +198,13 @@ class Tracer(Profiler):
         self.loops = definition.loops
         # Map of If and While statement conditions
         self.conditions = definition.conditions
+        # Map of id(code) to (code, map of LinePlan by line)
+        # It keeps the code objects alive. Hashing them is slow
+        self.line_plans = {}
 
         # Allow debuggers:
         self.f_trace_frames = []
+        self.find_f_trace = find_f_trace
 
         # Events are not unique. Profiler and Tracer have same events
         self.unique_events = False
@@ -190,6 +222,20 @@ class Tracer(Profiler):
         # List of calls in comprehension
         self.comprehension_dependencies = None
 
+        # Summarize values that cannot become ProvScript parameters
+        self.defer_values = self.metascript.defer_values
+
+        # Fold middle iterations of loops
+        self.compactor = None
+        if self.metascript.compact_loops:
+            self.compactor = LoopCompactor(
+                self, self.metascript.loop_head, self.metascript.loop_tail)
+
+        # Pickle values of expensive top-level statements
+        self.value_cache = None
+        if self.metascript.value_cache is not None:
+            self.value_cache = ValueCache(self, self.metascript.value_cache)
+
 
     def add_variable(self, act_id, name, line, f_locals, typ, value="--chk--"):     # pylint: disable=too-many-arguments
         """Add variable
@@ -205,7 +251,11 @@ class Tracer(Profiler):
         value -- override variable value (default "--chk--")
         """
         if value == "--chk--" and name in f_locals:
-            value = self.serialize(f_locals[name])
+            if self.defer_values and act_id != self.main_activation.id:
+                # Only global variables become ProvScript parameters
+                value = deferred(f_locals[name])
+            else:
+                value = self.serialize(f_locals[name])
         else:
             value = "now(n/a)"
         return self.variables.add(
@@ -291,6 +341,10 @@ class Tracer(Profiler):
         if vid is not None:
             variable = self.variables[vid]
             self.add_dependencies(variable, deps)
+            if (self.value_cache is not None and activation.is_main and
+                    variable.type == "normal" and var.name in f_locals):
+                self.value_cache.capture(activation, variable,
+                                         f_locals[var.name])
             activation.context[var.name] = variable
             if var == "yield":
                 activation.context["return"] = activation.context[var.name]
@@ -313,13 +367,41 @@ class Tracer(Profiler):
 
         return variable
 
-    def slice_loop(self, activation, lineno, f_locals, filename):
+    def line_plan(self, code, lineno):
+        """Return LinePlan of line. Compile it on the first call
+        Lines of files without definition get empty plans
+        """
+        code_plans = self.line_plans.get(id(code))
+        if code_plans is None:
+            code_plans = self.line_plans[id(code)] = (code, {})
+        plans = code_plans[1]
+        plan = plans.get(lineno)
+        if plan is None:
+            filename = code.co_filename
+            line_usages = self.line_usages.get(filename, {}).get(lineno, {})
+            usages = tuple(
+                (ctx, tuple(line_usages[ctx])) for ctx in ("Load", "Del")
+                if line_usages.get(ctx)
+            )
+            dependencies = tuple(viewitems(
+                self.line_dependencies.get(filename, {}).get(lineno, {})))
+            plan = plans[lineno] = LinePlan(
+                usages, dependencies,
+                self.loops.get(filename, {}).get(lineno),
+                self.conditions.get(filename, {}).get(lineno),
+                "f_trace" in code.co_names)
+        return plan
+
+    def slice_loop(self, activation, lineno, f_locals, filename, plan):         # pylint: disable=too-many-arguments
         """Create loops, and generates dependencies between iterables"""
         loops = activation.loops
+        compactor = self.compactor
         while loops and lineno not in loops[-1]:
-            loops.pop()
+            loop = loops.pop()
+            if compactor is not None:
+                compactor.close_loop(activation, loop)
         context = activation.context
-        loop_def = self.loops[filename].get(lineno)
+        loop_def = plan.loop_def
         if loop_def is not None and loop_def.first_line == lineno:
             if not loops or loops[-1].loop_def != loop_def:
                 loop = ActivationLoop(loop_def)
@@ -334,6 +416,8 @@ class Tracer(Profiler):
         if loops and loops[-1].loop_def.first_line_in_scope == lineno:
             loop = loops[-1]
             loop_def = loop.loop_def
+            if compactor is not None:
+                compactor.start_iteration(activation, loop)
             loop.iter_var = []
             for var in loop_def.iter_var:
                 loop.iter_var.append(self.slice_dependencies(
@@ -349,7 +433,7 @@ class Tracer(Profiler):
                 activation.temp_context.add(var_name)
                 activation.context[var_name] = var
 
-    def slice_condition(self, activation, lineno, f_locals, filename):           # pylint: disable=unused-argument
+    def slice_condition(self, activation, lineno, f_locals, filename, plan):    # pylint: disable=unused-argument, too-many-arguments
         """Create if and while conditions"""
         conditions = activation.conditions
         while conditions and lineno not in conditions[-1]:
@@ -357,7 +441,7 @@ class Tracer(Profiler):
             if condition.condition_def.has_return:
                 activation.permanent_conditions.append(condition)
 
-        condition_def = self.conditions[filename].get(lineno)
+        condition_def = plan.condition_def
         if condition_def is not None and condition_def.first_line == lineno:
             if not conditions or conditions[-1].condition_def != condition_def:
                 condition = ActivationCondition(condition_def)
@@ -372,8 +456,12 @@ class Tracer(Profiler):
                 condition.test_var = list(self.find_variables(
                     activation, condition_def.test_var, filename))
 
-    def slice_line(self, activation, lineno, f_locals, filename):
+    def slice_line(self, activation, lineno, f_locals, filename, plan):         # pylint: disable=too-many-arguments
         """Generates dependencies from line"""
+        if (plan.empty and not activation.temp_context and
+                not activation.loops and not activation.conditions):
+            return
+
         for var in activation.temp_context:
             del activation.context[var]
         activation.temp_context = set()
@@ -381,19 +469,18 @@ class Tracer(Profiler):
         print_fn_msg(lambda: "Slice [{}] -> {}".format(
             lineno, linecache.getline(filename, lineno).strip()))
 
-        self.slice_loop(activation, lineno, f_locals, filename)
-        self.slice_condition(activation, lineno, f_locals, filename)
+        self.slice_loop(activation, lineno, f_locals, filename, plan)
+        self.slice_condition(activation, lineno, f_locals, filename, plan)
 
         context = activation.context
         usages_add = self.usages.add
 
-        for ctx in ("Load", "Del"):
-            usages = self.line_usages[filename][lineno][ctx]
+        for ctx, usages in plan.usages:
             for name in usages:
                 if name in context:
                     usages_add(activation.id, context[name].id, lineno, ctx)
 
-        for var, others in viewitems(self.line_dependencies[filename][lineno]):
+        for var, others in plan.dependencies:
             deps = self.find_variables(activation, others, filename)
             #deps = list(deps)
             self.slice_dependencies(activation, lineno, f_locals, var, deps)
@@ -473,12 +560,21 @@ class Tracer(Profiler):
         activation = self.current_activation
         for line in activation.slice_stack:
             self.slice_line(*line)
+        self.close_loops(activation)
         super(Tracer, self).close_activation(frame, event, arg)
+        if self.value_cache is not None:
+            self.value_cache.close_call(activation, self.current_activation)
         if frame and not activation.is_main:
             _return = self.add_generic_return(activation, frame)
             _return.value = activation.return_value
             self.create_call(activation, _return)
 
+    def close_loops(self, activation):
+        """Close compacted loops of activation"""
+        if self.compactor is not None:
+            while activation.loops:
+                self.compactor.close_loop(activation, activation.loops.pop())
+
     def create_blackbox(self):
         """Create a blackbox object with dependency to the previous one"""
         vid = self.add_variable(0, "--blackbox--", self.blackbox_index,
@@ -615,14 +711,18 @@ class Tracer(Profiler):
     def trace_line(self, frame, event, arg):                                     # pylint: disable=unused-argument
         """Trace Line event"""
         code = frame.f_code
-        filename = frame.f_code.co_filename
         lineno = frame.f_lineno
+        try:
+            plan = self.line_plans[id(code)][1][lineno]
+        except KeyError:
+            plan = self.line_plan(code, lineno)
 
-        loc, glob = frame.f_locals, frame.f_globals
-        if find_f_trace(code, loc, glob, frame.f_lasti):
-            _frame = get_f_trace(code, loc, glob)
-            if _frame.f_trace:
-                self.f_trace_frames.append(_frame)
+        if plan.f_trace:
+            loc, glob = frame.f_locals, frame.f_globals
+            if self.find_f_trace(code, loc, glob, frame.f_lasti):
+                _frame = get_f_trace(code, loc, glob)
+                if _frame.f_trace:
+                    self.f_trace_frames.append(_frame)
 
         activation = self.current_activation
 
@@ -633,18 +733,36 @@ class Tracer(Profiler):
             self.comprehension_dependencies = []
             return  # ignore comprehension
 
+        slice_stack = activation.slice_stack
+        if (plan.empty and not slice_stack and not activation.loops and
+                not activation.conditions and not activation.temp_context):
+            return  # nothing to record
+
         last_loop = last_valid(activation.loops)
         if last_loop and lineno not in last_loop:
             # Remove last trace line
-            activation.slice_stack.pop()
+            slice_stack.pop()
             last_loop.remove = True
 
+        filename = code.co_filename
         print_fn_msg(lambda: "[{}] -> {}".format(
             lineno, linecache.getline(filename, lineno).strip()))
-        if activation.slice_stack:
-            self.slice_line(*activation.slice_stack.pop())
-        activation.slice_stack.append([
-            activation, lineno, frame.f_locals, filename])
+        if slice_stack:
+            self.slice_line(*slice_stack.pop())
+        if (plan.empty and not activation.loops and
+                not activation.conditions and not activation.temp_context):
+            return  # slice_line would skip the line
+        slice_stack.append([
+            activation, lineno, frame.f_locals, filename, plan])
+
+    def instrument(self, counters):
+        """Wrap hot paths with HotPathCounters counters
+        Also time line slicing and the f_trace search
+        """
+        super(Tracer, self).instrument(counters)
+        self.slice_line = counters.timed("tracer.slice_line", self.slice_line)
+        self.find_f_trace = counters.timed("tracer.find_f_trace",
+                                           self.find_f_trace)
 
     def trace_pre_tracer(self, frame, event, arg):                               # pylint: disable=unused-argument
         """It is executed before the tracing event. Check f_trace is set"""
@@ -663,10 +781,26 @@ class Tracer(Profiler):
             self.f_trace_frames = []
             return
 
+    def scoped_tracer(self, frame, event, arg):
+        """Trace hook of the 'user' trace scope
+        Do not trace lines of frames outside user files.
+        The profile hook captures their calls and returns
+        """
+        if frame.f_code.co_filename not in self.paths:
+            return None
+        return self.tracer(frame, event, arg)
+
     def tearup(self):
-        """Activate tracer"""
-        _sys_settrace(self.tracer)
-        sys.setprofile(self.tracer)
+        """Activate tracer
+        Resolve both hooks before activating them. Otherwise, the profile_hook
+        property would produce traced events
+        """
+        profile_hook = self.profile_hook
+        trace_hook = self.tracer
+        if self.metascript.trace_scope == "user":
+            trace_hook = self.scoped_tracer
+        _sys_settrace(trace_hook)
+        sys.setprofile(profile_hook)
 
     def teardown(self):
         """Deactivate tracer"""
@@ -678,11 +812,15 @@ class Tracer(Profiler):
         if not partial:
             while len(self.activation_stack) > 1:
                 self.close_activation(None, "store", None)
+            for activation in self.activation_stack:
+                if activation is not None:
+                    self.close_loops(activation)
         super(Tracer, self).store(partial=partial)
-        tid = self.trial_id
-        Variable.fast_store(tid, self.variables, partial)
-        VariableDependency.fast_store(tid, self.dependencies, partial)
-        VariableUsage.fast_store(tid, self.usages, partial)
+        self.store_objects(Variable, self.variables, partial)
+        self.store_objects(VariableDependency, self.dependencies, partial)
+        self.store_objects(VariableUsage, self.usages, partial)
+        self.store_objects(VariableFold, self.folds, partial)
+        self.store_objects(StatementValue, self.statement_values, partial)
 
     def view_slicing_data(self, show=True):
         """View captured slicing"""
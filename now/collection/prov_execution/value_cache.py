@@ -0,0 +1,58 @@
+# Copyright (c) 2018, 2019, 2020 President and Fellows of Harvard College.
+# This file is part of ProvBuild.
+
+"""Value cache. Pickle values of expensive top-level statements"""
+from __future__ import (absolute_import, print_function,
+                        division, unicode_literals)
+
+import hashlib
+import linecache
+
+from ...persistence import content
+from ...utils.cross_version import pickle
+
+
+def statement_hash(source):
+    """Return hash of the source of a statement"""
+    source = source.strip()
+    if not isinstance(source, bytes):
+        source = source.encode("utf-8")
+    return hashlib.sha1(source).hexdigest()
+
+
+class ValueCache(object):
+    """Pickle values that the main activation assigns in lines with calls
+    that took at least min_duration seconds
+
+    Store pickles in the content database. A StatementValue keys them by
+    the hash of the line source. Values that cannot be pickled keep only
+    their repr
+    """
+
+    def __init__(self, tracer, min_duration):
+        self.values = tracer.statement_values
+        self.min_duration = min_duration
+        # Lines of the main activation with expensive calls
+        self.lines = set()
+
+    def close_call(self, activation, caller):
+        """Mark line of activation if it is an expensive call of main"""
+        if caller is None or not caller.is_main:
+            return
+        duration = (activation.finish - activation.start).total_seconds()
+        if duration >= self.min_duration:
+            self.lines.add(activation.line)
+
+    def capture(self, activation, variable, obj):
+        """Pickle obj, value of variable, if its line is expensive"""
+        if variable.line not in self.lines:
+            return
+        try:
+            pickled = pickle.dumps(obj, pickle.HIGHEST_PROTOCOL)
+        except Exception:                                                        # pylint: disable=broad-except
+            return
+        filename = activation.definition_file
+        self.values.add(
+            activation.id, variable.id,
+            statement_hash(linecache.getline(filename, variable.line)),
+            content.put(pickled))
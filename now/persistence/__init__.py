@@ -16,7 +16,7 @@ content = ContentDatabase(persistence_config)
 relational = RelationalDatabase(persistence_config)                              # pylint: disable=invalid-name
 
 
-def get_serializer(arg):                                                         # pylint: disable=unused-argument
+def get_serializer(arg):
     """Select serializer according to argument"""
     # ToDo #54: use arg to select serialize
     # from .serializers import jsonpickle_serializer, jsonpickle_content
@@ -24,6 +24,10 @@ def get_serializer(arg):
     # return SimpleSerializer().serialize
     # return jsonpickle_serializer
     # return jsonpickle_content
+    budget = getattr(arg, "value_budget", 0)
+    if budget:
+        from .serializers import BudgetSerializer
+        return BudgetSerializer(repr, budget=budget)
     return repr
 
 
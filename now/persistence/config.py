@@ -25,6 +25,9 @@ class PersistenceConfig(object):
         self.provenance_path = None  # Base .noworkflow path
         self.db_conn = None  # Connection to the database
         self.should_mock = False
+        self.synchronous = None  # SQLite synchronous mode
+        self.cache_size = None  # SQLite page cache size
+        self.content_compression = None  # Compression of new packed blobs
 
         if path:
             self.path = path
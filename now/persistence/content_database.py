@@ -9,11 +9,26 @@ from __future__ import (absolute_import, print_function,
 
 import hashlib
 import os
+import time
 
-from os.path import join, isdir, isfile
+from os.path import join, isdir, isfile, realpath
+
+from .packs import PackStore, PACKS_DIRNAME, parse_compression, read_chunks
 
 
 CONTENT_DIRNAME = "content"
+SPOOL_FILENAME = "spool-{}"
+# Do not trust fingerprints of files modified less than RACY_SECONDS ago.
+# A change in the same mtime tick would keep the fingerprint
+RACY_SECONDS = 2
+
+
+def file_fingerprint(stat):
+    """Return (device, inode, size, mtime_ns) of os.stat result"""
+    mtime_ns = getattr(stat, "st_mtime_ns", None)
+    if mtime_ns is None:
+        mtime_ns = int(stat.st_mtime * 1000000000)
+    return (stat.st_dev, stat.st_ino, stat.st_size, mtime_ns)
 
 
 class ContentDatabase(object):
@@ -22,6 +37,10 @@ class ContentDatabase(object):
     def __init__(self, persistence_config):
         self.content_path = None  # Base path for storing content of files
         self.std_open = open  # Original Python open function.
+        self.packs = None  # Pack store. None for the loose layout
+        self.use_fingerprints = True  # Skip files with known fingerprints
+        self.fingerprints = {}  # Path -> (fingerprint, content hash)
+        self.used_fingerprints = set()  # Paths with used fingerprints
 
         persistence_config.add(self)
 
@@ -32,12 +51,38 @@ class ContentDatabase(object):
     def mock(self, config):                                                      # pylint: disable=unused-argument, no-self-use
         """Mock storage for tests"""
         ContentDatabase.put = lambda s, c: hashlib.sha1(c).hexdigest()
+        ContentDatabase.put_path = lambda s, p: hashlib.sha1(p).hexdigest()
         ContentDatabase.get = lambda s, c: "".encode("utf-8")
 
     def connect(self, config):
-        """Create content directory"""
-        if not config.should_mock and not isdir(self.content_path):
-            os.makedirs(self.content_path)
+        """Create content directory
+        New content directories use packs. Existing ones keep their layout
+        until 'now content migrate'
+        """
+        if config.should_mock:
+            return
+        packs_path = join(self.content_path, PACKS_DIRNAME)
+        if not isdir(self.content_path):
+            os.makedirs(packs_path)
+        if self.packs is not None:
+            self.packs.close()
+            self.packs = None
+        if isdir(packs_path):
+            self.packs = PackStore(
+                packs_path, self._open,
+                compression=config.content_compression)
+
+    def _open(self, *args):
+        """Open file without capturing it"""
+        return self.std_open(*args)
+
+    def create_packs(self, compression=None):
+        """Start using packs in a loose content directory"""
+        if self.packs is None:
+            self.packs = PackStore.create(
+                join(self.content_path, PACKS_DIRNAME), self._open,
+                compression=compression)
+        return self.packs
 
     def put(self, content):
         """Put content in the content database
@@ -45,9 +90,13 @@ class ContentDatabase(object):
         Return: content hash code
 
         Arguments:
-        content -- binary text to be saved
+        content -- binary text or binary stream to be saved
         """
+        if hasattr(content, "read"):
+            return self.put_stream(content)
         content_hash = hashlib.sha1(content).hexdigest()
+        if self.packs is not None:
+            return self.packs.put(content_hash, content)
         content_dirname = join(self.content_path, content_hash[:2])
         if not isdir(content_dirname):
             os.makedirs(content_dirname)
@@ -57,8 +106,60 @@ class ContentDatabase(object):
                 content_file.write(content)
         return content_hash
 
+    def put_stream(self, stream):
+        """Put content of binary stream in the content database
+        Hash it in chunks while spooling it to the store
+
+        Return: content hash code
+        """
+        if self.packs is not None:
+            return self.packs.put_stream(stream)
+        spool = join(self.content_path, SPOOL_FILENAME.format(os.getpid()))
+        sha1 = hashlib.sha1()
+        with self.std_open(spool, "wb") as spool_file:
+            for chunk in read_chunks(stream):
+                sha1.update(chunk)
+                spool_file.write(chunk)
+        content_hash = sha1.hexdigest()
+        content_dirname = join(self.content_path, content_hash[:2])
+        if not isdir(content_dirname):
+            os.makedirs(content_dirname)
+        content_filename = join(content_dirname, content_hash[2:])
+        if isfile(content_filename):
+            os.remove(spool)
+        else:
+            os.rename(spool, content_filename)
+        return content_hash
+
+    def put_path(self, path):
+        """Put content of file in the content database
+        Skip files with a known fingerprint (see self.fingerprints)
+
+        Return: content hash code
+        """
+        if not self.use_fingerprints:
+            with self.std_open(path, "rb") as fil:
+                return self.put_stream(fil)
+        stat = os.stat(path)
+        fingerprint = file_fingerprint(stat)
+        key = realpath(path)
+        cached = self.fingerprints.get(key)
+        if cached is not None and tuple(cached[0]) == fingerprint:
+            self.used_fingerprints.add(key)
+            return cached[1]
+        with self.std_open(path, "rb") as fil:
+            content_hash = self.put_stream(fil)
+        if time.time() - stat.st_mtime >= RACY_SECONDS:
+            self.fingerprints[key] = (fingerprint, content_hash)
+            self.used_fingerprints.add(key)
+        return content_hash
+
     def find_subhash(self, content_hash):
         """Get hash that starts by content_hash"""
+        if self.packs is not None:
+            packed = self.packs.find_prefix(content_hash)
+            if packed is not None:
+                return packed
         content_dirname = content_hash[:2]
         contet_filename = content_hash[2:]
         content_dir = join(self.content_path, content_dirname)
@@ -79,8 +180,78 @@ class ContentDatabase(object):
         Arguments:
         content_hash -- content hash code
         """
+        if self.packs is not None and content_hash in self.packs:
+            return self.packs.get(content_hash)
         content_filename = join(self.content_path,
                                 content_hash[:2],
                                 content_hash[2:])
         with self.std_open(content_filename, "rb") as content_file:
             return content_file.read()
+
+    def loose_hashes(self):
+        """Return hashes of loose content files"""
+        if not isdir(self.content_path):
+            return []
+        result = []
+        for dirname in sorted(os.listdir(self.content_path)):
+            path = join(self.content_path, dirname)
+            if len(dirname) != 2 or not isdir(path):
+                continue
+            result.extend(dirname + name for name in sorted(os.listdir(path)))
+        return result
+
+    def remove_loose(self, content_hash):
+        """Remove loose content file and its directory, if empty"""
+        content_dirname = join(self.content_path, content_hash[:2])
+        os.remove(join(content_dirname, content_hash[2:]))
+        if not os.listdir(content_dirname):
+            os.rmdir(content_dirname)
+
+    def migrate(self, compression=None, keep_loose=False):
+        """Move loose content files into packs
+        Return number of migrated files
+
+
+        Keyword arguments:
+        compression -- 'codec[:level]' of migrated blobs
+                       (default=compression of the store)
+        keep_loose -- do not remove loose files (default=False)
+        """
+        packs = self.create_packs()
+        codec, level = packs.codec, packs.level
+        if compression is not None:
+            packs.codec, packs.level = parse_compression(compression)
+        total = 0
+        try:
+            for content_hash in self.loose_hashes():
+                with self.std_open(join(self.content_path, content_hash[:2],
+                                        content_hash[2:]), "rb") as fil:
+                    packs.put(content_hash, fil.read())
+                if not keep_loose:
+                    self.remove_loose(content_hash)
+                total += 1
+            with packs:
+                packs.merge()
+        finally:
+            packs.codec, packs.level = codec, level
+        return total
+
+    def gc(self, reachable):                                                     # pylint: disable=invalid-name
+        """Remove blobs whose hashes are not in reachable
+        Return (kept blobs, removed blobs, freed bytes)
+        """
+        kept = removed = freed = 0
+        for content_hash in self.loose_hashes():
+            if content_hash in reachable:
+                kept += 1
+                continue
+            freed += os.path.getsize(join(
+                self.content_path, content_hash[:2], content_hash[2:]))
+            self.remove_loose(content_hash)
+            removed += 1
+        if self.packs is not None:
+            pack_kept, pack_removed, pack_freed = self.packs.gc(reachable)
+            kept += pack_kept
+            removed += pack_removed
+            freed += pack_freed
+        return kept, removed, freed
@@ -55,4 +55,11 @@ cdef class VariableDependencyLW(BaseLW):
 
 cdef class VariableUsageLW(BaseLW):
     cdef public int trial_id, id, activation_id, variable_id, line;
-    cdef public str ctx;
\ No newline at end of file
+    cdef public str ctx;
+
+cdef class VariableFoldLW(BaseLW):
+    cdef public int trial_id, id, activation_id, variable_id, iterations;
+
+cdef class StatementValueLW(BaseLW):
+    cdef public int trial_id, id, activation_id, variable_id;
+    cdef public str statement_hash, content_hash;
\ No newline at end of file
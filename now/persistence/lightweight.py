@@ -50,6 +50,13 @@ class ObjectStore(object):
         self.store[self.id] = self.cls(self.id, *args)
         return self.store[self.id]
 
+    def pop(self, index):
+        """Remove object from storage and return it
+        Do not use it while iterating on the storage
+        """
+        self.count -= 1
+        return self.store.pop(index)
+
     def dry_add(self, *args):
         """Return object that would be added by add_object
         Do not add it to storage
@@ -520,3 +527,58 @@ class VariableUsageLW(BaseLW):
         return (
             "Usage(id={}, variable_id={}, line={}, ctx={})"
         ).format(self.id, self.variable_id, self.line, self.ctx)
+
+
+class VariableFoldLW(BaseLW):
+    """Variable Fold lightweight object
+    There are type definitions on lightweight.pxd
+    """
+    __slots__, attributes = define_attrs(
+        ["id", "activation_id", "variable_id", "iterations", "trial_id"]
+    )
+    special = set()
+
+    def __init__(self, vid, activation_id, variable_id, iterations):
+        self.id = vid                                                            # pylint: disable=invalid-name
+        self.activation_id = activation_id
+        self.variable_id = variable_id
+        self.iterations = iterations
+        self.trial_id = -1
+
+    def is_complete(self):                                                       # pylint: disable=no-self-use
+        """Variable Fold can never be removed. It counts new iterations"""
+        return False
+
+    def __repr__(self):
+        return (
+            "Fold(id={}, variable_id={}, iterations={})"
+        ).format(self.id, self.variable_id, self.iterations)
+
+
+class StatementValueLW(BaseLW):
+    """Statement Value lightweight object
+    There are type definitions on lightweight.pxd
+    """
+    __slots__, attributes = define_attrs(
+        ["id", "activation_id", "variable_id", "statement_hash",
+         "content_hash", "trial_id"]
+    )
+    special = set()
+
+    def __init__(self, vid, activation_id, variable_id, statement_hash,         # pylint: disable=too-many-arguments
+                 content_hash):
+        self.id = vid                                                            # pylint: disable=invalid-name
+        self.activation_id = activation_id
+        self.variable_id = variable_id
+        self.statement_hash = statement_hash
+        self.content_hash = content_hash
+        self.trial_id = -1
+
+    def is_complete(self):                                                       # pylint: disable=no-self-use
+        """Statement Value can always be removed"""
+        return True
+
+    def __repr__(self):
+        return (
+            "StatementValue(id={}, variable_id={}, content_hash={})"
+        ).format(self.id, self.variable_id, self.content_hash)
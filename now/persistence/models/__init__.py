@@ -15,16 +15,22 @@ from .base import Model, MetaModel
 # Database Models
 from .activation import Activation
 from .dependency import Dependency
+from .deployment_cache import DeploymentCache
 from .environment_attr import EnvironmentAttr
+from .environment_snapshot import EnvironmentSnapshot
 from .file_access import FileAccess, UniqueFileAccess
+from .file_fingerprint import FileFingerprint
 from .function_def import FunctionDef
 from .graph_cache import GraphCache
 from .head import Head
 from .module import Module
 from .object import Object
 from .object_value import ObjectValue
+from .slice_cache import SliceCache
+from .statement_value import StatementValue
 from .variable import Variable
 from .variable_dependency import VariableDependency
+from .variable_fold import VariableFold
 from .variable_usage import VariableUsage
 from .tag import Tag
 from .trial import Trial
@@ -36,11 +42,13 @@ from .trial_prolog import TrialProlog
 
 
 ORDER = [
-    Trial, Head, Tag, GraphCache,  # Trial
-    Module, Dependency, EnvironmentAttr,  # Deployment
+    Trial, Head, Tag, GraphCache, SliceCache,  # Trial
+    Module, Dependency, EnvironmentAttr, EnvironmentSnapshot,  # Deployment
+    DeploymentCache,
     FunctionDef, Object,  # Definition
-    Activation, ObjectValue, FileAccess,  # Execution
-    Variable, VariableUsage, VariableDependency  # Slicing
+    Activation, ObjectValue, FileAccess, FileFingerprint,  # Execution
+    Variable, VariableUsage, VariableDependency, VariableFold,  # Slicing
+    StatementValue  # Value cache
 ]
 
 
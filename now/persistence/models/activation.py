@@ -43,6 +43,8 @@ class Activation(AlchemyProxy):
     finish = Column(TIMESTAMP)
     caller_id = Column(Integer, index=True)
 
+    PUSH_COLUMNS = ("id", "name", "line", "return_value", "caller_id")
+
     _children = backref("children", order_by="Activation.start")
     caller = one(
         "Activation", remote_side=[trial_id, id],
@@ -105,9 +107,10 @@ class Activation(AlchemyProxy):
 
     def __init__(self, *args, **kwargs):
         if args and isinstance(args[0], relational.base):
-            obj = args[0]
-            trial_ref = obj.id
-        elif args:
+            # Proxy rows of queries and relationships
+            super(Activation, self).__init__(args[0])
+            return
+        if args:
             trial_ref = kwargs.get("trial_ref", args[0])
         else:
             trial_ref = kwargs.get("trial_ref", None)
@@ -170,21 +173,16 @@ class Activation(AlchemyProxy):
         result = session.query(cls.m).filter(cls.m.trial_id == trial_ref)
         return result.first()
 
+    @classmethod
     def pull_content(cls, tid, session=None):
         session = session or relational.session
         ttrial = cls.__table__
         result = session.query(ttrial).filter(ttrial.c.trial_id == tid).all()
         return result
 
+    @classmethod
     def push_content(cls, id, reslist, session=None):
-        session = session or relational.session
-        ttrial = cls.__table__
-        for res in reslist:
-            result = session.execute(
-                ttrial.insert(),
-                {"trial_id": id, "id": res.id, "name": res.name, "line": res.line, "return_value": res.return_value, "caller_id": res.caller_id}
-            )
-            session.commit()
+        return cls.bulk_push(id, reslist, session=session)
 
 def _show_slicing(name, query, _print):
     """Show slicing objects"""
@@ -7,6 +7,7 @@
 from __future__ import (absolute_import, print_function,
                         division, unicode_literals)
 
+import time
 import weakref
 
 from collections import OrderedDict, namedtuple
@@ -17,6 +18,7 @@ from sqlalchemy import Column
 from sqlalchemy.orm import relationship
 
 from .. import relational
+from ...utils.io import print_msg
 
 
 class MetaModel(type):
@@ -179,6 +181,9 @@ def proxy_attr(name, proxy_func=proxy):
     return proxy_property(func, proxy_func=proxy_func)
 
 
+PUSH_CHUNK_SIZE = 5000
+
+
 class AlchemyProxy(Model):
     """Alchemy Proxy super class.
 
@@ -186,6 +191,8 @@ class AlchemyProxy(Model):
     """
 
     __alchemy_refs__ = {}
+    # Columns copied by push_content. trial_id is always replaced
+    PUSH_COLUMNS = ()
 
     m = __model__ = None                                                         # pylint: disable=invalid-name
     t = __table__ = None                                                         # pylint: disable=invalid-name
@@ -233,13 +240,80 @@ class AlchemyProxy(Model):
     def fast_store(cls, trial_id, object_store, partial, conn=None):
         """Bulk insert lightweight objects from ObjectStore"""
         if object_store.has_items():
-            _conn = conn if conn else relational.engine.connect()
+            _conn = conn if conn else relational.writer
             _conn.execute(
                 cls.__model__.__table__.insert().prefix_with("OR REPLACE"),
                 *object_store.generator(trial_id, partial)
             )
-            if conn is None:
-                _conn.close()
+
+    @classmethod
+    def fast_store_rows(cls, rows, conn=None):
+        """Bulk insert rows taken from ObjectStore by a previous generator"""
+        if rows:
+            _conn = conn if conn else relational.writer
+            _conn.execute(
+                cls.__model__.__table__.insert().prefix_with("OR REPLACE"),
+                *rows
+            )
+
+    @classmethod
+    def bulk_push(cls, trial_id, rows, session=None,                            # pylint: disable=too-many-arguments, too-many-locals
+                  chunk_size=PUSH_CHUNK_SIZE, scratch=False):
+        """Insert rows as rows of trial_id in a single transaction
+
+        Rows can be any objects with PUSH_COLUMNS attributes, such as the
+        results of pull_content. Insert them with executemany in chunks
+        of chunk_size rows.
+        Return (number of rows, rows per second)
+
+
+        Arguments:
+        trial_id -- trial id of the new rows
+        rows -- iterable of rows
+
+
+        Keyword arguments:
+        session -- desired session (default=relational.session)
+        chunk_size -- rows per executemany (default=PUSH_CHUNK_SIZE)
+        scratch -- disable synchronous writes and use WAL. Use it only on
+                   databases that can be recreated (default=False)
+        """
+        session = session or relational.session
+        start = time.time()
+        if scratch:
+            session.execute("PRAGMA journal_mode=WAL")
+            synchronous = session.execute("PRAGMA synchronous").scalar()
+            session.execute("PRAGMA synchronous=OFF")
+
+        insert = cls.__table__.insert()
+        columns = cls.PUSH_COLUMNS
+        total = 0
+        chunk = []
+        try:
+            for row in rows:
+                values = {column: getattr(row, column) for column in columns}
+                values["trial_id"] = trial_id
+                chunk.append(values)
+                if len(chunk) >= chunk_size:
+                    session.execute(insert, chunk)
+                    total += len(chunk)
+                    chunk = []
+            if chunk:
+                session.execute(insert, chunk)
+                total += len(chunk)
+            session.commit()
+        except:
+            session.rollback()
+            raise
+        finally:
+            if scratch:
+                session.execute("PRAGMA synchronous={}".format(synchronous))
+
+        duration = time.time() - start
+        rate = total / duration if duration else float(total)
+        print_msg("pushed {} rows to {} ({:.0f} rows/s)".format(
+            total, cls.__tablename__, rate))
+        return total, rate
 
 def create_relationship(proxy_func):
     """Create proxy descriptor"""
@@ -34,6 +34,8 @@ class Dependency(AlchemyProxy):
     trial_id = Column(Integer, nullable=False, index=True)
     module_id = Column(Integer, nullable=False, index=True)
 
+    PUSH_COLUMNS = ("module_id",)
+
     module = one("Module")
 
     trial = backref_one("trial")  # Trial.module_dependencies
@@ -53,9 +55,10 @@ class Dependency(AlchemyProxy):
 
     def __init__(self, *args, **kwargs):
         if args and isinstance(args[0], relational.base):
-            obj = args[0]
-            trial_ref = obj.id
-        elif args:
+            # Proxy rows of queries and relationships
+            super(Dependency, self).__init__(args[0])
+            return
+        if args:
             trial_ref = kwargs.get("trial_ref", args[0])
         else:
             trial_ref = kwargs.get("trial_ref", None)
@@ -78,18 +81,13 @@ class Dependency(AlchemyProxy):
         result = session.query(cls.m).filter(cls.m.trial_id == trial_ref)
         return result.first()
 
+    @classmethod
     def pull_content(cls, tid, session=None):
         session = session or relational.session
         ttrial = cls.__table__
         result = session.query(ttrial).filter(ttrial.c.trial_id == tid).all()
         return result
 
+    @classmethod
     def push_content(cls, id, reslist, session=None):
-        session = session or relational.session
-        ttrial = cls.__table__
-        for res in reslist:
-            result = session.execute(
-                ttrial.insert(),
-                {"trial_id": id, "module_id": res.module_id}
-            )
-            session.commit()
+        return cls.bulk_push(id, reslist, session=session)
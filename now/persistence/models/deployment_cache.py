@@ -0,0 +1,90 @@
+# Copyright (c) 2018, 2019, 2020 President and Fellows of Harvard College.
+# This file is part of ProvBuild.
+
+"""Deployment Cache Model"""
+from __future__ import (absolute_import, print_function,
+                        division, unicode_literals)
+
+import traceback
+
+from sqlalchemy import Column, Integer, Text, exc, select
+
+from ...utils.cross_version import pickle
+from ...utils.io import print_msg
+
+from .. import relational, content
+from .base import AlchemyProxy, proxy_class
+
+
+# Increase it whenever the cached modules change
+DEPLOYMENT_CACHE_VERSION = 1
+# Keep the MAX_DEPLOYMENTS most recently used deployments
+MAX_DEPLOYMENTS = 100
+
+
+@proxy_class
+class DeploymentCache(AlchemyProxy):
+    """Represent the modules found for a script in a given interpreter and
+    sys.path"""
+
+    __tablename__ = "deployment_cache"
+    key = Column(Text, primary_key=True)
+    version = Column(Integer)
+    content_hash = Column(Text)
+    trial_id = Column(Integer, index=True)
+
+    def __repr__(self):
+        return "DeploymentCache({0.key}, {0.trial_id})".format(self)
+
+    @classmethod
+    def load_modules(cls, key):
+        """Load modules of key. Return None if they are not cached
+
+        Return list of (name, version, path, code_hash, fingerprint)
+        """
+        table = cls.t
+        result = None
+        try:
+            for (content_hash,) in relational.session.execute(select([
+                    table.c.content_hash]).where(
+                        (table.c.key == key) &
+                        (table.c.version == DEPLOYMENT_CACHE_VERSION))):
+                result = pickle.loads(content.get(content_hash))
+        except (ValueError, IOError, exc.SQLAlchemyError):
+            traceback.print_exc()
+            print_msg("Couldn't load deployment cache", True)
+        return result
+
+    @classmethod
+    def store_modules(cls, key, trial_id, modules,
+                      max_deployments=MAX_DEPLOYMENTS):
+        """Store modules of key and evict old deployments
+
+
+        Arguments:
+        key -- deployment key
+        trial_id -- trial that found the modules
+        modules -- list of (name, version, path, code_hash, fingerprint)
+
+
+        Keyword arguments:
+        max_deployments -- number of deployments to keep. Evict the ones
+                           with the oldest trial_id (default=MAX_DEPLOYMENTS)
+        """
+        table = cls.t
+        session = relational.make_session()
+        try:
+            session.execute(table.insert().prefix_with("OR REPLACE"), {
+                "key": key, "version": DEPLOYMENT_CACHE_VERSION,
+                "content_hash": content.put(pickle.dumps(modules)),
+                "trial_id": trial_id,
+            })
+            kept = select([table.c.key]).order_by(
+                table.c.trial_id.desc()).limit(max_deployments)
+            session.execute(table.delete().where(~table.c.key.in_(kept)))
+            session.commit()
+        except exc.SQLAlchemyError:
+            session.rollback()
+            traceback.print_exc()
+            print_msg("Couldn't store deployment cache", True)
+        session.close()                                                          # pylint: disable=no-member
@@ -12,6 +12,8 @@ from collections import OrderedDict
 from future.utils import viewkeys
 
 from .base import Model, proxy_gen
+from .environment_attr import EnvironmentAttr
+from .environment_snapshot import EnvironmentSnapshot
 from .trial import Trial
 from .graphs.diff_graph import DiffGraph
 
@@ -80,7 +82,15 @@ class Diff(Model):
 
     @property
     def environment(self):
-        """Diff environment variables"""
+        """Diff environment variables
+        Trials with the same snapshot differ only in volatile attributes
+        """
+        hash1, _ = EnvironmentSnapshot.load(self.trial1.id)
+        hash2, _ = EnvironmentSnapshot.load(self.trial2.id)
+        if hash1 is not None and hash1 == hash2:
+            return diff_set(
+                set(EnvironmentAttr.load_volatile(self.trial1.id)),
+                set(EnvironmentAttr.load_volatile(self.trial2.id)))
         return diff_set(
             set(self.trial1.environment_attrs),
             set(self.trial2.environment_attrs))
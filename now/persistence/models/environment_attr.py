@@ -13,7 +13,8 @@ from sqlalchemy import PrimaryKeyConstraint, ForeignKeyConstraint
 from ...utils.prolog import PrologDescription, PrologTrial, PrologRepr
 
 from .. import relational, content, persistence_config
-from .base import AlchemyProxy, proxy_class, backref_one
+from .base import AlchemyProxy, proxy_class, backref_one, proxy_gen
+from .environment_snapshot import VOLATILE_ATTRS
 
 
 @proxy_class
@@ -30,7 +31,9 @@ class EnvironmentAttr(AlchemyProxy):
     name = Column(Text)
     value = Column(Text)
 
-    trial = backref_one("trial")  # Trial.environment_attrs
+    PUSH_COLUMNS = ("id", "name", "value")
+
+    trial = backref_one("trial")  # Trial.own_environment_attrs
 
     prolog_description = PrologDescription("environment", (
         PrologTrial("trial_id", link="trial.id"),
@@ -44,9 +47,10 @@ class EnvironmentAttr(AlchemyProxy):
 
     def __init__(self, *args, **kwargs):
         if args and isinstance(args[0], relational.base):
-            obj = args[0]
-            trial_ref = obj.id
-        elif args:
+            # Proxy rows of queries and relationships
+            super(EnvironmentAttr, self).__init__(args[0])
+            return
+        if args:
             trial_ref = kwargs.get("trial_ref", args[0])
         else:
             trial_ref = kwargs.get("trial_ref", None)
@@ -86,18 +90,24 @@ class EnvironmentAttr(AlchemyProxy):
         result = session.query(cls.m).filter(cls.m.trial_id == trial_ref)
         return result.first()
 
+    @classmethod  # query
+    def load_volatile(cls, trial_id, session=None):
+        """Load volatile environment attributes of trial
+
+        Keyword arguments:
+        session -- specify session for loading (default=relational.session)
+        """
+        session = session or relational.session
+        return proxy_gen(session.query(cls.m).filter(
+            (cls.m.trial_id == trial_id) & cls.m.name.in_(VOLATILE_ATTRS)))
+
+    @classmethod
     def pull_content(cls, tid, session=None):
         session = session or relational.session
         ttrial = cls.__table__
         result = session.query(ttrial).filter(ttrial.c.trial_id == tid).all()
         return result
 
+    @classmethod
     def push_content(cls, id, reslist, session=None):
-        session = session or relational.session
-        ttrial = cls.__table__
-        for res in reslist:
-            result = session.execute(
-                ttrial.insert(),
-                {"trial_id": id, "id": res.id, "name": res.name, "value": res.value}
-            )
-            session.commit()
\ No newline at end of file
+        return cls.bulk_push(id, reslist, session=session)
@@ -0,0 +1,88 @@
+# Copyright (c) 2018, 2019, 2020 President and Fellows of Harvard College.
+# This file is part of ProvBuild.
+
+"""Environment Snapshot Model"""
+from __future__ import (absolute_import, print_function,
+                        division, unicode_literals)
+
+import hashlib
+
+from sqlalchemy import Column, Integer, Text, select
+from sqlalchemy import ForeignKeyConstraint
+
+from .. import relational
+from .base import AlchemyProxy, proxy_class
+
+
+# Attributes that change in every trial. They are not part of snapshots
+VOLATILE_ATTRS = ("PID", "SC_AVPHYS_PAGES")
+
+
+def environment_hash(attrs):
+    """Return content hash of the non volatile environment attributes
+
+    Arguments:
+    attrs -- iterable of objects with name and value attributes
+    """
+    sha1 = hashlib.sha1()
+    for item in sorted(
+            (attr.name, attr.value) for attr in attrs
+            if attr.name not in VOLATILE_ATTRS):
+        sha1.update(repr(item).encode("utf-8"))
+        sha1.update(b"\n")
+    return sha1.hexdigest()
+
+
+@proxy_class
+class EnvironmentSnapshot(AlchemyProxy):
+    """Represent the environment of a trial as a reference to the trial that
+    stored its non volatile attributes (owner)"""
+
+    __tablename__ = "environment_snapshot"
+    __table_args__ = (
+        ForeignKeyConstraint(["trial_id"], ["trial.id"], ondelete="CASCADE"),
+    )
+    trial_id = Column(Integer, primary_key=True)
+    content_hash = Column(Text, index=True)
+    owner_id = Column(Integer, index=True)
+
+    def __repr__(self):
+        return "EnvironmentSnapshot({0.trial_id}, {0.owner_id})".format(self)
+
+    @classmethod  # query
+    def find_owner(cls, content_hash, session=None):
+        """Return owner of snapshot with content_hash or None
+
+        Keyword arguments:
+        session -- specify session for loading (default=relational.session)
+        """
+        table = cls.t
+        session = session or relational.session
+        row = session.execute(select([table.c.owner_id]).where(
+            table.c.content_hash == content_hash
+        ).limit(1)).fetchone()
+        return row[0] if row else None
+
+    @classmethod  # query
+    def load(cls, trial_id, session=None):
+        """Return (content_hash, owner_id) of trial or (None, None)
+        Trials collected before snapshots have no snapshot
+
+        Keyword arguments:
+        session -- specify session for loading (default=relational.session)
+        """
+        table = cls.t
+        session = session or relational.session
+        row = session.execute(select([
+            table.c.content_hash, table.c.owner_id
+        ]).where(table.c.trial_id == trial_id)).fetchone()
+        return tuple(row) if row else (None, None)
+
+    @classmethod
+    def fast_store_snapshot(cls, trial_id, content_hash, owner_id, conn=None):
+        """Store snapshot reference of trial"""
+        _conn = conn if conn else relational.writer
+        _conn.execute(cls.t.insert().prefix_with("OR REPLACE"), {
+            "trial_id": trial_id, "content_hash": content_hash,
+            "owner_id": owner_id,
+        })
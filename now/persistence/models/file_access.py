@@ -45,6 +45,11 @@ class FileAccess(AlchemyProxy):
     timestamp = Column(TIMESTAMP)
     function_activation_id = Column(Integer, index=True)
 
+    PUSH_COLUMNS = (
+        "id", "name", "mode", "buffering", "content_hash_before",
+        "content_hash_after", "function_activation_id"
+    )
+
     trial = backref_one("trial")  # Trial.file_accesses
     activation = backref_one("activation")  # Activation.file_accesses
 
@@ -71,9 +76,10 @@ class FileAccess(AlchemyProxy):
 
     def __init__(self, *args, **kwargs):
         if args and isinstance(args[0], relational.base):
-            obj = args[0]
-            trial_ref = obj.id
-        elif args:
+            # Proxy rows of queries and relationships
+            super(FileAccess, self).__init__(args[0])
+            return
+        if args:
             trial_ref = kwargs.get("trial_ref", args[0])
         else:
             trial_ref = kwargs.get("trial_ref", None)
@@ -189,21 +195,16 @@ class FileAccess(AlchemyProxy):
         result = session.query(cls.m).filter(cls.m.trial_id == trial_ref)
         return result.first()
 
+    @classmethod
     def pull_content(cls, tid, session=None):
         session = session or relational.session
         ttrial = cls.__table__
         result = session.query(ttrial).filter(ttrial.c.trial_id == tid).all()
         return result
 
+    @classmethod
     def push_content(cls, id, reslist, session=None):
-        session = session or relational.session
-        ttrial = cls.__table__
-        for res in reslist:
-            result = session.execute(
-                ttrial.insert(),
-                {"trial_id": id, "id": res.id, "name": res.name, "mode": res.mode, "buffering": res.buffering, "content_hash_before": res.content_hash_before, "content_hash_after": res.content_hash_after, "function_activation_id": res.function_activation_id}
-            )
-            session.commit()
+        return cls.bulk_push(id, reslist, session=session)
 
 class UniqueFileAccess(FileAccess):
 
@@ -0,0 +1,92 @@
+# Copyright (c) 2018, 2019, 2020 President and Fellows of Harvard College.
+# This file is part of ProvBuild.
+
+"""File Fingerprint Model"""
+from __future__ import (absolute_import, print_function,
+                        division, unicode_literals)
+
+import traceback
+
+from sqlalchemy import Column, Integer, Text, exc, select
+
+from ...utils.io import print_msg
+
+from .. import relational
+from .base import AlchemyProxy, proxy_class
+
+
+# Keep fingerprints of the MAX_FINGERPRINTS most recently used files
+MAX_FINGERPRINTS = 10000
+
+
+@proxy_class
+class FileFingerprint(AlchemyProxy):
+    """Represent the content hash of a file with a given fingerprint"""
+
+    __tablename__ = "file_fingerprint"
+    path = Column(Text, primary_key=True)
+    device = Column(Integer)
+    inode = Column(Integer)
+    size = Column(Integer)
+    mtime_ns = Column(Integer)
+    content_hash = Column(Text)
+    trial_id = Column(Integer, index=True)
+
+    def __repr__(self):
+        return "FileFingerprint({0.path}, {0.content_hash})".format(self)
+
+    @classmethod
+    def load_fingerprints(cls):
+        """Return dict of path -> (fingerprint, content hash)"""
+        table = cls.t
+        result = {}
+        try:
+            for row in relational.session.execute(select([
+                    table.c.path, table.c.device, table.c.inode, table.c.size,
+                    table.c.mtime_ns, table.c.content_hash])):
+                result[row[0]] = (tuple(row[1:5]), row[5])
+        except exc.SQLAlchemyError:
+            traceback.print_exc()
+            print_msg("Couldn't load file fingerprints", True)
+        return result
+
+    @classmethod
+    def store_fingerprints(cls, trial_id, fingerprints, paths,                  # pylint: disable=too-many-arguments
+                           max_fingerprints=MAX_FINGERPRINTS):
+        """Store fingerprints of paths used by trial_id and evict old ones
+
+
+        Arguments:
+        trial_id -- trial that used the fingerprints
+        fingerprints -- dict of path -> (fingerprint, content hash)
+        paths -- paths used by trial_id
+
+
+        Keyword arguments:
+        max_fingerprints -- number of fingerprints to keep. Evict the ones
+                            with the oldest trial_id (default=MAX_FINGERPRINTS)
+        """
+        table = cls.t
+        rows = []
+        for path in paths:
+            if path not in fingerprints:
+                continue
+            (device, inode, size, mtime_ns), content_hash = fingerprints[path]
+            rows.append({
+                "path": path, "device": device, "inode": inode, "size": size,
+                "mtime_ns": mtime_ns, "content_hash": content_hash,
+                "trial_id": trial_id,
+            })
+        session = relational.make_session()
+        try:
+            if rows:
+                session.execute(table.insert().prefix_with("OR REPLACE"), rows)
+            kept = select([table.c.path]).order_by(
+                table.c.trial_id.desc()).limit(max_fingerprints)
+            session.execute(table.delete().where(~table.c.path.in_(kept)))
+            session.commit()
+        except exc.SQLAlchemyError:
+            session.rollback()
+            traceback.print_exc()
+            print_msg("Couldn't store file fingerprints", True)
+        session.close()                                                          # pylint: disable=no-member
@@ -37,6 +37,10 @@ class FunctionDef(AlchemyProxy):
     last_line = Column(Integer)
     docstring = Column(Text)
 
+    PUSH_COLUMNS = (
+        "id", "name", "code_hash", "first_line", "last_line", "docstring"
+    )
+
     objects = many_ref("function_def", "Object")
 
     trial = backref_one("trial")  #  Trial.function_defs
@@ -74,9 +78,10 @@ class FunctionDef(AlchemyProxy):
 
     def __init__(self, *args, **kwargs):
         if args and isinstance(args[0], relational.base):
-            obj = args[0]
-            trial_ref = obj.id
-        elif args:
+            # Proxy rows of queries and relationships
+            super(FunctionDef, self).__init__(args[0])
+            return
+        if args:
             trial_ref = kwargs.get("trial_ref", args[0])
         else:
             trial_ref = kwargs.get("trial_ref", None)
@@ -117,18 +122,13 @@ class FunctionDef(AlchemyProxy):
         result = session.query(cls.m).filter(cls.m.trial_id == trial_ref)
         return result.first()
 
+    @classmethod
     def pull_content(cls, tid, session=None):
         session = session or relational.session
         ttrial = cls.__table__
         result = session.query(ttrial).filter(ttrial.c.trial_id == tid).all()
         return result
 
+    @classmethod
     def push_content(cls, id, reslist, session=None):
-        session = session or relational.session
-        ttrial = cls.__table__
-        for res in reslist:
-            result = session.execute(
-                ttrial.insert(),
-                {"id": res.id, "name": res.name, "code_hash": res.code_hash, "trial_id": id, "first_line": res.first_line, "last_line": res.last_line, "docstring": res.docstring}
-            )
-            session.commit()
+        return cls.bulk_push(id, reslist, session=session)
@@ -0,0 +1,205 @@
+# Copyright (c) 2018, 2019, 2020 President and Fellows of Harvard College.
+# This file is part of ProvBuild.
+
+"""Activation Table. Compact file with the activations of a finished trial
+
+It is the intermediate shared by all modes of the trial graph.
+Summarizations read it through mmap instead of querying activations
+"""
+from __future__ import (absolute_import, print_function,
+                        division, unicode_literals)
+
+import mmap
+import os
+import struct
+import traceback
+
+from future.utils import text_to_native_str as n
+from sqlalchemy import select
+
+from ....utils.io import print_msg
+from ... import relational, content, persistence_config
+from ..activation import Activation
+
+
+GRAPHS_DIRNAME = "graphs"
+TABLE_FILENAME = "activations-{}"
+# Increase it whenever the file format changes
+TABLE_VERSION = 1
+
+# Rows fetched at a time while streaming activations
+FETCH_SIZE = 10000
+
+# magic, version, trial id, activations, names
+HEADER = struct.Struct(n(">4sHQII"))
+MAGIC = b"NWAT"
+# id, caller id, line, name index, duration
+RECORD = struct.Struct(n(">qqqIq"))
+NAME_SIZE = struct.Struct(n(">I"))
+
+
+class ActivationRecord(object):                                                  # pylint: disable=too-few-public-methods
+    """Activation of the table. Mimics Activation attributes used by
+    summarizations"""
+
+    __slots__ = ("trial_id", "id", "caller_id", "line", "name", "duration")
+
+    def __init__(self, trial_id, id_, caller_id, line, name, duration):         # pylint: disable=too-many-arguments
+        self.trial_id = trial_id
+        self.id = id_                                                            # pylint: disable=invalid-name
+        self.caller_id = caller_id
+        self.line = line
+        self.name = name
+        self.duration = duration
+
+    def __repr__(self):
+        return "Activation({0.trial_id}, {0.id}, {0.name})".format(self)
+
+
+class ActivationQuery(object):                                                   # pylint: disable=too-few-public-methods
+    """Activations of a trial streamed from the database in id order
+    Each iteration runs a new query and fetches FETCH_SIZE rows at a time
+    """
+
+    def __init__(self, trial_id, fetch_size=FETCH_SIZE):
+        self.trial_id = trial_id
+        self.fetch_size = fetch_size
+
+    def __iter__(self):
+        table = Activation.t
+        trial_id = self.trial_id
+        result = relational.session.execute(select([
+            table.c.id, table.c.caller_id, table.c.line, table.c.name,
+            table.c.start, table.c.finish
+        ]).where(table.c.trial_id == trial_id).order_by(
+            table.c.id).execution_options(stream_results=True))
+        try:
+            while True:
+                rows = result.fetchmany(self.fetch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    duration = 0
+                    if row.start is not None and row.finish is not None:
+                        duration = int(
+                            (row.finish - row.start).total_seconds() * 1000000)
+                    yield ActivationRecord(
+                        trial_id, row.id, row.caller_id, row.line,
+                        row.name or "", duration)
+        finally:
+            result.close()
+
+
+class ActivationTable(object):
+    """Read-only activations of a trial in a memory-mapped file"""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = content.std_open(path, "rb")
+        self.map = None
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0,
+                                 access=mmap.ACCESS_READ)
+            magic, version, self.trial_id, self.size, names = (
+                HEADER.unpack_from(self.map, 0))
+            if magic != MAGIC or version != TABLE_VERSION:
+                raise ValueError("invalid activation table {}".format(path))
+            self.names = []
+            offset = HEADER.size + self.size * RECORD.size
+            for _ in range(names):
+                (size,) = NAME_SIZE.unpack_from(self.map, offset)
+                offset += NAME_SIZE.size
+                self.names.append(
+                    self.map[offset:offset + size].decode("utf-8"))
+                offset += size
+        except (ValueError, struct.error, EnvironmentError):
+            self.close()
+            raise
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError("activation table index out of range")
+        id_, caller_id, line, name, duration = RECORD.unpack_from(
+            self.map, HEADER.size + index * RECORD.size)
+        # Activation ids start at 1. 0 represents activations without caller
+        return ActivationRecord(
+            self.trial_id, id_, caller_id or None, line, self.names[name],
+            duration)
+
+    def __iter__(self):
+        for index in range(self.size):
+            yield self[index]
+
+    def close(self):
+        """Close mmap and file"""
+        if self.map is not None:
+            self.map.close()
+        self.file.close()
+        self.map = None
+
+    @staticmethod
+    def path_of(trial_id):
+        """Return path of the activation table of trial"""
+        return os.path.join(persistence_config.provenance_path,
+                            GRAPHS_DIRNAME, TABLE_FILENAME.format(trial_id))
+
+    @staticmethod
+    def write(path, trial_id, activations):
+        """Write activations to path
+
+        Arguments:
+        path -- table path
+        trial_id -- trial of activations
+        activations -- iterable of activations in preorder
+        Records are written while activations are read. Only the distinct
+        names are kept in memory
+        """
+        codes = {}
+        names = []
+        size = 0
+
+        directory = os.path.dirname(path)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        temp = "{}.{}".format(path, os.getpid())
+        with content.std_open(temp, "wb") as fil:
+            fil.write(HEADER.pack(MAGIC, TABLE_VERSION, trial_id, 0, 0))
+            for activation in activations:
+                code = codes.get(activation.name)
+                if code is None:
+                    code = codes[activation.name] = len(names)
+                    names.append(activation.name)
+                fil.write(RECORD.pack(
+                    activation.id, activation.caller_id or 0,
+                    activation.line or 0, code, activation.duration))
+                size += 1
+            for name in names:
+                data = name.encode("utf-8")
+                fil.write(NAME_SIZE.pack(len(data)))
+                fil.write(data)
+            fil.seek(0)
+            fil.write(HEADER.pack(
+                MAGIC, TABLE_VERSION, trial_id, size, len(names)))
+        os.rename(temp, path)
+
+    @classmethod
+    def load(cls, trial):
+        """Return activation table of finished trial, creating it if needed
+        Return ActivationQuery for unfinished trials or on failures
+        """
+        if not trial.finished:
+            return ActivationQuery(trial.id)
+        path = cls.path_of(trial.id)
+        try:
+            if not os.path.exists(path):
+                cls.write(path, trial.id, ActivationQuery(trial.id))
+            return cls(path)
+        except (ValueError, struct.error, EnvironmentError):
+            traceback.print_exc()
+            print_msg("Couldn't load activation table", True)
+        return ActivationQuery(trial.id)
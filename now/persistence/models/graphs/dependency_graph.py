@@ -14,8 +14,12 @@ from collections import defaultdict
 
 from future.utils import viewitems, viewkeys, viewvalues
 
-from .. import Activation, Variable, VariableDependency, FileAccess
-from .. import UniqueFileAccess
+from .. import FileAccess
+
+from .dependency_prefetch import DependencyPrefetch, AccessNode
+
+
+ACCESS_TYPES = (FileAccess, AccessNode)
 
 
 class ActivationCluster(object):                                                 # pylint: disable=too-few-public-methods
@@ -30,7 +34,7 @@ class ActivationCluster(object):
 
 def variable_id(variable):
     """Return variable identification for .dot file"""
-    if isinstance(variable, FileAccess):
+    if isinstance(variable, ACCESS_TYPES):
         return "a_{}".format(variable.id)
     act_id = variable.activation_id
     act_id = "global" if act_id == -1 else act_id
@@ -156,6 +160,7 @@ class DependencyFilter(object):
         self.arriving_arrows = {}
         self.variables = {}
         self.accesses = {}
+        self.prefetch = None
 
         self.main_cluster = None
         self.current_cluster = None
@@ -188,14 +193,15 @@ class DependencyFilter(object):
             if not variable in created and variable.type in self.valid_types:
                 self._add_variable(variable, cluster)
 
-    def _all_accesses(self, activation, depth):
+    def _all_accesses(self, activation_id, depth):
         """Get all file accesses recursively if it reaches the maximum depth"""
-        for access in activation.file_accesses:
+        prefetch = self.prefetch
+        for access in prefetch.file_accesses[activation_id]:
             if self.config.show_external_files or access.is_internal:
                 yield access
         if depth + 1 > self.config.max_depth:
-            for act in activation.children:
-                for access in self._all_accesses(act, depth + 1):
+            for child_id in prefetch.children[activation_id]:
+                for access in self._all_accesses(child_id, depth + 1):
                     yield access
 
     def _add_call(self, variable, cluster, recursive_function):
@@ -212,15 +218,15 @@ class DependencyFilter(object):
         subgraph -- user defined call within depth (create cluster)
         """
         accesses = self.accesses
-        return_ = variable.return_dependency
+        prefetch = self.prefetch
+        return_ = prefetch.return_dependency(variable)
         if not return_:
             # Fake call
             return None, "fake"
         activation_id = variable.activation_id
         new_activation_id = return_.activation_id
         if self.config.show_accesses:
-            for access in self._all_accesses(return_.activation, cluster.depth):
-                access = UniqueFileAccess(access._alchemy_pk)
+            for access in self._all_accesses(new_activation_id, cluster.depth):
                 if (not self.config.combine_accesses or
                         access.name not in accesses):
                     access.value = ""
@@ -245,7 +251,7 @@ class DependencyFilter(object):
             self.synonyms[return_] = variable
             fix_value(return_, variable)
             return None, "c_call"
-        if len(list(return_.activation.variables)) == 1:
+        if len(prefetch.activation_variables[new_activation_id]) == 1:
             # Just return. Maybe c_call
             variable.value = return_.value
             self.synonyms[return_] = variable
@@ -257,32 +263,31 @@ class DependencyFilter(object):
             self.synonyms[return_] = variable
             fix_value(return_, variable)
             return None, "max_depth"
-        trial_id = variable.trial_id
-        new_activation = Activation((trial_id, new_activation_id))
         ncluster = self.current_cluster = ActivationCluster(
             new_activation_id, variable.name, cluster.depth + 1
         )
         cluster.components.append(ncluster)
 
-        if any([any(return_.dependencies_as_source),
-                any(variable.dependencies_as_target)]):
+        if (prefetch.dependencies[return_.id] or
+                prefetch.dependents[variable.id]):
 
             self._add_variable(return_, ncluster)
             self.synonyms[variable] = return_
             fix_value(variable, return_)
 
-        self._add_all_variables(new_activation.param_variables, ncluster)
+        self._add_all_variables(
+            prefetch.param_variables(new_activation_id), ncluster)
 
-        recursive_function(new_activation, ncluster)
-        self._prepare_rank(new_activation, ncluster)
+        recursive_function(new_activation_id, ncluster)
+        self._prepare_rank(new_activation_id, ncluster)
         return return_, "subgraph"
 
-    def _prepare_rank(self, activation, cluster):
+    def _prepare_rank(self, activation_id, cluster):
         """Group variables by line"""
         if self.config.rank_line:
             created = self.created
             by_line = defaultdict(list)
-            for variable in activation.variables:
+            for variable in self.prefetch.activation_variables[activation_id]:
                 if variable in created:
                     by_line[variable.line].append(variable)
 
@@ -296,7 +301,7 @@ class DependencyFilter(object):
         synonyms = self.synonyms
         variables = self.variables
 
-        for sid, tid in VariableDependency.fast_load_by_trial(self.trial.id):
+        for sid, tid in self.prefetch.edges:
             osource = variables[sid]
             source = synonyms.get(osource, osource)
             otarget = variables[tid]
@@ -378,11 +383,11 @@ class DependencyFilter(object):
         """Create dataflow graph"""
         synonyms = self.synonyms
         variables = self.variables
-        for activation in self.trial.initial_activations:
-            function(activation, self.main_cluster)
-            self._prepare_rank(activation, self.main_cluster)
+        for activation_id in self.prefetch.initial_activations:
+            function(activation_id, self.main_cluster)
+            self._prepare_rank(activation_id, self.main_cluster)
 
-        arg_orginal = Variable.fast_arg_and_original(self.trial.id)
+        arg_orginal = self.prefetch.arg_and_original()
         for arg_id, original_id in arg_orginal:
             synonyms[variables[arg_id]] = variables[original_id]
             fix_value(variables[arg_id], variables[original_id])
@@ -393,9 +398,9 @@ class DependencyFilter(object):
         self._create_dependencies()
         self._show_dependencies()
 
-    def _simulation_activation(self, activation, cluster):
+    def _simulation_activation(self, activation_id, cluster):
         """Export simulation activation"""
-        for variable in activation.variables:
+        for variable in self.prefetch.activation_variables[activation_id]:
             if (variable.type == "call" and
                     self._add_call(variable, cluster,
                                    self._simulation_activation)[0]):
@@ -403,10 +408,11 @@ class DependencyFilter(object):
             if variable.type in self.valid_types:
                 self._add_variable(variable, cluster)
 
-    def _prospective_activation(self, activation, cluster):
+    def _prospective_activation(self, activation_id, cluster):
         """Export prospective activation"""
         # ToDo: param dependencies
-        for variable in activation.no_param_variables:
+        prefetch = self.prefetch
+        for variable in prefetch.no_param_variables(activation_id):
             if variable.type == "call":
                 return_, mode = self._add_call(variable, cluster,
                                                self._prospective_activation)
@@ -414,26 +420,28 @@ class DependencyFilter(object):
                     self._add_variable(variable, cluster)
 
                 if mode == "fake":
-                    box = variable.box_dependency
+                    box = prefetch.box_dependency(variable)
                     if not box:
                         box = variable
-                    self._add_all_variables(box.dependencies, cluster)
+                    self._add_all_variables(
+                        prefetch.dependencies[box.id], cluster)
 
                 elif mode in ("c_call", "just_return"):
-                    return_ = variable.return_dependency
-                    box = return_.box_dependency
+                    return_ = prefetch.return_dependency(variable)
+                    box = prefetch.box_dependency(return_)
                     if box:
-                        self._add_all_variables(box.dependencies, cluster)
+                        self._add_all_variables(
+                            prefetch.dependencies[box.id], cluster)
 
-                elif mode == "max_depth":
-                    return_ = variable.return_dependency
-                    for var in return_.activation.param_variables:
-                        self._add_all_variables(var.dependencies, cluster)
-                elif mode == "subgraph":
-                    for var in return_.activation.param_variables:
-                        self._add_all_variables(var.dependencies, cluster)
+                elif mode in ("max_depth", "subgraph"):
+                    return_ = prefetch.return_dependency(variable)
+                    for var in prefetch.param_variables(
+                            return_.activation_id):
+                        self._add_all_variables(
+                            prefetch.dependencies[var.id], cluster)
 
-                self._add_all_variables(variable.dependents, cluster)
+                self._add_all_variables(
+                    prefetch.dependents[variable.id], cluster)
 
     def simulation(self):
         """Create simulation graph"""
@@ -463,7 +471,8 @@ class DependencyFilter(object):
         self.synonyms = {}
         self.departing_arrows = defaultdict(dict)
         self.arriving_arrows = defaultdict(dict)
-        self.variables = {v.id: v for v in self.trial.variables}
+        self.prefetch = DependencyPrefetch(self.trial.id)
+        self.variables = self.prefetch.variables
         self.accesses = {}
 
         self.main_cluster = ActivationCluster(-1, "main")
@@ -514,7 +523,7 @@ class ActivationClusterVisitor(object):
         else:
             if not variable_id(component) in self.filter.filtered_variables:
                 return
-            if isinstance(component, FileAccess) and self.visit_access:
+            if isinstance(component, ACCESS_TYPES) and self.visit_access:
                 return self.visit_access(component)                              # pylint: disable=not-callable
             if self.visit_variable:
                 return self.visit_variable(component)                            # pylint: disable=not-callable
@@ -620,7 +629,7 @@ class DotVisitor(ActivationClusterVisitor):
         """Return color schema for variable
         or fallback if there is no valid schema
         """
-        if isinstance(variable, FileAccess):
+        if isinstance(variable, ACCESS_TYPES):
             return self.types.get("access") or self.fallback
         return self.types.get(variable.type) or self.fallback
 
@@ -637,14 +646,16 @@ class PrologVisitor(ActivationClusterVisitor):
     def usages(self):
         """Variable usages generator"""
         filtered_variables = self.filter.filtered_variables
-        for usage in self.filter.trial.variable_usages:
-            variable = usage.variable
-            if variable_id(variable) in filtered_variables:
-                yield usage
-            else:
+        variables = self.filter.variables
+        for usage in self.filter.prefetch.usages():
+            variable = variables.get(usage.variable_id)
+            if variable is None:
+                continue
+            if variable_id(variable) not in filtered_variables:
                 variable = self.filter.synonyms.get(variable, variable)
-                if variable_id(variable) in filtered_variables:
-                    yield FakeVariableUsage(usage, variable)
+                if variable_id(variable) not in filtered_variables:
+                    continue
+            yield FakeVariableUsage(usage, variable)
 
     @property
     def dependencies(self):
@@ -669,6 +680,8 @@ class PrologVisitor(ActivationClusterVisitor):
 
     def visit_variable(self, variable):
         """Visit variable"""
+        if variable.time is None:
+            variable.time = self.filter.prefetch.variable_time(variable.id)
         self.variables.append(variable)
 
 
@@ -0,0 +1,192 @@
+# Copyright (c) 2018, 2019, 2020 President and Fellows of Harvard College.
+# This file is part of ProvBuild.
+
+"""Dependency Prefetch. In-memory maps of the provenance of a trial"""
+from __future__ import (absolute_import, print_function,
+                        division, unicode_literals)
+
+import os
+
+from collections import defaultdict
+from datetime import datetime
+
+from ... import persistence_config
+from ...snapshot import TrialSnapshot
+
+
+TIMESTAMP_FORMATS = ("%Y-%m-%d %H:%M:%S.%f", "%Y-%m-%d %H:%M:%S")
+
+
+def parse_timestamp(text):
+    """Return datetime of a raw SQLite TIMESTAMP. None if it is invalid"""
+    if not text:
+        return None
+    for timestamp_format in TIMESTAMP_FORMATS:
+        try:
+            return datetime.strptime(text, timestamp_format)
+        except ValueError:
+            pass
+    return None
+
+
+class VariableNode(object):                                                      # pylint: disable=too-few-public-methods
+    """Variable of the dependency graph. Mimics Variable attributes"""
+
+    __slots__ = (
+        "trial_id", "activation_id", "id", "name", "line", "value", "type",
+        "time",
+    )
+
+    def __init__(self, trial_id, row):
+        self.trial_id = trial_id
+        self.activation_id = row.activation_id
+        self.id = row.id                                                         # pylint: disable=invalid-name
+        self.name = row.name
+        self.line = row.line
+        self.value = row.value
+        self.type = row.type                                                     # pylint: disable=invalid-name
+        self.time = None
+
+    def __repr__(self):
+        return (
+            "Variable({0.trial_id}, {0.activation_id}, "
+            "{0.id}, {0.name}, {0.line}, {0.type})"
+        ).format(self)
+
+
+class AccessNode(object):                                                        # pylint: disable=too-few-public-methods
+    """File access of the dependency graph. Mimics FileAccess attributes"""
+
+    __slots__ = (
+        "trial_id", "id", "name", "mode", "timestamp",
+        "function_activation_id", "value", "line",
+    )
+
+    def __init__(self, trial_id, row):
+        self.trial_id = trial_id
+        self.id = row.id                                                         # pylint: disable=invalid-name
+        self.name = row.name
+        self.mode = row.mode or ""
+        self.timestamp = parse_timestamp(row.timestamp)
+        self.function_activation_id = row.function_activation_id
+        self.value = ""
+        self.line = ""
+
+    @property
+    def is_internal(self):
+        """Check if the file is inside the project directory"""
+        return (
+            not os.path.isabs(self.name) or
+            persistence_config.base_path in self.name
+        )
+
+    def __repr__(self):
+        return "FileAccess({0.trial_id}, {0.id}, {0.name})".format(self)
+
+
+class DependencyPrefetch(object):                                                # pylint: disable=too-many-instance-attributes
+    """Load variables, dependencies, activations, and file accesses of a
+    trial in a few bulk queries. Answer the relationships that the
+    dependency filter follows from in-memory maps
+
+    Lists follow the id order of the rows
+    """
+
+    def __init__(self, trial_id):
+        self.trial_id = trial_id
+        self.snapshot = snapshot = TrialSnapshot(trial_id)
+
+        # Variable id -> VariableNode
+        self.variables = variables = {}
+        # Activation id -> list of VariableNode
+        self.activation_variables = defaultdict(list)
+        for row in snapshot.variables:
+            if row.activation_id is None:
+                # Folded by loop compaction
+                continue
+            node = variables[row.id] = VariableNode(trial_id, row)
+            self.activation_variables[row.activation_id].append(node)
+
+        # (source id, target id) of each dependency
+        self.edges = []
+        # Source id -> list of targets (Variable.dependencies)
+        self.dependencies = defaultdict(list)
+        # Target id -> list of sources (Variable.dependents)
+        self.dependents = defaultdict(list)
+        for row in snapshot.dependencies:
+            self.edges.append((row.source_id, row.target_id))
+            source = variables.get(row.source_id)
+            target = variables.get(row.target_id)
+            if source is not None and target is not None:
+                self.dependencies[source.id].append(target)
+                self.dependents[target.id].append(source)
+
+        # Activation ids without caller
+        self.initial_activations = []
+        # Activation id -> list of children ids
+        self.children = defaultdict(list)
+        for row in snapshot.activations:
+            if row.caller_id is None:
+                self.initial_activations.append(row.id)
+            else:
+                self.children[row.caller_id].append(row.id)
+
+        # Activation id -> list of AccessNode
+        self.file_accesses = defaultdict(list)
+        for row in snapshot.file_accesses:
+            self.file_accesses[row.function_activation_id].append(
+                AccessNode(trial_id, row))
+
+    def return_dependency(self, variable):
+        """Return "return" dependency of variable or None"""
+        for target in self.dependencies.get(variable.id, ()):
+            if target.name == "return":
+                return target
+        return None
+
+    def box_dependency(self, variable):
+        """Return black-box or gray-box dependency of variable or None"""
+        for target in self.dependencies.get(variable.id, ()):
+            if target.name and target.name.endswith("box--"):
+                return target
+        return None
+
+    def arg_and_original(self):
+        """Return tuples with ids of variables of type arg and of the
+        original variables with the same name, through a box
+        Replace Variable.fast_arg_and_original
+        """
+        dependencies = self.dependencies
+        for variable_id in sorted(self.variables):
+            variable = self.variables[variable_id]
+            if variable.type != "arg":
+                continue
+            for box in dependencies.get(variable_id, ()):
+                for original in dependencies.get(box.id, ()):
+                    if original.name == variable.name:
+                        yield variable_id, original.id
+
+    def param_variables(self, activation_id):
+        """Return param variables of activation"""
+        return [
+            variable for variable in self.activation_variables[activation_id]
+            if variable.type == "param"
+        ]
+
+    def no_param_variables(self, activation_id):
+        """Return variables of activation that are not params"""
+        return [
+            variable for variable in self.activation_variables[activation_id]
+            if variable.type != "param"
+        ]
+
+    def usages(self):
+        """Return variable usages of trial"""
+        return self.snapshot.usages
+
+    def variable_time(self, variable_id):
+        """Return time of variable"""
+        times = self.snapshot.variable_times
+        if not 0 < variable_id <= len(times):
+            return None
+        return parse_timestamp(times[variable_id - 1].time)
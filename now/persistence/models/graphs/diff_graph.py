@@ -13,11 +13,12 @@ from copy import copy
 from collections import defaultdict
 from functools import cmp_to_key
 
-from apted import meta_chained_config, Config, APTED
+from apted import Config
 from future.utils import viewitems
 
 from .trial_graph import Node
 from .structures import Graph, prepare_cache
+from .tree_diff import edit_mapping
 
 
 class NowConfig(Config):
@@ -31,9 +32,6 @@ class NowConfig(Config):
         return 3 if node1.name != node2.name else 0
 
 
-CONFIG = meta_chained_config(NowConfig)()
-
-
 @cmp_to_key
 def children_cmp(node1, node2):
     """Compares children node for sorting"""
@@ -65,14 +63,14 @@ def merge(node1, node2, id_to_node1, id_to_node2):
 
 def create_mapping(root1, root2):
     """Creates mapping between trees rooted at root1 and root2
+    Anchor identical subtrees before running APTED (see tree_diff)
 
     Returns:
     -- new root
     -- map from node index 1 to resulting node
     -- map from node index 2 to resulting node
     """
-    apted = APTED(root1, root2, CONFIG)
-    mapping = apted.compute_edit_mapping()
+    mapping = edit_mapping(root1, root2, NowConfig)
 
     combined_duration = copy(root1.duration)
     combined_duration.update(root2.duration)
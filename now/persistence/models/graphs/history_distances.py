@@ -0,0 +1,194 @@
+# Copyright (c) 2018, 2019, 2020 President and Fellows of Harvard College.
+# This file is part of ProvBuild.
+
+"""History Distances. Distances between trials that follow parent links"""
+from __future__ import (absolute_import, print_function,
+                        division, unicode_literals)
+
+from collections import OrderedDict, deque
+
+from future.utils import viewitems
+
+
+MAX_DISTANCE = float("inf")
+
+
+class TrialForest(object):
+    """Forest of trials built from their parent_id
+
+    Keep the depth of each trial and a table of ancestors at powers of two
+    (binary lifting). Adding a trial costs O(log T) and answers ancestor,
+    lowest common ancestor and distance queries in O(log T)
+    Distances follow the parent links: the distance from a trial to one of
+    its ancestors is the difference of depths. Other pairs are unreachable
+    """
+
+    def __init__(self):
+        # Trial id -> parent id or None
+        self.parent = {}
+        # Trial id -> depth. Roots have depth 0
+        self.depth = {}
+        # Trial id -> list of ancestors. jumps[tid][k] is the 2^k-th ancestor
+        self.jumps = {}
+
+    def __contains__(self, tid):
+        return tid in self.depth
+
+    def __len__(self):
+        return len(self.depth)
+
+    def add(self, tid, parent_id):
+        """Add trial to forest. The parent must be in the forest
+        Consider the trial a root if parent_id is None
+        """
+        self.parent[tid] = parent_id
+        jumps = self.jumps[tid] = []
+        if parent_id is None:
+            self.depth[tid] = 0
+            return
+        self.depth[tid] = self.depth[parent_id] + 1
+        ancestor, k = parent_id, 0
+        while ancestor is not None:
+            jumps.append(ancestor)
+            above = self.jumps[ancestor]
+            ancestor = above[k] if k < len(above) else None
+            k += 1
+
+    def update(self, parents):
+        """Add new trials to forest. Rebuild it if a parent changed
+
+        Arguments:
+        parents -- dict of trial id to parent id
+        Parents that are not in the dict are ignored
+        """
+        for tid, parent_id in viewitems(parents):
+            if parent_id not in parents:
+                parent_id = None
+            if tid in self.depth and self.parent[tid] != parent_id:
+                self.__init__()
+                break
+
+        for tid in sorted(parents):
+            if tid in self.depth:
+                continue
+            # Add ancestors before descendants
+            stack = [tid]
+            while stack:
+                current = stack[-1]
+                parent_id = parents[current]
+                if parent_id not in parents or parent_id in stack:
+                    parent_id = None
+                if parent_id is not None and parent_id not in self.depth:
+                    stack.append(parent_id)
+                    continue
+                self.add(current, parent_id)
+                stack.pop()
+
+    def ancestor(self, tid, distance):
+        """Return the ancestor of tid at distance or None"""
+        if distance > self.depth[tid]:
+            return None
+        k = 0
+        while distance and tid is not None:
+            if distance & 1:
+                tid = self.jumps[tid][k]
+            distance >>= 1
+            k += 1
+        return tid
+
+    def lca(self, first, second):
+        """Return the lowest common ancestor of two trials or None"""
+        if self.depth[first] < self.depth[second]:
+            first, second = second, first
+        first = self.ancestor(first, self.depth[first] - self.depth[second])
+        if first == second:
+            return first
+        for k in reversed(range(len(self.jumps[first]))):
+            first_jumps, second_jumps = self.jumps[first], self.jumps[second]
+            if k < len(first_jumps) and first_jumps[k] != second_jumps[k]:
+                first, second = first_jumps[k], second_jumps[k]
+        return self.parent[first]
+
+    def distance(self, source, target):
+        """Return the distance from source to its ancestor target
+        Return MAX_DISTANCE if target is not an ancestor of source
+        """
+        difference = self.depth[source] - self.depth[target]
+        if difference < 0 or self.ancestor(source, difference) != target:
+            return MAX_DISTANCE
+        return difference
+
+
+class TrialDistances(object):
+    """Distances between the trials of a history, over a TrialForest
+    Excluded trials are not targets, but paths can go through them
+    """
+
+    def __init__(self, forest, ids):
+        self.forest = forest
+        self.ids = ids
+        self.excluded = set()
+        self._nearest = None
+
+    def exclude(self, tid):
+        """Remove trial from targets"""
+        self.excluded.add(tid)
+        self._nearest = None
+
+    def nearest(self, tid):
+        """Return (closest ancestor that is not excluded, distance) of tid
+        Return (None, MAX_DISTANCE) if there is no such ancestor
+        """
+        if self._nearest is None:
+            self._nearest = self._find_nearest()
+        return self._nearest.get(tid, (None, MAX_DISTANCE))
+
+    def _find_nearest(self):
+        """Find closest ancestors of all trials in a single pass"""
+        forest, excluded = self.forest, self.excluded
+        result = {}
+        for tid in sorted(self.ids, key=forest.depth.__getitem__):
+            parent_id = forest.parent[tid]
+            if parent_id is None:
+                continue
+            if parent_id not in excluded:
+                result[tid] = (parent_id, 1)
+            elif parent_id in result:
+                ancestor, distance = result[parent_id]
+                result[tid] = (ancestor, distance + 1)
+        return result
+
+
+class NodeDistances(object):
+    """Distances between summarized nodes. Nodes may have many parents"""
+
+    def __init__(self, ids):
+        # Node id -> ordered parent ids
+        self.parents = OrderedDict((nid, OrderedDict()) for nid in ids)
+        self.excluded = set()
+
+    def connect(self, source, target):
+        """Add unit distance from source to target"""
+        if not source == target:
+            self.parents[source][target] = 1
+
+    def exclude(self, nid):
+        """Remove node from targets"""
+        self.excluded.add(nid)
+
+    def nearest(self, nid):
+        """Return (closest ancestor that is not excluded, distance) of nid
+        Return (None, MAX_DISTANCE) if there is no such ancestor
+        """
+        visited = {nid}
+        queue = deque([(nid, 0)])
+        while queue:
+            current, distance = queue.popleft()
+            for parent_id in self.parents.get(current, ()):
+                if parent_id in visited:
+                    continue
+                if parent_id not in self.excluded:
+                    return parent_id, distance + 1
+                visited.add(parent_id)
+                queue.append((parent_id, distance + 1))
+        return None, MAX_DISTANCE
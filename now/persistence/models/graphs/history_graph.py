@@ -12,11 +12,13 @@ import weakref
 
 from collections import OrderedDict, defaultdict
 
-from future.utils import viewvalues
+from future.utils import viewitems, viewvalues
 
 from ....utils.cross_version import zip_longest
 from ..trial import Trial
 from ..tag import Tag
+from .history_distances import TrialForest, TrialDistances, NodeDistances
+from .history_distances import MAX_DISTANCE
 from .structures import Graph
 
 
@@ -31,6 +33,8 @@ class HistoryGraph(Graph):
     Present history graph on Jupyter and on command line"""
 
     cache = {}
+    # Forest of all trials. Updated incrementally as trials are added
+    forest = TrialForest()
 
     def __init__(self, history, width=500, height=500):
         self.history = weakref.proxy(history)
@@ -59,8 +63,6 @@ class HistoryGraph(Graph):
 
         tmap, graph = self._summarize(tmap, graph)
 
-        self._calculate_distances(graph)
-
         nodes, scripts = self._filter_graph(tmap, graph)
 
         edges, order, children, actual_graph = self._create_edges(
@@ -136,31 +138,33 @@ class HistoryGraph(Graph):
 
         return tmap
 
-    def _create_graph(self, trial_map):  # pylint: disable=no-self-use
-        """Create graph with initial distances
+    def _create_graph(self, trial_map):
+        """Create distance graph
+
+        The graph follows parent links on the trial forest
+        The forest is shared by all histories and it only processes trials
+        that were added after the last call
+
+
+        The returned graph can be used to:
+        -find parent trial after filter
+        -find previous trials in a branch line
 
-        The graph is represented as a dict of dict of int
-        Int values represent the distance between two nodes
 
         Return:
-        graph -- distance graph
+        graph -- TrialDistances
 
         Arguments:
         trial_map -- ordered trial map
         """
-        graph = defaultdict(lambda: defaultdict(lambda: MAX_IN_GRAPH))
-
-        for trial in viewvalues(trial_map):
-            graph[trial.id][trial.id] = 0
-            if trial.parent_id is not None:
-                graph[trial.id][trial.parent_id] = 1
-
-        return graph
+        self.forest.update({
+            trial.id: trial.parent_id for trial in viewvalues(trial_map)
+        })
+        return TrialDistances(self.forest, list(trial_map))
 
     def _summarize(self, trial_map, graph):  # pylint: disable=too-many-locals
         """Add display field to trials based on auto tags and summarizes"""
         node_map = OrderedDict()
-        new_graph = defaultdict(lambda: defaultdict(lambda: MAX_IN_GRAPH))
         new_tmap = {}
 
         for tag in Tag.auto_tags():
@@ -193,48 +197,15 @@ class HistoryGraph(Graph):
 
         node_map = OrderedDict(reversed(list(node_map.items())))
 
-        new_graph = defaultdict(lambda: defaultdict(lambda: MAX_IN_GRAPH))
-
-        for node in viewvalues(node_map):
-            new_graph[node.id][node.id] = 0
+        new_graph = NodeDistances(node_map)
 
-        for origin, distances in graph.items():
-            if origin not in new_tmap:
-                continue
-            orignode = new_tmap[origin].id
-            for target, dist in distances.items():
-                if target not in new_tmap:
-                    continue
-                targnode = new_tmap[target].id
-                new_graph[orignode][targnode] = min(
-                    new_graph[orignode][targnode], dist
-                )
+        for origin, node in viewitems(new_tmap):
+            parent_id = graph.forest.parent.get(origin)
+            if parent_id in new_tmap:
+                new_graph.connect(node.id, new_tmap[parent_id].id)
 
         return node_map, new_graph
 
-    def _calculate_distances(self, graph):  # pylint: disable=no-self-use
-        """Prepare history graph
-
-
-        The graph is represented as a dict of dict of int
-        Int values represent the distance between two nodes
-        Use Floyd-Warshall algorithm to calculate distances
-
-
-        The returned graph can be used to:
-        -find parent trial after filter
-        -find previous trials in a branch line
-
-
-        Arguments:
-        graph -- distance graph
-        """
-        for k in graph:
-            for i in graph:
-                for j in graph:
-                    if graph[i][j] > graph[i][k] + graph[k][j]:
-                        graph[i][j] = graph[i][k] + graph[k][j]
-
     def _filter_graph(self, trial_map, graph):
         """Filter history graph
 
@@ -249,7 +220,7 @@ class HistoryGraph(Graph):
 
         Arguments:
         trial_map -- ordered trial map
-        graph -- distance graph
+        graph -- TrialDistances or NodeDistances
         """
         status = self.history.status.lower()
         script = self.history.script
@@ -258,8 +229,7 @@ class HistoryGraph(Graph):
         nid = 0
         for trial in reversed(list(trial_map.values())):
             if not trial.match_status(status) or not trial.match_script(script):
-                for tid in trial_map:
-                    graph[tid][trial.id] = MAX_IN_GRAPH
+                graph.exclude(trial.id)
             else:
                 nodes.append(trial)
                 trial.nid = nid
@@ -272,7 +242,7 @@ class HistoryGraph(Graph):
         """Create edges for graph
 
         Arguments:
-        graph -- dict of dict of int with min distances between trials
+        graph -- TrialDistances or NodeDistances
         nodes -- list of nodes from the oldest to the newest
         trial_map -- map of trial.id to trial node
 
@@ -306,7 +276,7 @@ class HistoryGraph(Graph):
 
 
         Arguments:
-        graph -- dict of dict of int with min distances between trials
+        graph -- TrialDistances or NodeDistances
         nodes -- list of nodes from the oldest to the newest
 
         Keyword arguments:
@@ -317,11 +287,8 @@ class HistoryGraph(Graph):
 
         for trial in reversed(nodes):
             tid = trial.id
-            target = min(
-                graph[tid],
-                key=lambda x, i=tid: float("inf") if x == i else graph[i][x]
-            )
-            if graph[tid][target] != MAX_IN_GRAPH:
+            target, distance = graph.nearest(tid)
+            if distance != MAX_DISTANCE:
                 yield (tid, target)
             script_order[trial.script] = 1
 
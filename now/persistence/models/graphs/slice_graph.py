@@ -0,0 +1,101 @@
+# Copyright (c) 2018, 2019, 2020 President and Fellows of Harvard College.
+# This file is part of ProvBuild.
+
+"""Slice Graph Module"""
+from __future__ import (absolute_import, print_function,
+                        division, unicode_literals)
+
+from collections import defaultdict
+
+
+class SliceGraph(object):                                                        # pylint: disable=too-many-instance-attributes
+    """In-memory index of the slicing provenance of a trial
+
+    Index variable_dependency rows by source_id and target_id, optionally
+    filtered by dependency type, and index variables and activations by the
+    attributes that 'update' uses to find related calls.
+    All indexes keep the order of the rows, so traversals visit the
+    neighbours in the same order as a scan over the table.
+    """
+
+    def __init__(self, variables, dependencies, activations=()):
+        # source_id -> [dependency]
+        self._by_source = defaultdict(list)
+        # (source_id, type) -> [dependency]
+        self._by_source_type = defaultdict(list)
+        # target_id -> [dependency]
+        self._by_target = defaultdict(list)
+        # (target_id, type) -> [dependency]
+        self._by_target_type = defaultdict(list)
+        for dependency in dependencies:
+            source, target = dependency.source_id, dependency.target_id
+            self._by_source[source].append(dependency)
+            self._by_source_type[(source, dependency.type)].append(dependency)
+            self._by_target[target].append(dependency)
+            self._by_target_type[(target, dependency.type)].append(dependency)
+
+        # [call variable]
+        self._calls = []
+        # line -> [call variable id]
+        self._calls_by_line = defaultdict(list)
+        # (name, line) -> [variable]
+        self._by_name_line = defaultdict(list)
+        for variable in variables:
+            if variable.type == "call":
+                self._calls.append(variable)
+                self._calls_by_line[variable.line].append(variable.id)
+            self._by_name_line[(variable.name, variable.line)].append(variable)
+
+        # caller_id -> [activation]
+        self._callees = defaultdict(list)
+        # (name, line) -> [activation id]
+        self._activations_by_name_line = defaultdict(list)
+        for activation in activations:
+            self._callees[activation.caller_id].append(activation)
+            self._activations_by_name_line[
+                (activation.name, activation.line)].append(activation.id)
+
+    def dependencies(self, source_id, dtype=None):
+        """Return dependencies in which source_id is the dependent
+
+
+        Keyword arguments:
+        dtype -- filter dependency type (default=None)
+        """
+        if dtype is None:
+            return self._by_source.get(source_id, ())
+        return self._by_source_type.get((source_id, dtype), ())
+
+    def dependents(self, target_id, dtype=None):
+        """Return dependencies in which target_id is the dependency
+
+
+        Keyword arguments:
+        dtype -- filter dependency type (default=None)
+        """
+        if dtype is None:
+            return self._by_target.get(target_id, ())
+        return self._by_target_type.get((target_id, dtype), ())
+
+    def related_calls(self, name):
+        """Return ids of call variables whose name starts with name"""
+        return [
+            variable.id for variable in self._calls
+            if variable.name.startswith(name)
+        ]
+
+    def calls_at(self, line):
+        """Return ids of call variables in line"""
+        return list(self._calls_by_line.get(line, ()))
+
+    def variables_at(self, name, line):
+        """Return variables with name defined in line"""
+        return self._by_name_line.get((name, line), ())
+
+    def activations_at(self, name, line):
+        """Return ids of activations of name called in line"""
+        return list(self._activations_by_name_line.get((name, line), ()))
+
+    def callees(self, activation_id):
+        """Return activations called by activation_id"""
+        return self._callees.get(activation_id, ())
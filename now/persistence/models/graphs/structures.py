@@ -31,6 +31,19 @@ class Graph(object):
                 .replace(">", "\\u003e"))
 
 
+def apply_layout(graph, result):
+    """Apply layout attributes of graph to a summarization result
+    Summarizations are cached without them
+
+    Arguments:
+    graph -- TrialGraph or DiffGraph
+    result -- tuple (finished, graph dict, nodes)
+    """
+    finished, data, nodes = result
+    data = dict(data, width=graph.width, height=graph.height)
+    return finished, data, nodes
+
+
 def prepare_cache(get_type):
     """Decorator: Load graph from cache"""
     def cache(name, attrs=""):
@@ -42,6 +55,7 @@ def prepare_cache(get_type):
 
                 Find graph by type, name and attributes
                 If graph is cached, return it
+                Layout attributes (width, height) are not part of the cache
 
                 Return:
                 finished -- trial has finished
@@ -64,7 +78,7 @@ def prepare_cache(get_type):
                             if not result[0]:
                                 continue
                             cache_session.close()                                # pylint: disable=no-member
-                            return result
+                            return apply_layout(self, result)
                     except (ValueError, exc.SQLAlchemyError):
                         traceback.print_exc()
                         print_msg("Couldn't load graph cache", True)
@@ -82,7 +96,7 @@ def prepare_cache(get_type):
                     traceback.print_exc()
                     print_msg("Couldn't store graph cache", True)
                 cache_session.close()                                            # pylint: disable=no-member
-                return graph
+                return apply_layout(self, graph)
             return load
         return dec
     return cache
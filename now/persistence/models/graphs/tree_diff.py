@@ -0,0 +1,273 @@
+# Copyright (c) 2018, 2019, 2020 President and Fellows of Harvard College.
+# This file is part of ProvBuild.
+
+"""Tree Diff. Edit mapping between summarization trees
+
+Trees with at most APTED_CUTOFF nodes are mapped by APTED. Larger trees are
+mapped in two phases. Phase one anchors identical subtrees by their
+structure (name and children structures), if the structure occurs once in
+each tree. Phase two replaces each anchored subtree by a leaf and runs
+APTED on the remainder. Remainders larger than APTED_CUTOFF are aligned
+top-down, running APTED only on small enough pairs of subtrees
+"""
+from __future__ import (absolute_import, print_function,
+                        division, unicode_literals)
+
+from collections import Counter
+from difflib import SequenceMatcher
+
+from apted import meta_chained_config, APTED
+
+
+# Run APTED on trees and pairs of remainder subtrees with at most
+# APTED_CUTOFF nodes
+APTED_CUTOFF = 300
+# Anchor identical subtrees with at least ANCHOR_MIN_SIZE nodes
+ANCHOR_MIN_SIZE = 2
+
+
+def children_of(node):
+    """Return children of summarization node"""
+    return node.children or []
+
+
+def preorder(root):
+    """Iterate subtree of summarization node in preorder"""
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(reversed(children_of(node)))
+
+
+class IndexedTree(object):                                                       # pylint: disable=too-few-public-methods
+    """Structure id and size of each node of a summarization tree
+    Nodes are keyed by id(node)
+    """
+
+    def __init__(self, root, structures):
+        """Index tree
+
+        Arguments:
+        root -- root node
+        structures -- dict of (name, children structure ids) to structure id
+                      shared by the compared trees
+        """
+        self.root = root
+        self.nodes = list(preorder(root))
+        self.sid = {}
+        self.size = {}
+        for node in reversed(self.nodes):
+            children = children_of(node)
+            key = (node.name, tuple(self.sid[id(child)] for child in children))
+            sid = structures.get(key)
+            if sid is None:
+                sid = structures[key] = len(structures)
+            self.sid[id(node)] = sid
+            self.size[id(node)] = 1 + sum(
+                self.size[id(child)] for child in children)
+
+
+def find_anchors(tree1, tree2, min_size=ANCHOR_MIN_SIZE):
+    """Pair identical subtrees of tree1 and tree2 whose structure occurs
+    once in each tree. Larger subtrees first
+
+    Repeated structures are not anchored: picking one of their occurrences
+    may force more insertions and deletions than the edit distance.
+    Anchored subtrees do not overlap. A unique subtree inside another unique
+    subtree is part of its anchor
+    Return dict of id(node) to anchor number for both trees
+    """
+    counts1 = Counter(tree1.sid[id(node)] for node in tree1.nodes)
+    counts2 = Counter(tree2.sid[id(node)] for node in tree2.nodes)
+    unique2 = {
+        tree2.sid[id(node)]: node for node in tree2.nodes
+        if node is not tree2.root and counts2[tree2.sid[id(node)]] == 1
+    }
+
+    anchors = {}
+    covered = set()
+    for node in tree1.nodes:
+        key = id(node)
+        sid = tree1.sid[key]
+        if (key in covered or node is tree1.root or
+                tree1.size[key] < min_size or counts1[sid] != 1 or
+                sid not in unique2):
+            continue
+        other = unique2[sid]
+        anchors[key] = anchors[id(other)] = len(anchors) // 2
+        covered.update(id(child) for child in preorder(node))
+    return anchors
+
+
+class ReducedNode(object):                                                       # pylint: disable=too-few-public-methods
+    """Node of a tree with anchored subtrees replaced by leaves"""
+
+    __slots__ = ("node", "name", "parent_index", "children", "anchor",
+                 "size", "reduced_size")
+
+    def __init__(self, node, anchor, size):
+        self.node = node
+        self.name = node.name
+        self.parent_index = node.parent_index
+        self.children = []
+        self.anchor = anchor
+        # Number of original nodes represented by this node
+        self.size = size if anchor is not None else 1
+        # Number of reduced nodes in subtree
+        self.reduced_size = 1
+
+
+def reduce_tree(tree, anchors):
+    """Return ReducedNode root of tree"""
+    root = ReducedNode(tree.root, anchors.get(id(tree.root)),
+                       tree.size[id(tree.root)])
+    order = [root]
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        if current.anchor is not None:
+            continue
+        for child in children_of(current.node):
+            reduced = ReducedNode(child, anchors.get(id(child)),
+                                  tree.size[id(child)])
+            current.children.append(reduced)
+            order.append(reduced)
+            stack.append(reduced)
+    for reduced in reversed(order):
+        reduced.reduced_size += sum(
+            child.reduced_size for child in reduced.children)
+    return root
+
+
+def anchored_config(config_cls):
+    """Return chained APTED config for reduced trees
+
+    Anchored leaves cost their size to delete or insert, and can only be
+    renamed to their pair
+    """
+    class AnchoredConfig(config_cls):
+        """APTED configuration for reduced trees"""
+
+        def delete(self, node):
+            """Cost of deleting node"""
+            return node.size * super(AnchoredConfig, self).delete(node)
+
+        def insert(self, node):
+            """Cost of inserting node"""
+            return node.size * super(AnchoredConfig, self).insert(node)
+
+        def rename(self, node1, node2):
+            """Cost of renaming node1 to node2"""
+            if node1.anchor is None and node2.anchor is None:
+                return super(AnchoredConfig, self).rename(node1, node2)
+            if node1.anchor == node2.anchor:
+                return 0
+            # Avoid the chained costs of subclasses
+            return (AnchoredConfig.delete(self, node1) +
+                    AnchoredConfig.insert(self, node2))
+
+    return meta_chained_config(AnchoredConfig)()
+
+
+def label(reduced):
+    """Return label for aligning children"""
+    if reduced.anchor is not None:
+        return ("anchor", reduced.anchor)
+    return ("name", reduced.name)
+
+
+def reduced_mapping(root1, root2, config, cutoff=APTED_CUTOFF):
+    """Return list of pairs of mapped ReducedNodes. None for insertions and
+    deletions
+
+    Run APTED on pairs of subtrees with at most cutoff nodes. Align
+    children of larger pairs by their labels
+    """
+    result = []
+    pending = [(root1, root2)]
+    while pending:
+        node1, node2 = pending.pop()
+        if max(node1.reduced_size, node2.reduced_size) <= cutoff:
+            result.extend(APTED(node1, node2, config).compute_edit_mapping())
+            continue
+        result.append((node1, node2))
+        children1, children2 = node1.children, node2.children
+        matcher = SequenceMatcher(
+            None, [label(child) for child in children1],
+            [label(child) for child in children2], autojunk=False)
+        matched1, matched2 = set(), set()
+        for start1, start2, size in matcher.get_matching_blocks():
+            for offset in range(size):
+                child1 = children1[start1 + offset]
+                child2 = children2[start2 + offset]
+                matched1.add(start1 + offset)
+                matched2.add(start2 + offset)
+                if child1.anchor is not None:
+                    result.append((child1, child2))
+                else:
+                    pending.append((child1, child2))
+        for index, child in enumerate(children1):
+            if index not in matched1:
+                result.extend((reduced, None) for reduced in preorder(child))
+        for index, child in enumerate(children2):
+            if index not in matched2:
+                result.extend((None, reduced) for reduced in preorder(child))
+    return result
+
+
+def expand(pairs):
+    """Expand mapping of ReducedNodes into mapping of summarization nodes"""
+    for reduced1, reduced2 in pairs:
+        if reduced1 is not None and reduced2 is not None:
+            if reduced1.anchor is None and reduced2.anchor is None:
+                yield reduced1.node, reduced2.node
+                continue
+            if reduced1.anchor == reduced2.anchor:
+                for node1, node2 in zip(preorder(reduced1.node),
+                                        preorder(reduced2.node)):
+                    yield node1, node2
+                continue
+        if reduced1 is not None:
+            nodes = (preorder(reduced1.node) if reduced1.anchor is not None
+                     else [reduced1.node])
+            for node in nodes:
+                yield node, None
+        if reduced2 is not None:
+            nodes = (preorder(reduced2.node) if reduced2.anchor is not None
+                     else [reduced2.node])
+            for node in nodes:
+                yield None, node
+
+
+def edit_mapping(root1, root2, config_cls, cutoff=APTED_CUTOFF):
+    """Compute edit mapping between summarization trees
+
+    Run APTED on the trees if both have at most cutoff nodes. Otherwise,
+    anchor unique identical subtrees and map the reduced trees
+    Return list of pairs of mapped nodes. None for insertions and deletions
+
+
+    Arguments:
+    root1 -- root of first tree
+    root2 -- root of second tree
+    config_cls -- APTED Config class. It is not chained
+
+
+    Keyword arguments:
+    cutoff -- maximum size of trees and subtrees compared by APTED
+              (default=APTED_CUTOFF)
+    """
+    structures = {}
+    tree1 = IndexedTree(root1, structures)
+    tree2 = IndexedTree(root2, structures)
+    if tree1.sid[id(root1)] == tree2.sid[id(root2)]:
+        return list(zip(tree1.nodes, tree2.nodes))
+    if max(len(tree1.nodes), len(tree2.nodes)) <= cutoff:
+        return APTED(root1, root2, meta_chained_config(config_cls)()
+                     ).compute_edit_mapping()
+    anchors = find_anchors(tree1, tree2)
+    pairs = reduced_mapping(
+        reduce_tree(tree1, anchors), reduce_tree(tree2, anchors),
+        anchored_config(config_cls), cutoff=cutoff)
+    return list(expand(pairs))
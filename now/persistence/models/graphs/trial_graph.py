@@ -9,12 +9,14 @@ from __future__ import (absolute_import, print_function,
 
 import weakref
 
+from array import array
 from collections import defaultdict
 
-from future.utils import viewitems
+from future.utils import viewitems, text_to_native_str as n
 
 from ....utils.data import DotDict
 
+from .activation_table import ActivationTable
 from .structures import prepare_cache
 from .structures import Graph
 
@@ -22,6 +24,13 @@ from .structures import Graph
 Node = DotDict  # pylint: disable=invalid-name
 
 
+def activation_tooltip(activation):
+    """Return tooltip of a single activation"""
+    return "T{} - {}<br>Line {}<br>".format(
+        activation.trial_id, activation.id, activation.line
+    )
+
+
 class Summarization(object):
     """Summarization algorithm
 
@@ -213,10 +222,7 @@ class LineNameSummarization(Summarization):
             node.trial_ids.append(trial_id)
         node.activations[trial_id].append(activation.id)
         node.duration[trial_id] += activation.duration
-
-        node.tooltip[trial_id] += "T{} - {}<br>Line {}<br>".format(
-            trial_id, activation.id, activation.line
-        )
+        node.tooltip[trial_id] += activation_tooltip(activation)
 
     def calculate_match(self, node):
         """Calculate match. Use line and name"""
@@ -264,6 +270,112 @@ class NoMatchSummarization(LineNameSummarization):
         return super(NoMatchSummarization, self).insert_sequence(call, last)
 
 
+class _OpenNode(object):                                                         # pylint: disable=too-few-public-methods
+    """Node of StructureIds that may still change its structure"""
+
+    __slots__ = ("position", "caller_id", "parent", "children", "pieces")
+
+    def __init__(self, position, activation, parent):
+        self.position = position
+        self.caller_id = activation.caller_id or 0
+        self.parent = parent
+        self.children = False
+        self.pieces = ["{0.line}-{0.name}".format(activation)]
+
+
+class StructureIds(object):
+    """Assign the same structure id to activations whose NoMatchSummarization
+    nodes have the same repr, without building the nodes or the reprs
+
+    Follow the NoMatchSummarization traversal. Keep only the open nodes and
+    a table of distinct structures. A structure is a tuple of repr pieces
+    that refers to the structure ids of children
+
+    ids -- array with the structure id of each activation position.
+           -1 for activations that NoMatchSummarization ignores
+    """
+
+    def __init__(self, preorder):
+        self.ids = array(n("l"))
+        self.structures = {}
+        self.stack = []
+
+        self(preorder)
+
+    def close(self, node):
+        """Finish node. Return its structure id"""
+        structure = tuple(node.pieces)
+        sid = self.structures.get(structure)
+        if sid is None:
+            sid = self.structures[structure] = len(self.structures)
+        self.ids[node.position] = sid
+        return sid
+
+    def insert(self, position, activation, parent):
+        """Open node for activation"""
+        if parent is not None:
+            parent.children = True
+        self.ids[position] = -1
+        return _OpenNode(position, activation, parent)
+
+    def insert_return(self, last):
+        """Close last and return to the caller"""
+        parent = self.stack.pop()
+        parent.pieces.extend((self.close(last), ")"))
+        return parent
+
+    def __call__(self, preorder):
+        last = None
+        for position, call in enumerate(preorder):
+            self.ids.append(-1)
+            if not call.caller_id:
+                if last is not None:
+                    self.close(last)
+                last = self.insert(position, call, None)
+                continue
+            if call.caller_id > last.caller_id:
+                last.pieces.append("(")
+                self.stack.append(last)
+                last = self.insert(position, call, last)
+                continue
+
+            while call.caller_id < last.caller_id:
+                last = self.insert_return(last)
+
+            if call.caller_id == last.caller_id:
+                sid = self.close(last)
+                if not last.children:
+                    last.parent.pieces.extend((sid, ","))
+                last = self.insert(position, call, last.parent)
+
+        while self.stack:
+            last = self.insert_return(last)
+        if last is not None:
+            self.close(last)
+        return self
+
+
+def structure_nodes(preorder):
+    """Stream NoMatchSummarization-like nodes of activations with
+    structure ids as repr. It reads preorder twice"""
+    if iter(preorder) is preorder:
+        preorder = list(preorder)
+    ids = StructureIds(preorder).ids
+    for position, activation in enumerate(preorder):
+        if ids[position] == -1:
+            continue
+        trial_id = activation.trial_id
+        yield Node(
+            name=activation.name,
+            caller_id=activation.caller_id or 0,
+            repr=ids[position],
+            trial_ids=[trial_id],
+            activations={trial_id: [activation.id]},
+            duration={trial_id: activation.duration},
+            tooltip={trial_id: activation_tooltip(activation)},
+        )
+
+
 class StructureSummarization(Summarization):
     """Summarize by substructure"""
 
@@ -282,7 +394,7 @@ class StructureSummarization(Summarization):
 
     def __call__(self, preorder):
         return super(StructureSummarization, self).__call__(
-            NoMatchSummarization(preorder).nodes
+            structure_nodes(preorder)
         )
 
 
@@ -316,6 +428,7 @@ class TrialGraph(Graph):
         self.width = 500
         self.height = 500
         self.mode = 3
+        self._activations = None
         self._modes = {
             0: self.tree,
             1: self.no_match,
@@ -323,6 +436,13 @@ class TrialGraph(Graph):
             3: self.namespace_match
         }
 
+    @property
+    def activations(self):
+        """Return activations in preorder. Shared by all modes"""
+        if self._activations is None:
+            self._activations = ActivationTable.load(self.trial)
+        return self._activations
+
     def result(self, summarization):
         """Get summarization graph result"""
         return self.trial.finished, summarization.graph(
@@ -332,22 +452,22 @@ class TrialGraph(Graph):
     @cache("tree")
     def tree(self):
         """Convert tree structure into dict tree structure"""
-        return self.result(TreeSummarization(self.trial.activations))
+        return self.result(TreeSummarization(self.activations))
 
     @cache("no_match")
     def no_match(self):
         """Convert tree structure into dict graph without node matchings"""
-        return self.result(NoMatchSummarization(self.trial.activations))
+        return self.result(NoMatchSummarization(self.activations))
 
     @cache("exact_match")
     def exact_match(self):
         """Convert tree structure into dict graph and match equal calls"""
-        return self.result(StructureSummarization(self.trial.activations))
+        return self.result(StructureSummarization(self.activations))
 
     @cache("namespace_match")
     def namespace_match(self):
         """Convert tree structure into dict graph and match namespaces"""
-        return self.result(LineNameSummarization(self.trial.activations))
+        return self.result(LineNameSummarization(self.activations))
 
     def _ipython_display_(self):
         from IPython.display import display
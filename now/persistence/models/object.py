@@ -38,6 +38,8 @@ class Object(AlchemyProxy):
         Text,
         CheckConstraint("type IN ('GLOBAL', 'ARGUMENT', 'FUNCTION_CALL')"))
 
+    PUSH_COLUMNS = ("function_def_id", "id", "name", "type")
+
     trial = backref_one("trial")  # Trial.objects
     function_def = backref_one("function_def")  # FunctionDef.objects
 
@@ -56,9 +58,10 @@ class Object(AlchemyProxy):
 
     def __init__(self, *args, **kwargs):
         if args and isinstance(args[0], relational.base):
-            obj = args[0]
-            trial_ref = obj.id
-        elif args:
+            # Proxy rows of queries and relationships
+            super(Object, self).__init__(args[0])
+            return
+        if args:
             trial_ref = kwargs.get("trial_ref", args[0])
         else:
             trial_ref = kwargs.get("trial_ref", None)
@@ -82,18 +85,13 @@ class Object(AlchemyProxy):
         result = session.query(cls.m).filter(cls.m.trial_id == trial_ref)
         return result.first()
 
+    @classmethod
     def pull_content(cls, tid, session=None):
         session = session or relational.session
         ttrial = cls.__table__
         result = session.query(ttrial).filter(ttrial.c.trial_id == tid).all()
         return result
 
+    @classmethod
     def push_content(cls, id, reslist, session=None):
-        session = session or relational.session
-        ttrial = cls.__table__
-        for res in reslist:
-            result = session.execute(
-                ttrial.insert(),
-                {"trial_id": id, "function_def_id": res.function_def_id, "id": res.id, "name": res.name, "type": res.type}
-            )
-            session.commit()
+        return cls.bulk_push(id, reslist, session=session)
@@ -37,6 +37,8 @@ class ObjectValue(AlchemyProxy):
     value = Column(Text)
     type = Column(Text, CheckConstraint("type IN ('GLOBAL', 'ARGUMENT')"))       # pylint: disable=invalid-name
 
+    PUSH_COLUMNS = ("function_activation_id", "id", "name", "value", "type")
+
     trial = backref_one("trial")  # Trial.object_values
     activation = backref_one("activation")  # Ativation.object_values
 
@@ -57,9 +59,10 @@ class ObjectValue(AlchemyProxy):
 
     def __init__(self, *args, **kwargs):
         if args and isinstance(args[0], relational.base):
-            obj = args[0]
-            trial_ref = obj.id
-        elif args:
+            # Proxy rows of queries and relationships
+            super(ObjectValue, self).__init__(args[0])
+            return
+        if args:
             trial_ref = kwargs.get("trial_ref", args[0])
         else:
             trial_ref = kwargs.get("trial_ref", None)
@@ -86,18 +89,13 @@ class ObjectValue(AlchemyProxy):
         result = session.query(cls.m).filter(cls.m.trial_id == trial_ref)
         return result.first()
 
+    @classmethod
     def pull_content(cls, tid, session=None):
         session = session or relational.session
         ttrial = cls.__table__
         result = session.query(ttrial).filter(ttrial.c.trial_id == tid).all()
         return result
 
+    @classmethod
     def push_content(cls, id, reslist, session=None):
-        session = session or relational.session
-        ttrial = cls.__table__
-        for res in reslist:
-            result = session.execute(
-                ttrial.insert(),
-                {"trial_id": id, "function_activation_id": res.function_activation_id, "id": res.id, "name": res.name, "value": res.value, "type": res.type}
-            )
-            session.commit()
\ No newline at end of file
+        return cls.bulk_push(id, reslist, session=session)
@@ -0,0 +1,193 @@
+# Copyright (c) 2018, 2019, 2020 President and Fellows of Harvard College.
+# This file is part of ProvBuild.
+
+"""Slice Cache Model"""
+from __future__ import (absolute_import, print_function,
+                        division, unicode_literals)
+
+import traceback
+
+from sqlalchemy import Column, Integer, Text, TIMESTAMP
+from sqlalchemy import ForeignKeyConstraint, exc, select
+
+from ...utils.cross_version import pickle
+from ...utils.io import print_msg
+
+from .. import relational, content
+from .base import AlchemyProxy, proxy_class, proxy_gen
+
+
+# Increase it whenever the slice computed by 'update' changes
+SLICE_CACHE_VERSION = 1
+
+
+@proxy_class
+class SliceCache(AlchemyProxy):
+    """Represent a precomputed ProvBuild slice"""
+
+    __tablename__ = "slice_cache"
+    __table_args__ = (
+        ForeignKeyConstraint(["trial_id"], ["trial.id"], ondelete="CASCADE"),
+        {"sqlite_autoincrement": True},
+    )
+    id = Column(Integer, primary_key=True)                                       # pylint: disable=invalid-name
+    trial_id = Column(Integer, index=True)
+    type = Column(Text)                                                          # pylint: disable=invalid-name
+    name = Column(Text)
+    morefunc = Column(Text)
+    version = Column(Integer)
+    content_hash = Column(Text)
+    duration = Column(Integer)
+    timestamp = Column(TIMESTAMP)
+
+    def __repr__(self):
+        return "SliceCache({0.id}, {0.trial_id}, {0.type}, {0.name})".format(
+            self)
+
+    @classmethod  # query
+    def _query_select_cache(cls, trial_id, stype, name, morefunc,               # pylint: disable=too-many-arguments
+                            session=None):
+        """Find caches query by trial, type, name and morefunc
+        Return sqlalchemy query
+        """
+        model = cls.m
+        session = session or relational.session
+        return session.query(model).filter(
+            (model.trial_id == trial_id) &
+            (model.type == stype) &
+            (model.name == name) &
+            (model.morefunc == morefunc) &
+            (model.version == SLICE_CACHE_VERSION)
+        )
+
+    @classmethod  # query
+    def select_cache(cls, trial_id, stype, name, morefunc, session=None):       # pylint: disable=too-many-arguments
+        """Find caches query by trial, type, name and morefunc
+
+
+        Arguments:
+        trial_id -- sliced trial id
+        stype -- slice type: function, variable
+        name -- function or variable name
+        morefunc -- undefined function added to the slice
+
+
+        Keyword arguments:
+        session -- desired session
+        """
+        return proxy_gen(cls._query_select_cache(
+            trial_id, stype, name, morefunc,
+            session=session or relational.session))
+
+    @classmethod  # query
+    def remove(cls, trial_id, stype, name, morefunc, session=None,              # pylint: disable=too-many-arguments
+               commit=False):
+        """Remove caches query by trial, type, name and morefunc
+
+
+        Arguments:
+        trial_id -- sliced trial id
+        stype -- slice type: function, variable
+        name -- function or variable name
+        morefunc -- undefined function added to the slice
+
+
+        Keyword arguments:
+        session -- desired session (default=relational.session)
+        commit -- commit deletion (default=False)
+        """
+        session = session or relational.session
+        cls._query_select_cache(
+            trial_id, stype, name, morefunc, session=session
+        ).delete()
+        if commit:
+            session.commit()
+
+    @classmethod  # query
+    def remove_superseded(cls, trial_id, script, session=None, commit=False):
+        """Remove caches of trials superseded by trial_id
+
+
+        Arguments:
+        trial_id -- new trial id
+        script -- script of the new trial
+
+
+        Keyword arguments:
+        session -- desired session (default=relational.session)
+        commit -- commit deletion (default=False)
+        """
+        from .trial import Trial
+        session = session or relational.session
+        ttrial = Trial.t
+        superseded = select([ttrial.c.id]).where(
+            (ttrial.c.script == script) &
+            (ttrial.c.id < trial_id)
+        )
+        session.execute(
+            cls.t.delete().where(cls.t.c.trial_id.in_(superseded))
+        )
+        if commit:
+            session.commit()
+
+    @classmethod  # query
+    def create(cls, trial_id, stype, name, morefunc, duration, content_hash,    # pylint: disable=too-many-arguments
+               session=None, commit=False):
+        """Create Cache
+
+
+        Arguments:
+        trial_id -- sliced trial id
+        stype -- slice type: function, variable
+        name -- function or variable name
+        morefunc -- undefined function added to the slice
+        duration -- required time to calculate slice
+        content_hash -- hash of stored slice
+
+
+        Keyword arguments:
+        session -- desired session (default=relational.session)
+        commit -- commit insertion (default=False)
+        """
+        session = session or relational.session
+        cache = cls.m(                                                           # pylint: disable=not-callable
+            trial_id=trial_id, type=stype, name=name, morefunc=morefunc,
+            version=SLICE_CACHE_VERSION, duration=duration,
+            content_hash=content_hash
+        )
+        session.add(cache)
+        if commit:
+            session.commit()
+
+    @classmethod
+    def load_slice(cls, trial_id, stype, name, morefunc):
+        """Load slice from cache. Return None if it is not cached"""
+        cache_session = relational.make_session()
+        result = None
+        try:
+            for cache in cls.select_cache(trial_id, stype, name, morefunc,
+                                          session=cache_session):
+                result = pickle.loads(content.get(cache.content_hash))
+                break
+        except (ValueError, IOError, exc.SQLAlchemyError):
+            traceback.print_exc()
+            print_msg("Couldn't load slice cache", True)
+        cache_session.close()                                                    # pylint: disable=no-member
+        return result
+
+    @classmethod
+    def store_slice(cls, trial_id, stype, name, morefunc, duration, result):    # pylint: disable=too-many-arguments
+        """Store slice in cache, replacing previous entries"""
+        cache_session = relational.make_session()
+        try:
+            cls.remove(trial_id, stype, name, morefunc, session=cache_session)
+            cls.create(
+                trial_id, stype, name, morefunc, duration,
+                content.put(pickle.dumps(result)),
+                session=cache_session, commit=True
+            )
+        except exc.SQLAlchemyError:
+            traceback.print_exc()
+            print_msg("Couldn't store slice cache", True)
+        cache_session.close()                                                    # pylint: disable=no-member
+
@@ -0,0 +1,81 @@
+# Copyright (c) 2018, 2019, 2020 President and Fellows of Harvard College.
+# This file is part of ProvBuild.
+
+"""Statement Value Model"""
+from __future__ import (absolute_import, print_function,
+                        division, unicode_literals)
+
+import os
+
+from sqlalchemy import Column, Integer, Text, select
+from sqlalchemy import PrimaryKeyConstraint, ForeignKeyConstraint
+
+from .. import relational, content, persistence_config
+
+from .base import AlchemyProxy, proxy_class
+from .variable import Variable
+
+
+VALUES_DIRNAME = "values"
+
+
+@proxy_class
+class StatementValue(AlchemyProxy):
+    """Represent the pickled value of a variable of an expensive
+    top-level statement, keyed by the hash of the statement source"""
+
+    __tablename__ = "statement_value"
+    __table_args__ = (
+        PrimaryKeyConstraint("trial_id", "id"),
+        ForeignKeyConstraint(["trial_id"],
+                             ["trial.id"], ondelete="CASCADE"),
+        ForeignKeyConstraint(["trial_id", "activation_id", "variable_id"],
+                             ["variable.trial_id",
+                              "variable.activation_id",
+                              "variable.id"], ondelete="CASCADE"),
+    )
+    trial_id = Column(Integer, index=True)
+    activation_id = Column(Integer, index=True)
+    variable_id = Column(Integer, index=True)
+    id = Column(Integer, index=True)                                             # pylint: disable=invalid-name
+    statement_hash = Column(Text)
+    content_hash = Column(Text)
+
+    def __repr__(self):
+        return (
+            "StatementValue({self.trial_id}, {self.variable_id}, "
+            "{self.content_hash})"
+        ).format(self=self)
+
+    @classmethod
+    def load_values(cls, trial_id):
+        """Return dict of variable id -> (line, statement hash, content hash)"""
+        table, variable = cls.t, Variable.t
+        return {
+            variable_id: (line, statement_hash, content_hash)
+            for variable_id, line, statement_hash, content_hash
+            in relational.session.execute(select([
+                table.c.variable_id, variable.c.line, table.c.statement_hash,
+                table.c.content_hash
+            ]).where(
+                (table.c.trial_id == trial_id) &
+                (variable.c.trial_id == table.c.trial_id) &
+                (variable.c.activation_id == table.c.activation_id) &
+                (variable.c.id == table.c.variable_id)
+            ))
+        }
+
+    @staticmethod
+    def spill(content_hash):
+        """Write the pickled value to the values directory
+        Return path relative to the project directory
+        """
+        directory = os.path.join(persistence_config.provenance_path,
+                                 VALUES_DIRNAME)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        path = os.path.join(directory, content_hash)
+        if not os.path.exists(path):
+            with content.std_open(path, "wb") as fil:
+                fil.write(content.get(content_hash))
+        return os.path.relpath(path, persistence_config.base_path)
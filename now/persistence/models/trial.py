@@ -28,6 +28,8 @@ from .trial_dot import TrialDot
 
 from .module import Module
 from .dependency import Dependency
+from .environment_attr import EnvironmentAttr
+from .environment_snapshot import EnvironmentSnapshot, VOLATILE_ATTRS
 from .activation import Activation
 from .head import Head
 from .graphs.trial_graph import TrialGraph
@@ -91,7 +93,7 @@ class Trial(AlchemyProxy):
     function_defs = many_ref("trial", "FunctionDef")
     module_dependencies = many_ref("trials", "Dependency")
     dmodules = many_ref("trials", "Module", secondary=Dependency.t)
-    environment_attrs = many_ref("trial", "EnvironmentAttr")
+    own_environment_attrs = many_ref("trial", "EnvironmentAttr")
     activations = many_ref("trial", "Activation",
                            order_by=Activation.m.start)
     file_accesses = many_viewonly_ref("trial", "FileAccess")
@@ -118,6 +120,21 @@ class Trial(AlchemyProxy):
             return self.inherited.modules
         return self.dmodules
 
+    @query_many_property
+    def environment_attrs(self):
+        """Load environment attributes. Return SQLAlchemy query
+        Trials that reuse the snapshot of a previous trial (owner) store
+        only their volatile attributes
+        """
+        _, owner_id = EnvironmentSnapshot.load(self.id)
+        if owner_id is None or owner_id == self.id:
+            return self.own_environment_attrs
+        model = EnvironmentAttr.m
+        return relational.session.query(model).filter(
+            (model.trial_id == self.id) |
+            ((model.trial_id == owner_id) & ~model.name.in_(VOLATILE_ATTRS))
+        )
+
     @query_many_property
     def dependencies(self):
         """Load modules. Return SQLAlchemy query"""
@@ -593,12 +610,14 @@ class Trial(AlchemyProxy):
         session = session or relational.session
         return session.query(cls.m).count()
 
+    @classmethod
     def pull_content(cls, tid, session=None):
         session = session or relational.session
         ttrial = cls.__table__
         result = session.query(ttrial).filter(ttrial.c.id == tid).one()
         return result
 
+    @classmethod
     def push_content(cls, id, res, session=None):
         session = session or relational.session
         ttrial = cls.__table__
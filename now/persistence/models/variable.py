@@ -42,6 +42,8 @@ class Variable(AlchemyProxy):
     time = Column(TIMESTAMP)
     type = Column(Text)                                                          # pylint: disable=invalid-name
 
+    PUSH_COLUMNS = ("activation_id", "id", "name", "line", "value", "type")
+
     usages = many_ref("variable", "VariableUsage")
 
     # dependencies in which this variable is the dependent
@@ -96,9 +98,10 @@ class Variable(AlchemyProxy):
 
     def __init__(self, *args, **kwargs):
         if args and isinstance(args[0], relational.base):
-            obj = args[0]
-            trial_ref = obj.id
-        elif args:
+            # Proxy rows of queries and relationships
+            super(Variable, self).__init__(args[0])
+            return
+        if args:
             trial_ref = kwargs.get("trial_ref", args[0])
         else:
             trial_ref = kwargs.get("trial_ref", None)
@@ -186,18 +189,13 @@ class Variable(AlchemyProxy):
         result = session.query(cls.m).filter(cls.m.trial_id == trial_ref)
         return result.first()
 
+    @classmethod
     def pull_content(cls, tid, session=None):
         session = session or relational.session
         ttrial = cls.__table__
         result = session.query(ttrial).filter(ttrial.c.trial_id == tid).all()
         return result
 
+    @classmethod
     def push_content(cls, id, reslist, session=None):
-        session = session or relational.session
-        ttrial = cls.__table__
-        for res in reslist:
-            result = session.execute(
-                ttrial.insert(),
-                {"trial_id": id, "activation_id": res.activation_id, "id": res.id, "name": res.name, "line": res.line, "value": res.value, "type": res.type}
-            )
-            session.commit()
+        return cls.bulk_push(id, reslist, session=session)
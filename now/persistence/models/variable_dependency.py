@@ -52,6 +52,11 @@ class VariableDependency(AlchemyProxy):
     target_id = Column(Integer, index=True)
     type = Column(Text)                                                          # pylint: disable=invalid-name
 
+    PUSH_COLUMNS = (
+        "id", "source_activation_id", "source_id", "target_activation_id",
+        "target_id", "type"
+    )
+
     trial = backref_one("trial")  # Trial.variable_dependencies
     # Activation.source_variables, Variable.dependencies_as_source
     source_activation = backref_one("source_activation")
@@ -81,9 +86,10 @@ class VariableDependency(AlchemyProxy):
 
     def __init__(self, *args, **kwargs):
         if args and isinstance(args[0], relational.base):
-            obj = args[0]
-            trial_ref = obj.id
-        elif args:
+            # Proxy rows of queries and relationships
+            super(VariableDependency, self).__init__(args[0])
+            return
+        if args:
             trial_ref = kwargs.get("trial_ref", args[0])
         else:
             trial_ref = kwargs.get("trial_ref", None)
@@ -122,19 +128,14 @@ class VariableDependency(AlchemyProxy):
         result = session.query(cls.m).filter(cls.m.trial_id == trial_ref)
         return result.first()
 
+    @classmethod
     def pull_content(cls, tid, session=None):
         session = session or relational.session
         ttrial = cls.__table__
         result = session.query(ttrial).filter(ttrial.c.trial_id == tid).all()
         return result
 
+    @classmethod
     def push_content(cls, id, reslist, session=None):
-        session = session or relational.session
-        ttrial = cls.__table__
-        for res in reslist:
-            result = session.execute(
-                ttrial.insert(),
-                {"trial_id": id, "id": res.id, "source_activation_id": res.source_activation_id, "source_id": res.source_id, "target_activation_id": res.target_activation_id, "target_id": res.target_id, "type": res.type}
-            )
-            session.commit()
+        return cls.bulk_push(id, reslist, session=session)
 
@@ -0,0 +1,38 @@
+# Copyright (c) 2018, 2019, 2020 President and Fellows of Harvard College.
+# This file is part of ProvBuild.
+
+"""Slicing Variable Fold Model"""
+from __future__ import (absolute_import, print_function,
+                        division, unicode_literals)
+
+from sqlalchemy import Column, Integer
+from sqlalchemy import PrimaryKeyConstraint, ForeignKeyConstraint
+
+from .base import AlchemyProxy, proxy_class
+
+
+@proxy_class
+class VariableFold(AlchemyProxy):
+    """Represent a variable that summarizes compacted loop iterations"""
+
+    __tablename__ = "variable_fold"
+    __table_args__ = (
+        PrimaryKeyConstraint("trial_id", "id"),
+        ForeignKeyConstraint(["trial_id"],
+                             ["trial.id"], ondelete="CASCADE"),
+        ForeignKeyConstraint(["trial_id", "activation_id", "variable_id"],
+                             ["variable.trial_id",
+                              "variable.activation_id",
+                              "variable.id"], ondelete="CASCADE"),
+    )
+    trial_id = Column(Integer, index=True)
+    activation_id = Column(Integer, index=True)
+    variable_id = Column(Integer, index=True)
+    id = Column(Integer, index=True)                                             # pylint: disable=invalid-name
+    iterations = Column(Integer)
+
+    def __repr__(self):
+        return (
+            "VariableFold({self.trial_id}, {self.activation_id}, "
+            "{self.variable_id}, {self.iterations})"
+        ).format(self=self)
@@ -42,6 +42,8 @@ class VariableUsage(AlchemyProxy):
     line = Column(Integer)
     context = Column(Text, CheckConstraint("context IN ('Load', 'Del')"))
 
+    PUSH_COLUMNS = ("activation_id", "variable_id", "id", "line", "context")
+
     trial = backref_one("trial")  # Trial.variable_usages
     activation = backref_one("activation")  # Activation.variables_usages
     variable = backref_one("variable")  # Variable.usages
@@ -62,9 +64,10 @@ class VariableUsage(AlchemyProxy):
 
     def __init__(self, *args, **kwargs):
         if args and isinstance(args[0], relational.base):
-            obj = args[0]
-            trial_ref = obj.id
-        elif args:
+            # Proxy rows of queries and relationships
+            super(VariableUsage, self).__init__(args[0])
+            return
+        if args:
             trial_ref = kwargs.get("trial_ref", args[0])
         else:
             trial_ref = kwargs.get("trial_ref", None)
@@ -95,18 +98,13 @@ class VariableUsage(AlchemyProxy):
         result = session.query(cls.m).filter(cls.m.trial_id == trial_ref)
         return result.first()
 
+    @classmethod
     def pull_content(cls, tid, session=None):
         session = session or relational.session
         ttrial = cls.__table__
         result = session.query(ttrial).filter(ttrial.c.trial_id == tid).all()
         return result
 
+    @classmethod
     def push_content(cls, id, reslist, session=None):
-        session = session or relational.session
-        ttrial = cls.__table__
-        for res in reslist:
-            result = session.execute(
-                ttrial.insert(),
-                {"trial_id": id, "activation_id": res.activation_id, "variable_id": res.variable_id,"id": res.id, "line": res.line, "context": res.context}
-            )
-            session.commit()
\ No newline at end of file
+        return cls.bulk_push(id, reslist, session=session)
@@ -0,0 +1,486 @@
+# Copyright (c) 2018, 2019, 2020 President and Fellows of Harvard College.
+# This file is part of ProvBuild.
+
+"""Pack files for the content database
+
+Blobs are appended to pack files. A sorted index maps each sha1 to
+(codec, pack, offset, size) and is read through mmap with binary search.
+New entries go to an unsorted journal that is merged into the index when
+it grows past JOURNAL_LIMIT entries
+"""
+from __future__ import (absolute_import, print_function,
+                        division, unicode_literals)
+
+import fcntl
+import hashlib
+import mmap
+import os
+import re
+import struct
+import zlib
+
+from binascii import hexlify, unhexlify
+from os.path import join, exists, getsize
+
+from future.utils import text_to_native_str as n
+
+try:
+    import lzma
+except ImportError:                                                              # pragma: no cover
+    try:
+        from backports import lzma
+    except ImportError:
+        lzma = None                                                              # pylint: disable=invalid-name
+
+
+PACKS_DIRNAME = "packs"
+INDEX_FILENAME = "index"
+JOURNAL_FILENAME = "journal"
+LOCK_FILENAME = "lock"
+PACK_FILENAME = "pack-{:04d}.pack"
+PACK_RE = re.compile(r"^pack-(\d{4})\.pack$")
+
+# Start a new pack when the current one reaches PACK_SIZE bytes
+PACK_SIZE = 512 * 1024 * 1024
+# Merge journal into the sorted index after JOURNAL_LIMIT entries
+JOURNAL_LIMIT = 4096
+# Size of chunks copied into packs
+CHUNK_SIZE = 1024 * 1024
+
+# hash, codec, pack, offset, size
+RECORD = struct.Struct(n(">20sBHQI"))
+
+NONE, ZLIB, LZMA = 0, 1, 2
+CODECS = {"none": NONE, "zlib": ZLIB, "lzma": LZMA}
+# zlib levels and lzma presets
+LEVELS = range(10)
+
+
+def codec_names():
+    """Return names of the codecs available in this Python"""
+    return [
+        name for name, codec in sorted(CODECS.items(), key=lambda x: x[1])
+        if codec != LZMA or lzma is not None
+    ]
+
+
+def describe_codecs():
+    """Return available codecs for help messages"""
+    text = ", ".join(codec_names())
+    if lzma is None:
+        text += " (lzma needs Python 3 or backports.lzma)"
+    return text
+
+
+def parse_compression(spec):
+    """Parse compression spec 'codec[:level]'
+    Return (codec, level). Raise ValueError for invalid or unavailable specs
+    """
+    if not spec:
+        return NONE, None
+    name, _, level = spec.partition(":")
+    codec = CODECS.get(name.lower())
+    if codec is None:
+        raise ValueError("invalid compression {!r}. Use {}".format(
+            spec, describe_codecs()))
+    if codec == LZMA and lzma is None:
+        raise ValueError("lzma is not available in this Python. "
+                         "It needs Python 3 or backports.lzma")
+    if not level:
+        return codec, None
+    if codec == NONE:
+        raise ValueError("compression none does not have levels")
+    if not level.isdigit() or int(level) not in LEVELS:
+        raise ValueError("invalid compression level {!r}. Use {}:0 to {}:9"
+                         .format(spec, name, name))
+    return codec, int(level)
+
+
+def compress_chunks(chunks, codec, level=None):
+    """Compress sequence of chunks with codec. Yield compressed chunks"""
+    if codec == NONE:
+        for chunk in chunks:
+            yield chunk
+        return
+    if codec == ZLIB:
+        compressor = zlib.compressobj(6 if level is None else level)
+    else:
+        compressor = lzma.LZMACompressor(preset=level)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def read_chunks(fil, chunk_size=CHUNK_SIZE):
+    """Yield chunks of fil"""
+    while True:
+        chunk = fil.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def decompress(data, codec):
+    """Decompress data with codec"""
+    if codec == ZLIB:
+        return zlib.decompress(data)
+    if codec == LZMA:
+        if lzma is None:
+            raise IOError("lzma is not available to read blob")
+        return lzma.decompress(data)
+    return data
+
+
+class SortedIndex(object):
+    """Read-only sorted index of records in a mmap"""
+
+    def __init__(self, path, opener):
+        self.path = path
+        self.file = None
+        self.map = None
+        self.size = 0
+        self.stat = None
+        if exists(path):
+            self.file = opener(path, "rb")
+            self.stat = os.fstat(self.file.fileno())
+            if self.stat.st_size:
+                self.map = mmap.mmap(self.file.fileno(), 0,
+                                     access=mmap.ACCESS_READ)
+                self.size = self.stat.st_size // RECORD.size
+
+    def key(self, index):
+        """Return binary hash at position index"""
+        start = index * RECORD.size
+        return self.map[start:start + 20]
+
+    def record(self, index):
+        """Return record at position index"""
+        return RECORD.unpack_from(self.map, index * RECORD.size)
+
+    def bisect(self, key):
+        """Return first position with hash >= key"""
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+            if self.key(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def find(self, key):
+        """Return record of binary hash key, or None"""
+        position = self.bisect(key)
+        if position < self.size and self.key(position) == key:
+            return self.record(position)
+        return None
+
+    def find_prefix(self, prefix):
+        """Return first hex hash that starts with hex prefix, or None"""
+        if not self.size:
+            return None
+        padded = prefix + "0" * (40 - len(prefix))
+        position = self.bisect(unhexlify(padded))
+        if position < self.size:
+            content_hash = hexlify(self.key(position)).decode("ascii")
+            if content_hash.startswith(prefix):
+                return content_hash
+        return None
+
+    def __iter__(self):
+        for index in range(self.size):
+            yield self.record(index)
+
+    def changed(self):
+        """Check if index file was replaced"""
+        if not exists(self.path):
+            return self.stat is not None
+        stat = os.stat(self.path)
+        return (self.stat is None or stat.st_ino != self.stat.st_ino or
+                stat.st_size != self.stat.st_size)
+
+    def close(self):
+        """Close mmap and file"""
+        if self.map is not None:
+            self.map.close()
+        if self.file is not None:
+            self.file.close()
+        self.map = self.file = None
+
+
+class PackStore(object):                                                         # pylint: disable=too-many-instance-attributes
+    """Append-only pack files with a sorted hash index"""
+
+    def __init__(self, path, opener, compression=None):
+        """Open pack store in path
+
+        Arguments:
+        path -- packs directory
+        opener -- open function that is not captured by the profiler
+
+
+        Keyword arguments:
+        compression -- 'codec[:level]' of new blobs (default=no compression)
+        """
+        self.path = path
+        self.opener = opener
+        self.codec, self.level = parse_compression(compression)
+        self.index = None
+        self.journal = {}
+        self.journal_offset = 0
+        self.readers = {}
+        self.lock_file = None
+        self.load()
+
+    @classmethod
+    def create(cls, path, opener, compression=None):
+        """Create packs directory and open it"""
+        if not exists(path):
+            os.makedirs(path)
+        return cls(path, opener, compression=compression)
+
+    def load(self):
+        """Load sorted index and journal"""
+        if self.index is not None:
+            self.index.close()
+        self.index = SortedIndex(join(self.path, INDEX_FILENAME), self.opener)
+        self.journal = {}
+        self.journal_offset = 0
+        self.read_journal()
+
+    def read_journal(self):
+        """Read journal entries appended after the last read"""
+        path = join(self.path, JOURNAL_FILENAME)
+        if not exists(path):
+            return
+        with self.opener(path, "rb") as journal:
+            journal.seek(self.journal_offset)
+            data = journal.read()
+        complete = len(data) - len(data) % RECORD.size
+        for start in range(0, complete, RECORD.size):
+            record = RECORD.unpack_from(data, start)
+            self.journal[record[0]] = record
+        self.journal_offset += complete
+
+    def refresh(self):
+        """Load entries written by other processes"""
+        path = join(self.path, JOURNAL_FILENAME)
+        journal_size = getsize(path) if exists(path) else 0
+        if self.index.changed() or journal_size < self.journal_offset:
+            self.load()
+        elif journal_size > self.journal_offset:
+            self.read_journal()
+
+    def lookup(self, key):
+        """Return record of binary hash key, or None"""
+        record = self.journal.get(key)
+        if record is None:
+            record = self.index.find(key)
+        return record
+
+    def find(self, key):
+        """Return record of binary hash key. Refresh on misses"""
+        record = self.lookup(key)
+        if record is None:
+            self.refresh()
+            record = self.lookup(key)
+        return record
+
+    def __contains__(self, content_hash):
+        return self.find(unhexlify(content_hash)) is not None
+
+    def find_prefix(self, prefix):
+        """Return first hex hash that starts with hex prefix, or None"""
+        self.refresh()
+        found = [
+            hexlify(key).decode("ascii") for key in self.journal
+            if hexlify(key).decode("ascii").startswith(prefix)
+        ]
+        indexed = self.index.find_prefix(prefix)
+        if indexed:
+            found.append(indexed)
+        return min(found) if found else None
+
+    def __enter__(self):
+        if self.lock_file is None:
+            self.lock_file = self.opener(join(self.path, LOCK_FILENAME), "ab")
+        fcntl.flock(self.lock_file.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *args):
+        fcntl.flock(self.lock_file.fileno(), fcntl.LOCK_UN)
+
+    def packs(self):
+        """Return sorted pack numbers"""
+        return sorted(
+            int(match.group(1)) for match in (
+                PACK_RE.match(name) for name in os.listdir(self.path)
+            ) if match
+        )
+
+    def _append(self, chunks, key=None):
+        """Append blob chunks to last pack and journal. Call it locked
+        Compress chunks with the store codec while appending them.
+        Without key, hash chunks while appending them and drop the blob
+        if the store already has it.
+        Return hex hash of blob
+        """
+        packs = self.packs()
+        pack = packs[-1] if packs else 0
+        pack_path = join(self.path, PACK_FILENAME.format(pack))
+        if exists(pack_path) and getsize(pack_path) >= PACK_SIZE:
+            pack += 1
+            pack_path = join(self.path, PACK_FILENAME.format(pack))
+        sha1 = hashlib.sha1()
+
+        def hashed():
+            """Hash chunks"""
+            for chunk in chunks:
+                sha1.update(chunk)
+                yield chunk
+
+        with self.opener(pack_path, "ab") as pack_file:
+            pack_file.seek(0, os.SEEK_END)
+            offset = pack_file.tell()
+            source = hashed() if key is None else chunks
+            for chunk in compress_chunks(source, self.codec, self.level):
+                pack_file.write(chunk)
+            size = pack_file.tell() - offset
+            if key is None:
+                key = sha1.digest()
+                if self.lookup(key) is not None:
+                    pack_file.truncate(offset)
+                    return sha1.hexdigest()
+        record = (key, self.codec, pack, offset, size)
+        with self.opener(join(self.path, JOURNAL_FILENAME), "ab") as journal:
+            journal.write(RECORD.pack(*record))
+        self.journal[key] = record
+        self.journal_offset += RECORD.size
+        if len(self.journal) >= JOURNAL_LIMIT:
+            self.merge()
+        return hexlify(key).decode("ascii")
+
+    def put(self, content_hash, content):
+        """Store content with hex hash content_hash, if it is new"""
+        key = unhexlify(content_hash)
+        if self.lookup(key) is not None:
+            return content_hash
+        with self:
+            self.refresh()
+            if self.lookup(key) is None:
+                self._append([content], key=key)
+        return content_hash
+
+    def put_stream(self, stream):
+        """Store content of stream, if it is new
+        Read the stream in chunks and hash them while appending them
+        Return hex hash of content
+        """
+        with self:
+            self.refresh()
+            return self._append(read_chunks(stream))
+
+    def read(self, record):
+        """Read blob of record"""
+        _, codec, pack, offset, size = record
+        reader = self.readers.get(pack)
+        if reader is None:
+            reader = self.readers[pack] = self.opener(
+                join(self.path, PACK_FILENAME.format(pack)), "rb")
+        reader.seek(offset)
+        return decompress(reader.read(size), codec)
+
+    def get(self, content_hash):
+        """Return content of hex hash content_hash. Raise IOError if missing"""
+        record = self.find(unhexlify(content_hash))
+        if record is None:
+            raise IOError("content {} not found in packs".format(content_hash))
+        return self.read(record)
+
+    def records(self):
+        """Return every record, sorted by hash"""
+        records = {record[0]: record for record in self.index}
+        records.update(self.journal)
+        return [records[key] for key in sorted(records)]
+
+    def _write_index(self, records):
+        """Replace sorted index by records and empty journal. Call it locked"""
+        temp = join(self.path, INDEX_FILENAME + ".tmp")
+        with self.opener(temp, "wb") as index:
+            for record in records:
+                index.write(RECORD.pack(*record))
+        os.rename(temp, join(self.path, INDEX_FILENAME))
+        with self.opener(join(self.path, JOURNAL_FILENAME), "wb"):
+            pass
+        self.load()
+
+    def merge(self):
+        """Merge journal into the sorted index. Call it locked"""
+        self._write_index(self.records())
+
+    def hashes(self):
+        """Return hex hashes of every blob"""
+        self.refresh()
+        return [hexlify(record[0]).decode("ascii")
+                for record in self.records()]
+
+    def gc(self, reachable):                                                     # pylint: disable=invalid-name
+        """Rewrite packs keeping only blobs with hex hashes in reachable
+        Return (kept blobs, removed blobs, freed bytes)
+        """
+        with self:
+            self.refresh()
+            records = self.records()
+            old_packs = self.packs()
+            old_size = sum(getsize(join(self.path, PACK_FILENAME.format(pack)))
+                           for pack in old_packs)
+            first = old_packs[-1] + 1 if old_packs else 0
+            kept = []
+            pack, pack_file, offset = first, None, 0
+            try:
+                for record in records:
+                    if hexlify(record[0]).decode("ascii") not in reachable:
+                        continue
+                    key, codec, old_pack, old_offset, size = record
+                    reader = self.readers.get(old_pack)
+                    if reader is None:
+                        reader = self.readers[old_pack] = self.opener(
+                            join(self.path, PACK_FILENAME.format(old_pack)),
+                            "rb")
+                    reader.seek(old_offset)
+                    data = reader.read(size)
+                    if pack_file is not None and offset + size > PACK_SIZE:
+                        pack_file.close()
+                        pack, pack_file, offset = pack + 1, None, 0
+                    if pack_file is None:
+                        pack_file = self.opener(
+                            join(self.path, PACK_FILENAME.format(pack)), "wb")
+                    pack_file.write(data)
+                    kept.append((key, codec, pack, offset, size))
+                    offset += size
+            finally:
+                if pack_file is not None:
+                    pack_file.close()
+            self._write_index(kept)
+            self.close_readers()
+            for old_pack in old_packs:
+                os.remove(join(self.path, PACK_FILENAME.format(old_pack)))
+            new_size = sum(getsize(join(self.path, PACK_FILENAME.format(pack)))
+                           for pack in self.packs())
+        return len(kept), len(records) - len(kept), old_size - new_size
+
+    def close_readers(self):
+        """Close open pack files"""
+        for reader in self.readers.values():
+            reader.close()
+        self.readers = {}
+
+    def close(self):
+        """Close every open file"""
+        self.close_readers()
+        self.index.close()
+        if self.lock_file is not None:
+            self.lock_file.close()
+            self.lock_file = None
@@ -11,15 +11,27 @@ import threading
 
 from os.path import join, exists
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.pool import SingletonThreadPool
 
 from ..utils.io import print_msg
 
 
 DB_FILENAME = "db.sqlite"
 
+# WAL lets readers query the database while a trial is being stored
+JOURNAL_MODE = "WAL"
+# Default synchronous mode. NORMAL is safe with WAL
+SYNCHRONOUS = "NORMAL"
+# Default page cache size. Negative values are in KiB
+CACHE_SIZE = -64000
+# Bytes of the database file accessed through memory-mapped I/O
+MMAP_SIZE = 256 * 1024 * 1024
+# Milliseconds to wait for a lock before raising "database is locked"
+BUSY_TIMEOUT = 30000
+
 
 class RelationalDatabase(object):
     """Relational Database deal with SQLite connection"""
@@ -27,7 +39,9 @@ class RelationalDatabase(object):
     def __init__(self, persistence_config):
         self.db_path = None  # Database path
         self.engine = None
+        self.pragmas = []  # Pragmas applied to every new connection
         self._session_map = {}
+        self._writer_map = {}
         self.session_factory = sessionmaker()
 
         self.base = declarative_base()
@@ -51,9 +65,14 @@ class RelationalDatabase(object):
         if config.should_mock:
             new_db, self.db_path = True, ""
 
+        self.close_writers()
+        self.pragmas = self.create_pragmas(config)
+        # Keep one connection per thread, instead of reopening the file
+        # and reapplying pragmas on every engine.connect()
         self.engine = create_engine(
             "sqlite://" + ("/" if self.db_path else "") + self.db_path,
-            echo=False)
+            echo=False, poolclass=SingletonThreadPool)
+        event.listen(self.engine, "connect", self._apply_pragmas)
         self.session_factory.configure(bind=self.engine, autoflush=False,
                                        expire_on_commit=True)
         self._session_map = {}
@@ -62,6 +81,40 @@ class RelationalDatabase(object):
             print_msg("creating provenance database")
             self.base.metadata.create_all(self.engine)
 
+    def create_pragmas(self, config):
+        """Return pragmas for new connections according to config"""
+        pragmas = [
+            ("busy_timeout", BUSY_TIMEOUT),
+            ("synchronous", config.synchronous or SYNCHRONOUS),
+            ("cache_size", CACHE_SIZE if config.cache_size is None
+             else config.cache_size),
+        ]
+        if self.db_path:
+            pragmas.insert(0, ("journal_mode", JOURNAL_MODE))
+            pragmas.append(("mmap_size", MMAP_SIZE))
+        return pragmas
+
+    def _apply_pragmas(self, dbapi_connection, _):
+        """Apply pragmas to new DBAPI connection"""
+        cursor = dbapi_connection.cursor()
+        for name, value in self.pragmas:
+            cursor.execute("PRAGMA {}={}".format(name, value))
+        cursor.close()
+
+    @property
+    def writer(self):
+        """Reusable connection of current thread for bulk inserts"""
+        ident = threading.current_thread().ident
+        if ident not in self._writer_map:
+            self._writer_map[ident] = self.engine.connect()
+        return self._writer_map[ident]
+
+    def close_writers(self):
+        """Close writer connections"""
+        for conn in self._writer_map.values():
+            conn.close()
+        self._writer_map = {}
+
     def make_session(self):
         """Create thread safe session"""
         return scoped_session(self.session_factory)
@@ -13,11 +13,16 @@ from collections import deque
 
 from future.utils import viewitems
 
-from ..utils.cross_version import IMMUTABLE
+from ..utils.cross_version import IMMUTABLE, string
 
 from . import content
 
 
+SUMMARY_PREFIX = "now(summary)"
+# Types whose repr has at least 3 characters per item
+SIZED = (tuple, list, dict, set, frozenset, deque, array)
+
+
 def jsonpickle_content(obj):
     """Use jsonpickle to get objects representation
     Store representation in the content database"""
@@ -91,3 +96,98 @@ class SimpleSerializer(object):
         if typ == "array":
             return "{}({})".format(cls_name, result)
         return "{}([{}])".format(cls_name, result)
+
+
+def summarize(obj, head=""):
+    """Return cheap summary of obj: type, length, and optional head
+    Do not call repr on containers
+    """
+    cls = obj.__class__ if hasattr(obj, "__class__") else type(obj)
+    result = "{} {}".format(SUMMARY_PREFIX, "_".join(cls.__name__.split()))
+    shape = getattr(obj, "shape", None)
+    if isinstance(shape, tuple):
+        result += " shape={}".format(shape)
+    else:
+        try:
+            result += " len={}".format(len(obj))
+        except Exception:                                                        # pylint: disable=broad-except
+            pass
+    if head:
+        result += " " + head
+    return result
+
+
+def deferred(obj):
+    """Serialize scalars. Summarize other objects without serializing them"""
+    if isinstance(obj, IMMUTABLE) and not isinstance(obj, string):
+        return repr(obj)
+    return summarize(obj)
+
+
+def is_summary(value):
+    """Check if serialized value is a summary"""
+    return isinstance(value, string) and value.startswith(SUMMARY_PREFIX)
+
+
+class BudgetSerializer(object):                                                  # pylint: disable=too-few-public-methods
+    """Serializer with a byte budget per value
+
+    Values that fit in the budget use the wrapped serializer.
+    Longer values become summaries with their type, length, and head.
+    Containers that cannot fit in the budget are summarized without
+    serializing them
+    """
+
+    def __init__(self, serialize=repr, budget=0, head=3):
+        """Initialize serializer
+
+
+        Keyword arguments:
+        serialize -- wrapped serializer (default=repr)
+        budget -- maximum value size. 0 disables the budget (default=0)
+        head -- number of items in summaries of containers (default=3)
+        """
+        self.serialize = serialize
+        self.budget = budget
+        self.head = head
+
+    def _head(self, obj):
+        """Return first items of a container serialized within the budget"""
+        budget = self.budget // (self.head + 1)
+        items = []
+        iterator = iter(viewitems(obj)) if isinstance(obj, dict) else iter(obj)
+        for _ in range(self.head):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                break
+            if isinstance(obj, dict):
+                items.append("{}: {}".format(
+                    self._item(item[0], budget), self._item(item[1], budget)))
+            else:
+                items.append(self._item(item, budget))
+        if isinstance(obj, dict):
+            return "{{{}, ...}}".format(", ".join(items))
+        return "[{}, ...]".format(", ".join(items))
+
+    def _item(self, obj, budget):
+        """Serialize container item with budget"""
+        if isinstance(obj, SIZED) and 3 * len(obj) > budget:
+            return summarize(obj)
+        result = self.serialize(obj)
+        if len(result) > budget:
+            return result[:budget] + "..."
+        return result
+
+    def __call__(self, obj):
+        budget = self.budget
+        if not budget:
+            return self.serialize(obj)
+        if isinstance(obj, string) and len(obj) > budget:
+            return summarize(obj, self.serialize(obj[:budget]) + "...")
+        if isinstance(obj, SIZED) and 3 * len(obj) > budget:
+            return summarize(obj, self._head(obj))
+        result = self.serialize(obj)
+        if len(result) > budget:
+            return summarize(obj, result[:budget] + "...")
+        return result
@@ -0,0 +1,231 @@
+# Copyright (c) 2018, 2019, 2020 President and Fellows of Harvard College.
+# This file is part of ProvBuild.
+
+"""Read-only columnar snapshot of the provenance of a trial"""
+from __future__ import (absolute_import, print_function,
+                        division, unicode_literals)
+
+from array import array
+from collections import namedtuple
+
+from future.utils import text_to_native_str as n
+
+from . import relational
+
+
+FETCH_SIZE = 10000
+
+
+class IntColumn(object):
+    """Integer column stored in an array. NULLs are kept apart"""
+
+    def __init__(self):
+        self.data = array(n("l"))
+        self.nulls = set()
+
+    def append(self, value):
+        """Append value to column"""
+        if value is None:
+            self.nulls.add(len(self.data))
+            value = 0
+        self.data.append(value)
+
+    def __getitem__(self, index):
+        if index in self.nulls:
+            return None
+        return self.data[index]
+
+
+class CodeColumn(object):
+    """Text column with few distinct values. Store codes to interned texts"""
+
+    def __init__(self):
+        self.data = array(n("l"))
+        self.values = []
+        self.codes = {}
+
+    def append(self, value):
+        """Append value to column"""
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        self.data.append(code)
+
+    def __getitem__(self, index):
+        return self.values[self.data[index]]
+
+
+class TextColumn(list):
+    """Text column with mostly distinct values"""
+
+
+class ColumnTable(object):
+    """Read-only table of a trial stored by column
+
+    Rows are ordered by id, so the row with id i is at position i - 1
+    in tables that number their rows from 1 per trial.
+    Dense tables fill the missing ids (e.g., variables folded by loop
+    compaction) with empty rows to keep this property.
+    Indexing and iteration build lightweight named tuples on demand.
+    """
+
+    def __init__(self, name, columns, dense=False):
+        """Initialize table
+
+
+        Arguments:
+        name -- table name
+        columns -- sequence of (column name, column class)
+
+        Keyword arguments:
+        dense -- fill missing ids with empty rows (default=False)
+        """
+        self.name = name
+        self.dense = dense
+        self.names = [column for column, _ in columns]
+        self.columns = [cls() for _, cls in columns]
+        self.row = namedtuple(n(name.title().replace("_", "") + "Row"),
+                              [n(column) for column in self.names])
+        self.size = 0
+
+    def load(self, trial_id, fetch_size=FETCH_SIZE):
+        """Load rows of trial_id with a raw cursor"""
+        connection = relational.engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            cursor.execute(
+                "SELECT {} FROM {} WHERE trial_id = ? ORDER BY id".format(
+                    ", ".join(self.names), self.name),
+                (trial_id,)
+            )
+            columns = self.columns
+            id_index = self.names.index("id") if self.dense else None
+            while True:
+                rows = cursor.fetchmany(fetch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    if id_index is not None:
+                        self._fill(row[id_index], id_index)
+                    for column, value in zip(columns, row):
+                        column.append(value)
+                    self.size += 1
+            cursor.close()
+        finally:
+            connection.close()
+        return self
+
+    def _fill(self, row_id, id_index):
+        """Append empty rows for the missing ids before row_id"""
+        for missing in range(self.size + 1, row_id):
+            for index, column in enumerate(self.columns):
+                column.append(missing if index == id_index else None)
+            self.size += 1
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError("{} index out of range".format(self.name))
+        return self.row(*[column[index] for column in self.columns])
+
+    def __iter__(self):
+        row, columns = self.row, self.columns
+        for index in range(self.size):
+            yield row(*[column[index] for column in columns])
+
+    def column(self, name):
+        """Return column by name"""
+        return self.columns[self.names.index(name)]
+
+
+# Attribute -> (table name, columns, fill missing ids)
+TABLES = {
+    "variables": ("variable", (
+        ("id", IntColumn),
+        ("activation_id", IntColumn),
+        ("line", IntColumn),
+        ("name", CodeColumn),
+        ("type", CodeColumn),
+        ("value", TextColumn),
+    ), True),
+    "dependencies": ("variable_dependency", (
+        ("id", IntColumn),
+        ("source_activation_id", IntColumn),
+        ("source_id", IntColumn),
+        ("target_activation_id", IntColumn),
+        ("target_id", IntColumn),
+        ("type", CodeColumn),
+    ), False),
+    "usages": ("variable_usage", (
+        ("id", IntColumn),
+        ("activation_id", IntColumn),
+        ("variable_id", IntColumn),
+        ("line", IntColumn),
+        ("context", CodeColumn),
+    ), False),
+    "activations": ("function_activation", (
+        ("id", IntColumn),
+        ("caller_id", IntColumn),
+        ("line", IntColumn),
+        ("name", CodeColumn),
+        ("return_value", TextColumn),
+    ), False),
+    "variable_times": ("variable", (
+        ("id", IntColumn),
+        ("time", TextColumn),
+    ), True),
+    "file_accesses": ("file_access", (
+        ("id", IntColumn),
+        ("function_activation_id", IntColumn),
+        ("name", CodeColumn),
+        ("mode", CodeColumn),
+        ("timestamp", TextColumn),
+    ), False),
+    "function_defs": ("function_def", (
+        ("id", IntColumn),
+        ("first_line", IntColumn),
+        ("last_line", IntColumn),
+        ("name", CodeColumn),
+    ), False),
+}
+
+
+class TrialSnapshot(object):
+    """Read-only snapshot of the provenance of a trial
+
+    Tables are loaded once, on first access, and shared by every user
+    of the snapshot. Use TrialSnapshot.load to share snapshots in the
+    same process
+    """
+
+    _snapshots = {}
+
+    def __init__(self, trial_id):
+        self.trial_id = trial_id
+        self._tables = {}
+
+    @classmethod
+    def load(cls, trial_id):
+        """Return shared snapshot of trial_id"""
+        if trial_id not in cls._snapshots:
+            cls._snapshots[trial_id] = cls(trial_id)
+        return cls._snapshots[trial_id]
+
+    @classmethod
+    def clear(cls):
+        """Drop shared snapshots"""
+        cls._snapshots = {}
+
+    def __getattr__(self, attr):
+        if attr not in TABLES:
+            raise AttributeError(attr)
+        if attr not in self._tables:
+            name, columns, dense = TABLES[attr]
+            self._tables[attr] = ColumnTable(
+                name, columns, dense=dense).load(self.trial_id)
+        return self._tables[attr]
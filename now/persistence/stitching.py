@@ -0,0 +1,428 @@
+# Copyright (c) 2018, 2019, 2020 President and Fellows of Harvard College.
+# This file is part of ProvBuild.
+
+"""Stitch the execution provenance of a merged script
+
+Build the execution provenance of the script produced by 'now merge' from
+the previous trial, for the untouched top-level statements, and from the
+'now runupdate --incremental' trial of the ProvScript, for the statements
+that the ProvScript re-executed
+"""
+from __future__ import (absolute_import, print_function,
+                        division, unicode_literals)
+
+import ast
+
+from bisect import bisect_right
+
+from sqlalchemy import select
+
+from . import relational
+from .models import Activation, Variable, VariableDependency, VariableUsage
+from .models import ObjectValue, FileAccess, VariableFold, FunctionDef
+
+
+def top_level_statements(code):
+    """Return list of (first line, last line, defined name) of the
+    top-level statements of code. Raise SyntaxError for invalid code
+    """
+    tree = ast.parse(code)
+    total = len(code.splitlines())
+    firsts = []
+    for node in tree.body:
+        lines = [node.lineno] + [
+            decorator.lineno
+            for decorator in getattr(node, "decorator_list", [])
+        ]
+        firsts.append((min(lines), getattr(node, "name", None)))
+    result = []
+    for index, (first, name) in enumerate(firsts):
+        last = firsts[index + 1][0] - 1 if index + 1 < len(firsts) else total
+        result.append((first, last, name))
+    return result
+
+
+class StitchSource(object):                                                      # pylint: disable=too-many-instance-attributes
+    """Execution provenance of a trial with lines mapped to the merged script
+    Assign the rows to top-level statements of the merged script
+    """
+
+    def __init__(self, trial_id, lines, statement_of):
+        """Load rows of trial_id
+
+
+        Arguments:
+        trial_id -- trial id
+        lines -- map of trial script lines to merged script lines
+        statement_of -- function that returns the statement index of a
+                        merged script line or None
+        """
+        self.trial_id = trial_id
+        self.lines = lines
+        self.activations = self._load(Activation)
+        self.activation_by_id = {
+            activation["id"]: activation for activation in self.activations
+        }
+        self.variables = self._load(Variable)
+        self.dependencies = self._load(VariableDependency)
+        self.usages = self._load(VariableUsage)
+        self.object_values = self._load(ObjectValue)
+        self.file_accesses = self._load(FileAccess)
+        self.folds = self._load(VariableFold)
+        self.user_functions = {
+            name for (name,) in relational.session.execute(
+                select([FunctionDef.t.c.name]).where(
+                    FunctionDef.t.c.trial_id == trial_id))
+        }
+
+        # Statement of activations. Main activation has None
+        self.activation_statement = {}
+        for activation in self.activations:
+            caller_id = activation["caller_id"]
+            if activation["id"] == 1:
+                statement = None
+            elif caller_id == 1:
+                statement = statement_of(lines.get(activation["line"]))
+            else:
+                statement = self.activation_statement.get(caller_id)
+            self.activation_statement[activation["id"]] = statement
+
+        # Statement of variables. Builtins follow the previous variable.
+        # Variables of unmapped lines (e.g., ProvScript setup) have None
+        self.variable_statement = {}
+        self.builtins = set()
+        previous = None
+        for variable in self.variables:
+            if variable["activation_id"] != 1:
+                statement = self.activation_statement.get(
+                    variable["activation_id"])
+            elif variable["line"] == 0:
+                self.builtins.add(variable["id"])
+                statement = previous
+            else:
+                statement = statement_of(lines.get(variable["line"]))
+            self.variable_statement[variable["id"]] = statement
+            if statement is not None:
+                previous = statement
+
+    def _load(self, model):
+        """Return rows of model in the trial as dicts, ordered by id"""
+        table = model.t
+        return [dict(row) for row in relational.session.execute(
+            select([table]).where(table.c.trial_id == self.trial_id)
+            .order_by(table.c.id))]
+
+    def by_statement(self, rows, statements):
+        """Return map of statement index to rows"""
+        result = {}
+        for row in rows:
+            statement = statements.get(row["id"])
+            if statement is not None:
+                result.setdefault(statement, []).append(row)
+        return result
+
+
+class TrialStitch(object):                                                       # pylint: disable=too-many-instance-attributes
+    """Stitch previous and update trials into the provenance of a new trial
+
+    A top-level statement of the merged script is touched when it has lines
+    of the ProvScript, except for definitions that the ProvScript copied
+    without changes. Touched statements take their activations and
+    variables from the update trial. The others take them from the previous
+    trial. Update variables of the ProvScript parameter setup are replaced
+    by the last variable with the same name before the statement
+    """
+
+    def __init__(self, previous_id, update_id, code, previous_lines,            # pylint: disable=too-many-arguments
+                 update_lines, previous_code):
+        """Load trials
+
+
+        Arguments:
+        previous_id -- trial of the script before the merge
+        update_id -- 'now runupdate --incremental' trial of the ProvScript
+        code -- merged script
+        previous_lines -- map of previous script lines to merged script lines.
+                          Replaced lines map to their ProvScript version
+        update_lines -- map of ProvScript lines to merged script lines
+        previous_code -- script before the merge
+        """
+        self.code_lines = code.splitlines()
+        self.statements = top_level_statements(code)
+        self.firsts = [first for first, _, _ in self.statements]
+        self.new_lines = set(update_lines.values())
+        self.previous_lines = previous_lines
+        self.previous_code_lines = previous_code.splitlines()
+        self.merged_previous = {
+            merged: line for line, merged in previous_lines.items()
+        }
+        self.touched = [
+            any(line in self.new_lines for line in range(first, last + 1)) and
+            not (name is not None and self.unchanged(first, last))
+            for first, last, name in self.statements
+        ]
+        self.previous = StitchSource(previous_id, previous_lines,
+                                     self.statement_of)
+        self.update = StitchSource(update_id, update_lines, self.statement_of)
+
+    def unchanged(self, first, last):
+        """Check if merged lines first to last have the same text in the
+        previous script
+        """
+        for line in range(first, last + 1):
+            text = self.code_lines[line - 1].rstrip()
+            if line not in self.merged_previous:
+                if text and not text.lstrip().startswith("#"):
+                    return False
+                continue
+            previous = self.merged_previous[line]
+            if self.previous_code_lines[previous - 1].rstrip() != text:
+                return False
+        return True
+
+    def statement_of(self, line):
+        """Return index of the top-level statement with line or None"""
+        if line is None:
+            return None
+        index = bisect_right(self.firsts, line) - 1
+        if index < 0 or line > self.statements[index][1]:
+            return None
+        return index
+
+    def conflict(self):
+        """Return why the trials cannot be stitched or None"""
+        copied = set(self.previous_lines.values()) - self.new_lines
+        for index, (first, last, _) in enumerate(self.statements):
+            if not self.touched[index]:
+                continue
+            for line in range(first, last + 1):
+                text = self.code_lines[line - 1].strip()
+                if line in copied and text and not text.startswith("#"):
+                    return ("statement of line {} mixes ProvScript lines with "
+                            "lines that the ProvScript did not re-execute"
+                            .format(first))
+
+        previous = self.previous
+        changed = {
+            name for index, (_, _, name) in enumerate(self.statements)
+            if self.touched[index] and name is not None
+        }
+        for activation in previous.activations:
+            statement = previous.activation_statement[activation["id"]]
+            if (statement is not None and not self.touched[statement] and
+                    activation["name"] in changed):
+                return ("untouched line {} calls the changed function {}"
+                        .format(self.statements[statement][0],
+                                activation["name"]))
+
+        statements = previous.variable_statement
+        for dependency in previous.dependencies:
+            source = statements.get(dependency["source_id"])
+            target = statements.get(dependency["target_id"])
+            if (source is not None and target is not None and
+                    not self.touched[source] and self.touched[target]):
+                return ("untouched line {} depends on the re-executed line {}"
+                        .format(self.statements[source][0],
+                                self.statements[target][0]))
+        return None
+
+    def rows(self, trial_id):                                                    # pylint: disable=too-many-locals, too-many-branches, too-many-statements
+        """Return list of (model, rows) of the stitched trial_id"""
+        previous, update = self.previous, self.update
+        activations, variables = [], []
+        activation_ids, variable_ids = {}, {}
+        variable_scope = {}
+        global_names, builtin_names = {}, {}
+        scopes = {}
+
+        main = dict(previous.activations[0])
+        main["trial_id"] = trial_id
+        activations.append(main)
+        activation_ids[(previous, 1)] = activation_ids[(update, 1)] = 1
+
+        sources = [update if touched else previous for touched in self.touched]
+        source_activations = [
+            previous.by_statement(previous.activations,
+                                  previous.activation_statement),
+            update.by_statement(update.activations,
+                                update.activation_statement),
+        ]
+        source_variables = [
+            previous.by_statement(previous.variables,
+                                  previous.variable_statement),
+            update.by_statement(update.variables, update.variable_statement),
+        ]
+        for index, source in enumerate(sources):
+            position = int(source is update)
+            scopes[index] = dict(global_names)
+            for activation in source_activations[position].get(index, []):
+                caller_id = activation["caller_id"]
+                row = dict(activation)
+                row["trial_id"] = trial_id
+                row["id"] = len(activations) + 1
+                row["caller_id"] = activation_ids.get((source, caller_id))
+                caller = source.activation_by_id.get(caller_id, {})
+                if (caller_id == 1 or
+                        caller.get("name") in source.user_functions):
+                    row["line"] = source.lines.get(row["line"], row["line"])
+                activation_ids[(source, activation["id"])] = row["id"]
+                activations.append(row)
+
+            for variable in source_variables[position].get(index, []):
+                key = (source, variable["id"])
+                if variable["id"] in source.builtins:
+                    if variable["name"] in builtin_names:
+                        variable_ids[key] = builtin_names[variable["name"]]
+                        continue
+                row = dict(variable)
+                row["trial_id"] = trial_id
+                row["id"] = len(variables) + 1
+                row["activation_id"] = activation_ids[
+                    (source, variable["activation_id"])]
+                row["line"] = source.lines.get(row["line"], row["line"])
+                variable_ids[key] = row["id"]
+                variable_scope[row["id"]] = index
+                variables.append(row)
+                if variable["id"] in source.builtins:
+                    builtin_names[variable["name"]] = row["id"]
+                elif row["activation_id"] == 1 and row["type"] != "call":
+                    # Calls do not bind their names
+                    global_names[row["name"]] = row["id"]
+
+        update_names = {
+            variable["id"]: variable["name"] for variable in update.variables
+            if variable["activation_id"] == 1
+        }
+
+        def main_statement(source, row):
+            """Return statement of main activation row or None
+            Return None if row belongs to a statement of the other source
+            """
+            statement = self.statement_of(source.lines.get(row["line"]))
+            if statement is None or sources[statement] is not source:
+                return None
+            return statement
+
+        def new_variable(source, old_id, new_source_id):
+            """Return new id of variable or None
+            Replace update setup variables by names in scope
+            """
+            result = variable_ids.get((source, old_id))
+            if result is None and source is update and old_id in update_names:
+                name = update_names[old_id]
+                if old_id in update.builtins:
+                    return builtin_names.get(name)
+                scope = scopes.get(variable_scope.get(new_source_id), {})
+                result = scope.get(name)
+            return result
+
+        dependencies = []
+        for source in (previous, update):
+            for dependency in source.dependencies:
+                source_id = variable_ids.get((source, dependency["source_id"]))
+                if source_id is None:
+                    continue
+                target_id = new_variable(source, dependency["target_id"],
+                                         source_id)
+                if target_id is None:
+                    continue
+                row = dict(dependency)
+                row["trial_id"] = trial_id
+                row["source_id"] = source_id
+                row["source_activation_id"] = variables[
+                    source_id - 1]["activation_id"]
+                row["target_id"] = target_id
+                row["target_activation_id"] = variables[
+                    target_id - 1]["activation_id"]
+                dependencies.append(row)
+        dependencies.sort(key=lambda row: row["source_id"])
+
+        usages = []
+        for source in (previous, update):
+            for usage in source.usages:
+                activation_id = activation_ids.get(
+                    (source, usage["activation_id"]))
+                if activation_id is None:
+                    continue
+                if usage["activation_id"] == 1:
+                    # Both sources have the main activation
+                    statement = main_statement(source, usage)
+                    if statement is None:
+                        continue
+                else:
+                    statement = source.activation_statement[
+                        usage["activation_id"]]
+                variable_id = variable_ids.get((source, usage["variable_id"]))
+                if variable_id is None and source is update:
+                    variable_id = scopes.get(statement, {}).get(
+                        update_names.get(usage["variable_id"]))
+                if variable_id is None:
+                    continue
+                row = dict(usage)
+                row["trial_id"] = trial_id
+                row["activation_id"] = activation_id
+                row["variable_id"] = variable_id
+                row["line"] = source.lines.get(row["line"], row["line"])
+                usages.append(row)
+        usages.sort(key=lambda row: row["activation_id"])
+
+        object_values, file_accesses, folds = [], [], []
+        for source in (previous, update):
+            for rows, result, column in (
+                    (source.object_values, object_values,
+                     "function_activation_id"),
+                    (source.file_accesses, file_accesses,
+                     "function_activation_id"),
+                    (source.folds, folds, "activation_id")):
+                for old in rows:
+                    activation_id = activation_ids.get((source, old[column]))
+                    if activation_id is None:
+                        continue
+                    if (old[column] == 1 and source is not previous and
+                            result is not folds):
+                        # Object values and file accesses of the main
+                        # activation have no line. They come from the same
+                        # trial as the main activation. Folds follow their
+                        # variables
+                        continue
+                    row = dict(old)
+                    row["trial_id"] = trial_id
+                    row[column] = activation_id
+                    if result is folds:
+                        row["variable_id"] = variable_ids.get(
+                            (source, old["variable_id"]))
+                        if row["variable_id"] is None:
+                            continue
+                    result.append(row)
+
+        for rows in (dependencies, usages, object_values, file_accesses, folds):
+            for index, row in enumerate(rows):
+                row["id"] = index + 1
+        return [
+            (Activation, activations),
+            (Variable, variables),
+            (VariableDependency, dependencies),
+            (VariableUsage, usages),
+            (ObjectValue, object_values),
+            (FileAccess, file_accesses),
+            (VariableFold, folds),
+        ]
+
+    def store(self, trial_id):
+        """Store the stitched provenance as rows of trial_id
+        Return number of rows
+        """
+        session = relational.make_session()
+        total = 0
+        try:
+            for model, rows in self.rows(trial_id):
+                if rows:
+                    session.execute(model.t.insert(), rows)
+                    total += len(rows)
+            session.commit()
+        except:
+            session.rollback()
+            raise
+        finally:
+            session.close()                                                      # pylint: disable=no-member
+        return total
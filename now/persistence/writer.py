@@ -0,0 +1,67 @@
+# Copyright (c) 2018, 2019, 2020 President and Fellows of Harvard College.
+# This file is part of ProvBuild.
+
+"""Background writer for partial provenance saves"""
+from __future__ import (absolute_import, print_function,
+                        division, unicode_literals)
+
+import threading
+import traceback
+
+from future.moves.queue import Queue
+
+from ..utils.io import print_msg
+
+
+class AsyncWriter(object):
+    """Store ObjectStore batches in a background thread
+
+    put converts the objects of a batch into rows in the caller thread,
+    so the objects can keep changing after the hand-off.
+    The queue is bounded: put blocks while it is full.
+    """
+
+    def __init__(self, queue_size):
+        self.queue = Queue(maxsize=queue_size)
+        self.thread = None
+        self.batches = 0
+
+    def put(self, model, trial_id, object_store, partial):
+        """Hand batch of object_store to the writer thread"""
+        if not object_store.has_items():
+            return
+        rows = [dict(obj) for obj in object_store.generator(trial_id, partial)]
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run,
+                                           name="now-writer")
+            self.thread.daemon = True
+            self.thread.start()
+        self.queue.put((model, rows))
+
+    def _run(self):
+        """Store batches until it receives None"""
+        while True:
+            batch = self.queue.get()
+            try:
+                if batch is None:
+                    return
+                model, rows = batch
+                model.fast_store_rows(rows)
+                self.batches += 1
+            except Exception:                                                    # pylint: disable=broad-except
+                traceback.print_exc()
+                print_msg("Couldn't store partial provenance", True)
+            finally:
+                self.queue.task_done()
+
+    def flush(self):
+        """Wait until every batch is stored"""
+        if self.thread is not None:
+            self.queue.join()
+
+    def close(self):
+        """Store remaining batches and stop the writer thread"""
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
@@ -0,0 +1,109 @@
+# Copyright (c) 2018, 2019, 2020 President and Fellows of Harvard College.
+# This file is part of ProvBuild.
+
+"""Local IPC protocol of the resident ProvBuild worker
+
+The client side only uses the standard library, so the web interface can
+issue requests without importing the persistence models
+"""
+from __future__ import (absolute_import, print_function,
+                        division, unicode_literals)
+
+import os
+
+from multiprocessing.connection import Client, Listener
+
+from future.utils import text_to_native_str as n
+
+
+DAEMON_ADDRESS = ".provbuild.sock"
+
+
+def _address(address):
+    """Return absolute socket path"""
+    return n(os.path.abspath(address or DAEMON_ADDRESS))
+
+
+def send(message, address=None):
+    """Send message to worker and wait for its answer
+    Return None if there is no worker listening on address
+    """
+    try:
+        conn = Client(_address(address), family=n("AF_UNIX"))
+    except (IOError, OSError):
+        return None
+    try:
+        conn.send(message)
+        return conn.recv()
+    except EOFError:
+        return None
+    finally:
+        conn.close()
+
+
+def call(argv, cwd=None, address=None):
+    """Execute 'now' command argv in the worker
+
+    Return (status, output) like commands.getstatusoutput, or None if
+    there is no worker listening on address
+    """
+    return send({
+        "action": "call",
+        "argv": list(argv),
+        "cwd": cwd or os.getcwd(),
+    }, address=address)
+
+
+def ping(address=None):
+    """Check if worker is alive"""
+    return send({"action": "ping"}, address=address) is not None
+
+
+def stop(address=None):
+    """Ask worker to stop"""
+    return send({"action": "stop"}, address=address) is not None
+
+
+def serve(execute, address=None):
+    """Serve requests until a stop request arrives
+
+    Requests are handled one at a time, in the order they arrive
+
+
+    Arguments:
+    execute -- function that receives (argv, cwd) and returns (status, output)
+    """
+    path = _address(address)
+    if os.path.exists(path):
+        if ping(path):
+            raise RuntimeError("there is a worker listening on {}".format(path))
+        os.remove(path)
+
+    old_umask = os.umask(0o077)
+    try:
+        listener = Listener(path, family=n("AF_UNIX"))
+    finally:
+        os.umask(old_umask)
+
+    try:
+        running = True
+        while running:
+            conn = listener.accept()
+            try:
+                message = conn.recv()
+                action = message.get("action")
+                if action == "call":
+                    conn.send(execute(message["argv"], message["cwd"]))
+                elif action == "stop":
+                    running = False
+                    conn.send(True)
+                else:
+                    conn.send(True)
+            except (EOFError, IOError, OSError):
+                pass
+            finally:
+                conn.close()
+    finally:
+        listener.close()
+        if os.path.exists(path):
+            os.remove(path)
@@ -55,3 +55,40 @@ class DotDict(dict):
         return dict.__getattr__(self, attr)
     __setattr__ = dict.__setitem__
     __delattr__ = dict.__delitem__
+
+
+class IndexedList(list):
+    """List with constant time membership tests
+
+    Keep a counter of the elements to avoid scanning the list on `in`.
+    It preserves the list order, so it can replace worklists that are
+    iterated while they grow.
+    """
+
+    def __init__(self, iterable=()):
+        super(IndexedList, self).__init__(iterable)
+        self._counter = Counter(self)
+
+    def __contains__(self, item):
+        return self._counter[item] > 0
+
+    def __iadd__(self, other):
+        self.extend(other)
+        return self
+
+    def append(self, item):
+        super(IndexedList, self).append(item)
+        self._counter[item] += 1
+
+    def extend(self, iterable):
+        for item in iterable:
+            self.append(item)
+
+    def remove(self, item):
+        super(IndexedList, self).remove(item)
+        self._counter[item] -= 1
+
+    def pop(self, index=-1):
+        item = super(IndexedList, self).pop(index)
+        self._counter[item] -= 1
+        return item
@@ -3,22 +3,28 @@
 # Copyright (c) 2018, 2019, 2020 President and Fellows of Harvard College.
 # This file is part of ProvBuild.
 
-"""Define MetaProfiler
+"""Define MetaProfiler and HotPathCounters
 
-Use it to profile noWorkflow itself.
-It is disabled by deault. To enabled, change active to True
+Use them to profile noWorkflow itself.
+They are disabled by deault. To enabled, change active to True
 """
 from __future__ import (absolute_import, print_function,
                         division, unicode_literals)
 
 import csv
+import json
 import os
+import time
 
 from collections import defaultdict
 from datetime import datetime
 from functools import wraps
 
 
+COUNTERS_DIRNAME = "counters"
+COUNTER_COLUMNS = ("name", "count", "seconds", "bytes")
+
+
 class MetaProfiler(object):                                                      # pylint: disable=too-few-public-methods
     """Profile noWorkflow itself"""
 
@@ -64,4 +70,96 @@ class MetaProfiler(object):
                 writter = csv.writer(fil)
                 writter.writerows(rows)
 
+
+class HotPathCounters(object):
+    """Count and time hot paths of noWorkflow itself
+
+    Execution providers wrap their handlers with timed and sized only when
+    the counters are active. Thus, inactive counters cost nothing
+    """
+
+    def __init__(self, active=False):
+        self.active = active
+        self.counts = defaultdict(int)
+        self.times = defaultdict(float)
+        self.sizes = defaultdict(int)
+
+    def timed(self, name, func):
+        """Return func wrapped to count calls and their duration in name"""
+        counts, times, timer = self.counts, self.times, time.time
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            """Count and time func"""
+            before = timer()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                times[name] += timer() - before
+                counts[name] += 1
+        return wrapper
+
+    def sized(self, name, func):
+        """Return timed func that also sums the length of its results"""
+        sizes = self.sizes
+        timed = self.timed(name, func)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            """Count, time, and measure func"""
+            result = timed(*args, **kwargs)
+            try:
+                sizes[name] += len(result)
+            except TypeError:
+                pass
+            return result
+        return wrapper
+
+    def rows(self):
+        """Return list of (name, count, seconds, bytes) sorted by name"""
+        names = sorted(set(self.counts) | set(self.times) | set(self.sizes))
+        return [
+            (name, self.counts[name], self.times[name], self.sizes[name])
+            for name in names
+        ]
+
+    def save(self, path, trial_id):
+        """Save counters of trial_id as JSON and CSV in path
+        Return JSON filename
+        """
+        if not self.active:
+            return None
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        base = os.path.join(path, "{}".format(trial_id))
+        rows = self.rows()
+        with open(base + ".json", "w") as fil:
+            json.dump({
+                "trial_id": trial_id,
+                "counters": [
+                    dict(zip(COUNTER_COLUMNS, row)) for row in rows
+                ],
+            }, fil, indent=2, sort_keys=True)
+        with open(base + ".csv", "w") as fil:
+            writter = csv.writer(fil)
+            writter.writerow(COUNTER_COLUMNS)
+            writter.writerows(rows)
+        return base + ".json"
+
+    @staticmethod
+    def load(path, trial_id):
+        """Load counters of trial_id from path
+        Return list of (name, count, seconds, bytes) or None
+        """
+        filename = os.path.join(path, "{}.json".format(trial_id))
+        if not os.path.exists(filename):
+            return None
+        with open(filename) as fil:
+            data = json.load(fil)
+        return [
+            tuple(counter[column] for column in COUNTER_COLUMNS)
+            for counter in data["counters"]
+        ]
+
 meta_profiler = MetaProfiler(active=False)                                       # pylint: disable=invalid-name
+hot_counters = HotPathCounters(active=False)                                     # pylint: disable=invalid-name